@@ -0,0 +1,112 @@
+#===========================================================================
+#
+# Benchmark for all link database entry memory use.
+#
+#===========================================================================
+"""Build device database entries and report the bytes used per entry.
+
+The entries are created from the same JSON data that's read from the
+database files at startup.  The current slotted DeviceEntry, DbFlags, and
+Address classes are compared against the previous implementation which
+stored the attributes in a per-object __dict__ and kept a list copy of the
+address bytes.
+
+Usage (from the top level directory):
+
+  PYTHONPATH=. python benchmarks/db_memory.py [num_entries]
+"""
+import sys
+import tracemalloc
+import insteon_mqtt as IM
+
+
+class LegacyAddress:
+    """Address w/ the original attributes for comparison."""
+    def __init__(self, addr):
+        i = int(addr.replace(".", ""), 16)
+        self.ids = [i >> 16 & 0xFF, i >> 8 & 0xFF, i & 0xFF]
+        self.id = i
+        self.bytes = bytes(self.ids)
+        self.hex = ("%02X.%02X.%02X" % tuple(self.ids)).lower()
+
+
+class LegacyDbFlags:
+    """DbFlags w/ the original attributes for comparison."""
+    def __init__(self, in_use, is_controller, is_last_rec):
+        self.in_use = in_use
+        self.is_controller = is_controller
+        self.is_last_rec = is_last_rec
+
+
+class LegacyDeviceEntry:
+    """DeviceEntry w/ the original attributes for comparison."""
+    def __init__(self, addr, group, mem_loc, db_flags, data, db=None):
+        self.addr = addr
+        self.group = group
+        self.mem_loc = mem_loc
+        self.db_flags = db_flags
+        self.is_controller = db_flags.is_controller
+        self.data = bytes(data)
+        self.db = db
+
+
+def legacy_from_json(data):
+    flags = data['db_flags']
+    return LegacyDeviceEntry(LegacyAddress(data['addr']), data['group'],
+                             data['mem_loc'],
+                             LegacyDbFlags(flags['in_use'],
+                                           flags['is_controller'],
+                                           flags['is_last_rec']),
+                             data['data'])
+
+
+def current_from_json(data):
+    return IM.db.DeviceEntry.from_json(data)
+
+
+def make_json(num_entries):
+    """Build the JSON data for the entries.  Addresses are all unique."""
+    entries = []
+    for i in range(num_entries):
+        entries.append({
+            'addr' : "%02x.%02x.%02x" % (0x10 + i // 65536, i // 256 % 256,
+                                         i % 256),
+            'group' : i % 8,
+            'mem_loc' : 0x0fff - (i % 400) * 8,
+            'db_flags' : {'in_use' : True, 'is_controller' : bool(i % 2),
+                          'is_last_rec' : False},
+            'data' : [3, 0x1f, i % 8],
+            })
+    return entries
+
+
+def measure(from_json, entries):
+    """Return the bytes allocated per entry."""
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objs = [from_json(i) for i in entries]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    assert len(objs) == len(entries)
+    return used / len(entries)
+
+
+def main(argv):
+    num_entries = int(argv[1]) if len(argv) > 1 else 80000
+
+    entries = make_json(num_entries)
+    print("Entries: %d" % num_entries)
+    results = []
+    for name, func in (("before", legacy_from_json),
+                       ("after", current_from_json)):
+        per_entry = measure(func, entries)
+        results.append(per_entry)
+        print("%-6s: %6.0f bytes/entry  %6.1f MB total" %
+              (name, per_entry, per_entry * num_entries / 1e6))
+
+    print("saved : %5.0f%%" % (100 * (1 - results[1] / results[0])))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
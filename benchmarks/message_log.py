@@ -0,0 +1,93 @@
+#===========================================================================
+#
+# Benchmark for message logging cost.
+#
+#===========================================================================
+"""Replay device broadcast messages through Protocol and report messages/sec
+at different logging levels.
+
+Each message is logged by Protocol when it's read and again by the read
+handler like the devices do when they process a message.  The log output is
+written to an in memory stream so the formatting is measured, not the
+terminal.  At the WARNING level none of the message strings should be built.
+
+Usage (from the top level directory):
+
+  PYTHONPATH=. python benchmarks/message_log.py [num_msgs]
+"""
+import io
+import logging
+import sys
+import time
+import insteon_mqtt as IM
+
+LOG = IM.log.get_logger()
+
+
+class MockLink:
+    def __init__(self):
+        self.signal_read = IM.Signal()
+        self.signal_wrote = IM.Signal()
+
+    def poll(self, t):
+        pass
+
+
+def make_burst(num_msgs):
+    """Build the raw PLM byte stream for a set of broadcast messages."""
+    data = bytearray()
+    for i in range(num_msgs):
+        # Standard all link broadcast from a unique address so the duplicate
+        # check doesn't drop any of them.
+        data += bytes([0x02, 0x50, 0x3a, (i >> 8) & 0xff, i & 0xff, 0x00,
+                       0x00, 0x01, 0xcb, 0x11, 0x00])
+    return bytes(data)
+
+
+def run(level, burst, repeat):
+    """Replay the burst and return (num msgs, elapsed seconds)."""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s %(module)s: %(message)s"))
+    LOG.addHandler(handler)
+    LOG.setLevel(level)
+    LOG.propagate = False
+
+    count = 0
+    elapsed = 0
+    try:
+        for _ in range(repeat):
+            link = MockLink()
+            proto = IM.Protocol(link)
+            msgs = []
+
+            def received(msg):
+                LOG.info("Received %s", msg)
+                msgs.append(msg)
+            proto.signal_received.connect(received)
+
+            t0 = time.perf_counter()
+            proto._data_read(link, burst)
+            elapsed += time.perf_counter() - t0
+            count += len(msgs)
+    finally:
+        LOG.removeHandler(handler)
+
+    return count, elapsed
+
+
+def main(argv):
+    num_msgs = int(argv[1]) if len(argv) > 1 else 5000
+    repeat = 5
+
+    burst = make_burst(num_msgs)
+    print("Messages: %d" % num_msgs)
+    for level in ("DEBUG", "INFO", "WARNING"):
+        count, elapsed = run(level, burst, repeat)
+        print("%-7s: %7d msgs in %.3f sec = %10.0f msgs/sec" %
+              (level, count, elapsed, count / elapsed))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,119 @@
+#===========================================================================
+#
+# Benchmark for batched MQTT writes.
+#
+#===========================================================================
+"""Publish scene fan outs through the MQTT link and report the write cost.
+
+A local socket stands in for the broker.  Each scene press publishes the
+state of 30 responders in one event loop iteration and then the manager
+calls write_to_link() until the link doesn't need to write.  The number of
+manager write notifications, write cycles, and socket sends are counted.
+The current link is compared against the previous implementation which
+let paho write each packet as it was published and notified the manager
+for every message.
+
+Usage (from the top level directory):
+
+  PYTHONPATH=. python benchmarks/mqtt_batch.py [num_scenes]
+"""
+import socket
+import sys
+import time
+import warnings
+import insteon_mqtt as IM
+
+NUM_RESPONDERS = 30
+
+
+class LegacyMqtt(IM.network.Mqtt):
+    """Mqtt link w/ the original write handling for comparison."""
+    def __init__(self):
+        super().__init__()
+        self.client.on_socket_register_write = None
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.client.publish(topic, payload, qos, retain)
+        self.signal_needs_write.emit(self, True)
+
+    def write_to_link(self, t):
+        self.client.loop_write()
+        if not self.client.want_write():
+            self.signal_needs_write.emit(self, False)
+
+
+def run(cls, num_scenes):
+    """Publish the scenes and return (notifies, writes, sends, seconds)."""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    link = cls()
+    link.host, link.port = server.getsockname()
+    assert link.connect()
+    broker, _ = server.accept()
+    broker.setblocking(False)
+
+    # Send the CONNACK.
+    broker.sendall(bytes([0x20, 0x02, 0x00, 0x00]))
+    while not link.connected:
+        link.read_from_link()
+
+    # Count the manager notifications and socket sends.
+    counts = {"notify" : 0, "pending" : False, "send" : 0}
+
+    def needs_write(link, needs_write):
+        counts["notify"] += 1
+        counts["pending"] = needs_write
+
+    link.signal_needs_write.connect(needs_write)
+
+    sock_send = link.client._sock_send
+
+    def count_send(buf):
+        counts["send"] += 1
+        return sock_send(buf)
+
+    link.client._sock_send = count_send
+
+    writes = 0
+    t0 = time.perf_counter()
+    for scene in range(num_scenes):
+        for i in range(NUM_RESPONDERS):
+            link.publish("insteon/%02x.%02x.00/state" % (scene % 256, i),
+                         "ON" if scene % 2 else "OFF", 0, True)
+
+        # Event loop write cycles.
+        while counts["pending"]:
+            link.write_to_link(time.time())
+            writes += 1
+
+        # Drain the broker side so the socket doesn't fill up.
+        try:
+            while broker.recv(65536):
+                pass
+        except BlockingIOError:
+            pass
+    elapsed = time.perf_counter() - t0
+
+    link.client._sock_send = sock_send
+    broker.close()
+    server.close()
+    return counts["notify"], writes, counts["send"], elapsed
+
+
+def main(argv):
+    num_scenes = int(argv[1]) if len(argv) > 1 else 1000
+
+    IM.log.get_logger().setLevel("WARNING")
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    print("Scenes: %d x %d responders" % (num_scenes, NUM_RESPONDERS))
+    for name, cls in (("before", LegacyMqtt), ("after", IM.network.Mqtt)):
+        notify, writes, sends, elapsed = run(cls, num_scenes)
+        print("%-6s: %6d notifies %6d write cycles %6d sends  %.3f sec" %
+              (name, notify, writes, sends, elapsed))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,113 @@
+#===========================================================================
+#
+# Benchmark for MQTT input topic dispatch.
+#
+#===========================================================================
+"""Route input messages to KeypadLinc topic callbacks and report the cost.
+
+Each device has the 8 button set and scene topics from the example config.
+Before, every topic is subscribed to with the network link which adds a
+paho callback filter per topic.  After, the topics are added to a Dispatch
+object which subscribes to two wildcard topics.  Messages are passed
+through the paho client message handling so the paho topic matching is
+included in both cases.  The number of broker subscriptions, the time to
+subscribe, and the time per message are reported for different numbers of
+devices.
+
+Usage (from the top level directory):
+
+  PYTHONPATH=. python benchmarks/mqtt_dispatch.py [num_msgs]
+"""
+import sys
+import time
+import warnings
+import paho.mqtt.client as paho
+import insteon_mqtt as IM
+
+TOPICS = ["insteon/%s/set/%d", "insteon/%s/scene/%d"]
+WILDCARDS = ["insteon/+/set/+", "insteon/+/scene/+"]
+
+
+class CountLink(IM.network.Mqtt):
+    """Network link that counts broker subscriptions."""
+    def __init__(self):
+        super().__init__()
+        self.num_sub = 0
+
+    def subscribe(self, topic, qos=0, callback=None):
+        self.num_sub += 1
+        super().subscribe(topic, qos, callback)
+
+
+def make_topics(num_devices):
+    """Return the list of device input topics."""
+    topics = []
+    for i in range(num_devices):
+        addr = "%02x.%02x.%02x" % (0x40, i // 256, i % 256)
+        for button in range(1, 9):
+            for topic in TOPICS:
+                topics.append(topic % (addr, button))
+    return topics
+
+
+def run(topics, use_dispatch, num_msgs):
+    """Subscribe and route messages.
+
+    Returns (num subscriptions, subscribe seconds, usec/msg).
+    """
+    count = [0]
+
+    def callback(client, data, message):
+        count[0] += 1
+
+    link = CountLink()
+    t0 = time.perf_counter()
+    if use_dispatch:
+        sub = IM.mqtt.Dispatch(link, WILDCARDS)
+        for topic in topics:
+            sub.subscribe(topic, 1, callback)
+        sub.subscribe_topics(1)
+    else:
+        for topic in topics:
+            link.subscribe(topic, 1, callback)
+    sub_time = time.perf_counter() - t0
+
+    step = max(len(topics) // num_msgs, 1)
+    msgs = []
+    for i in range(num_msgs):
+        msg = paho.MQTTMessage(topic=topics[(i * step) % len(topics)]
+                               .encode())
+        msg.payload = b"ON"
+        msgs.append(msg)
+
+    # Best of several runs to reduce timing noise.
+    elapsed = None
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for msg in msgs:
+            link.client._handle_on_message(msg)
+        dt = time.perf_counter() - t0
+        elapsed = dt if elapsed is None else min(elapsed, dt)
+
+    assert count[0] == 5 * num_msgs
+    return link.num_sub, sub_time, 1e6 * elapsed / num_msgs
+
+
+def main(argv):
+    num_msgs = int(argv[1]) if len(argv) > 1 else 20000
+
+    IM.log.get_logger().setLevel("WARNING")
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    print("Messages: %d" % num_msgs)
+    for num_devices in (10, 100, 1000):
+        topics = make_topics(num_devices)
+        for name, use_dispatch in (("before", False), ("after", True)):
+            num_sub, sub_time, usec = run(topics, use_dispatch, num_msgs)
+            print("%5d devices %-6s: %6d subscriptions in %.3f sec  "
+                  "%6.2f usec/msg" % (num_devices, name, num_sub, sub_time,
+                                      usec))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
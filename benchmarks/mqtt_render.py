@@ -0,0 +1,107 @@
+#===========================================================================
+#
+# Benchmark for MQTT topic and payload rendering.
+#
+#===========================================================================
+"""Render state messages for a set of devices and report messages/sec.
+
+Each device has a state template like the example config (a simple topic
+and payload) and a json payload template that needs jinja.  The current
+MsgTemplate and BaseTopic template data are compared against the previous
+implementation which built the template data from scratch, created a jinja
+template per device, and rendered every topic and payload with jinja.  The
+time to create the templates for all the devices is also reported.
+
+Usage (from the top level directory):
+
+  PYTHONPATH=. python benchmarks/mqtt_render.py [num_devices]
+"""
+import sys
+import time
+import jinja2
+import insteon_mqtt as IM
+from insteon_mqtt.mqtt.MsgTemplate import _TEMPLATES
+
+STATE_TOPIC = "insteon/{{address}}/state/{{button}}"
+STATE_PAYLOAD = "{{on_str.upper()}}"
+JSON_PAYLOAD = ('{ "state" : "{{on_str.upper()}}", '
+                '"brightness" : {{level_255}}, "reason" : "{{reason}}" }')
+
+
+class Device:
+    def __init__(self, addr):
+        self.addr = IM.Address(addr)
+        self.name = None
+
+
+class LegacyMsgTemplate(IM.mqtt.MsgTemplate):
+    """MsgTemplate w/ the original per object jinja templates."""
+    def __init__(self, topic, payload):
+        super().__init__(None, None)
+        self.topic_str = topic
+        self.topic = jinja2.Template(topic)
+        self.payload_str = payload
+        self.payload = jinja2.Template(payload)
+
+    def render_topic(self, data, silent=False):
+        return self._render(self.topic_str, self.topic, data, silent)
+
+
+class LegacyTopic(IM.mqtt.topic.BaseTopic):
+    """BaseTopic w/ the original template data."""
+    def base_template_data(self, **kwargs):
+        data = {"address" : self.device.addr.hex,
+                "name" : self.device.addr.hex}
+        if self.device.name:
+            data['name'] = self.device.name
+        if 'button' in kwargs and kwargs['button'] is not None:
+            data['button'] = kwargs['button']
+        return data
+
+
+def run(msg_cls, topic_cls, num_devices, num_msgs):
+    """Render messages and return (create seconds, messages/sec)."""
+    addrs = ["%02x.%02x.%02x" % (0x50, i // 256, i % 256)
+             for i in range(num_devices)]
+
+    # Clear the shared template cache so creation includes compiling.
+    _TEMPLATES.clear()
+
+    t0 = time.perf_counter()
+    devices = []
+    for addr in addrs:
+        devices.append((topic_cls(None, Device(addr)),
+                        msg_cls(STATE_TOPIC, STATE_PAYLOAD),
+                        msg_cls(STATE_TOPIC, JSON_PAYLOAD)))
+    create = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for i in range(num_msgs):
+        topic, state, json = devices[i % num_devices]
+        level = i % 256
+        data = topic.base_template_data(button=i % 8 + 1)
+        data["on_str"] = "on" if level else "off"
+        data["level_255"] = level
+        data["reason"] = ""
+        for msg in (state, json):
+            assert msg.render_topic(data) and msg.render_payload(data)
+    elapsed = time.perf_counter() - t0
+
+    return create, 2 * num_msgs / elapsed
+
+
+def main(argv):
+    num_devices = int(argv[1]) if len(argv) > 1 else 200
+    num_msgs = 20000
+
+    print("Devices: %d" % num_devices)
+    for name, msg_cls, topic_cls in (
+            ("before", LegacyMsgTemplate, LegacyTopic),
+            ("after", IM.mqtt.MsgTemplate, IM.mqtt.topic.BaseTopic)):
+        create, rate = run(msg_cls, topic_cls, num_devices, num_msgs)
+        print("%-6s: create %.3f sec  %8.0f messages/sec" %
+              (name, create, rate))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
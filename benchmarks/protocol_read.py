@@ -0,0 +1,127 @@
+#===========================================================================
+#
+# Benchmark for Protocol read framing.
+#
+#===========================================================================
+"""Replay a PLM read burst through Protocol and report messages/sec.
+
+The burst is a modem all link database dump (0x57 records with 0x6a get
+next replies) followed by a device database dump (0x51 extended records)
+which is delivered to the protocol in serial sized chunks.  The current
+Protocol framing is compared against the previous implementation which
+resliced the read buffer after every message.
+
+Usage (from the top level directory):
+
+  PYTHONPATH=. python benchmarks/protocol_read.py [num_records] [chunk_size]
+"""
+import sys
+import time
+import insteon_mqtt as IM
+import insteon_mqtt.message as Msg
+
+
+class MockLink:
+    def __init__(self):
+        self.signal_read = IM.Signal()
+        self.signal_wrote = IM.Signal()
+
+    def poll(self, t):
+        pass
+
+
+class LegacyProtocol(IM.Protocol):
+    """Protocol w/ the original reslicing read loop for comparison."""
+    def _data_read(self, link, data):
+        self._buf.extend(data)
+        while len(self._buf) > 1:
+            start = self._buf.find(0x15)
+            if start == 0:
+                self.set_wait_time(time.time() + .3)
+                self._buf = self._buf[1:]
+                continue
+
+            start = self._buf.find(0x02)
+            if start == -1:
+                self._buf = bytearray()
+                break
+
+            if start != 0:
+                self._buf = self._buf[start:]
+                if len(self._buf) < 2:
+                    break
+
+            msg_type = self._buf[1]
+            msg_class = Msg.types.get(msg_type, None)
+            if not msg_class:
+                self._buf = self._buf[1:]
+                continue
+
+            msg_size = msg_class.msg_size(self._buf)
+            if len(self._buf) < msg_size:
+                break
+
+            msg = msg_class.from_bytes(self._buf)
+            self._buf = self._buf[msg_size:]
+            if not self._is_duplicate(msg):
+                self._process_msg(msg)
+
+
+def make_burst(num_records):
+    """Build the raw PLM byte stream for a database dump."""
+    data = bytearray()
+    for i in range(num_records):
+        # Modem db record and the get next ACK.
+        data += bytes([0x02, 0x57, 0xe2, i & 0xff, 0x3a, 0x29, i & 0xff,
+                       0x01, 0x0e, 0x43, 0x02, 0x6a, 0x06])
+
+    for i in range(num_records):
+        # Device db record reply.  Use a unique address so the duplicate
+        # check doesn't drop any of them.
+        data += bytes([0x02, 0x51, 0x3a, 0x29, i & 0xff, 0x44, 0x85, 0x11,
+                       0x1b, 0x2f, 0x00, 0x00, 0x01, 0x0f, (i * 8) & 0xff,
+                       0x08, 0xe2, 0x01, 0x44, 0x85, 0x11, 0x00, 0x00, 0x00,
+                       0xd4])
+    return bytes(data)
+
+
+def run(proto_class, burst, chunk_size, repeat):
+    """Replay the burst and return (num msgs, elapsed seconds)."""
+    count = 0
+    elapsed = 0
+    for _ in range(repeat):
+        link = MockLink()
+        proto = proto_class(link)
+        msgs = []
+
+        def received(msg):
+            msgs.append(msg)
+        proto.signal_received.connect(received)
+
+        t0 = time.perf_counter()
+        for i in range(0, len(burst), chunk_size):
+            proto._data_read(link, burst[i:i + chunk_size])
+        elapsed += time.perf_counter() - t0
+        count += len(msgs)
+
+    return count, elapsed
+
+
+def main(argv):
+    num_records = int(argv[1]) if len(argv) > 1 else 200
+    chunk_size = int(argv[2]) if len(argv) > 2 else 4096
+    repeat = 5
+
+    # Framing is what's being measured - not log formatting.
+    IM.log.get_logger().setLevel("WARNING")
+
+    burst = make_burst(num_records)
+    print("Burst: %d bytes, read chunk: %d bytes" % (len(burst), chunk_size))
+    for name, cls in (("before", LegacyProtocol), ("after", IM.Protocol)):
+        count, elapsed = run(cls, burst, chunk_size, repeat)
+        print("%-6s: %7d msgs in %.3f sec = %10.0f msgs/sec" %
+              (name, count, elapsed, count / elapsed))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,163 @@
+#===========================================================================
+#
+# Benchmark for scene compression.
+#
+#===========================================================================
+"""Compress a synthetic scenes file and report the time.
+
+The scenes file looks like the output of import_scenes_all on a large
+network before compression: every link is a separate scene and each link is
+found twice (once on the controller and once on the responder).  Devices
+are paired into 3-way switches and every device has a few groups that
+control other devices.
+
+The current signature based compression is compared against the previous
+implementation which compared every pair of scenes.
+
+Usage (from the top level directory):
+
+  PYTHONPATH=. python benchmarks/scenes_compress.py [num_devices]
+"""
+import io
+import sys
+import time
+from collections import Counter
+from ruamel.yaml import YAML
+import insteon_mqtt as IM
+import insteon_mqtt.Scenes as Scenes
+
+
+class MockModem:
+    """Modem w/ no devices so scene devices are parsed from the addresses."""
+    def __init__(self):
+        self.db = IM.db.Modem(None, self)
+        self.devices = {}
+
+    def clear_db_config(self):
+        pass
+
+    def find(self, addr):
+        return None
+
+
+class LegacySceneManager(Scenes.SceneManager):
+    """SceneManager w/ the original pairwise compression for comparison."""
+    def compress(self):
+        num = len(self.entries)
+        self.compress_responders()
+        self.compress_controllers()
+        self.compress_n_way()
+        return num - len(self.entries)
+
+    def _compress(self, can_merge, merge):
+        i = 0
+        while i < len(self.entries):
+            found = False
+            test_scene = self.entries[i]
+            j = i + 1
+            while j < len(self.entries):
+                scene = self.entries[j]
+                j += 1
+                if can_merge(test_scene, scene):
+                    merge(test_scene, scene)
+                    if test_scene.name is not None:
+                        scene.name = test_scene.name
+                    self.del_scene(test_scene)
+                    found = True
+                    break
+            if found is not True:
+                i += 1
+
+    def compress_controllers(self):
+        def merge(lhs, rhs):
+            for new_controller in lhs.controllers:
+                rhs.append_controller(new_controller)
+
+        self._compress(lambda lhs, rhs: (Counter(lhs.responders) ==
+                                         Counter(rhs.responders)), merge)
+
+    def compress_responders(self):
+        def merge(lhs, rhs):
+            for new_responder in lhs.responders:
+                rhs.append_responder(new_responder)
+
+        self._compress(lambda lhs, rhs: (Counter(lhs.controllers) ==
+                                         Counter(rhs.controllers)), merge)
+
+    def compress_n_way(self):
+        def merge(lhs, rhs):
+            for new_controller in lhs.controllers:
+                rhs.append_controller(new_controller)
+            for new_responder in lhs.responders:
+                rhs.append_responder(new_responder)
+
+        self._compress(self._can_merge_n_way, merge)
+
+    def _can_merge_n_way(self, lhs, rhs):
+        for lhs_devices, rhs_scene in ((lhs.controllers, rhs),
+                                       (lhs.responders, rhs),
+                                       (rhs.controllers, lhs),
+                                       (rhs.responders, lhs)):
+            for device in lhs_devices:
+                if (rhs_scene.find_controller(device) is None and
+                        rhs_scene.find_responder(device) is None):
+                    return False
+        return True
+
+
+def make_yaml(num_devices):
+    """Build the uncompressed scenes yaml text."""
+    addrs = ["%02x.%02x.%02x" % (0x30, i // 256, i % 256)
+             for i in range(num_devices)]
+
+    links = []
+    for i, addr in enumerate(addrs):
+        # 3-way switch pairs.
+        if i % 2 == 0 and i + 1 < num_devices:
+            links.append((addr, 1, addrs[i + 1]))
+            links.append((addrs[i + 1], 1, addr))
+
+        # Groups that control a few other devices.
+        for group in (2, 3):
+            for j in range(1, 4):
+                links.append((addr, group,
+                              addrs[(i + group * 7 + j * 13) % num_devices]))
+
+    o = io.StringIO()
+    for ctrl, group, resp in links:
+        # Each link is imported from both devices.
+        for _ in range(2):
+            o.write("- controllers:\n")
+            o.write("    - %s: %d\n" % (ctrl, group))
+            o.write("  responders:\n")
+            o.write("    - %s\n" % resp)
+    return o.getvalue()
+
+
+def run(cls, text):
+    """Compress the scenes and return (scenes before, after, seconds)."""
+    scenes = cls(MockModem(), None)
+    scenes.data = YAML().load(text)
+    scenes._init_scene_entries()
+    num = len(scenes.entries)
+
+    t0 = time.perf_counter()
+    scenes.compress()
+    return num, len(scenes.entries), time.perf_counter() - t0
+
+
+def main(argv):
+    num_devices = int(argv[1]) if len(argv) > 1 else 150
+
+    IM.log.get_logger().setLevel("WARNING")
+    text = make_yaml(num_devices)
+    print("Devices: %d" % num_devices)
+    for name, cls in (("before", LegacySceneManager),
+                      ("after", Scenes.SceneManager)):
+        num, merged, elapsed = run(cls, text)
+        print("%-6s: %5d scenes -> %5d in %8.3f sec" %
+              (name, num, merged, elapsed))
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -19,7 +19,25 @@ class Address:
 
     The Address class supports hash and comparisons so it can be used as a
     dictionary key.
+
+    There is an Address for every database entry so the class uses slots to
+    keep the per-object memory down.  The attributes should be treated as
+    read only.
+
+    Addresses are interned.  Constructing an Address for an ID that has
+    been seen before returns the existing object so there is only one copy
+    of each address and equal addresses are usually the same object.  The
+    intern table is limited to max_interned addresses.  Past that, new
+    objects are created (they still compare equal).
     """
+    __slots__ = ("id", "bytes", "hex")
+
+    # Maximum number of addresses in the intern table.
+    max_interned = 4096
+
+    # Map of integer ID -> interned Address.
+    _interned = {}
+
     #-----------------------------------------------------------------------
     @staticmethod
     def from_bytes(raw, offset=0):
@@ -28,12 +46,20 @@ class Address:
         The inverse of this is to_bytes().
 
         Args:
-          raw (bytes):  The bytearray or list of bytes to read from.
+          raw (bytes):  The bytes, bytearray, memoryview, or list of bytes
+              to read from.
           offset (int):  The offset in raw to start reading at.
 
         Returns:
           Address: Returns the created Address object.
         """
+        # Messages are read from bytes (or a memoryview of the protocol read
+        # buffer) so skip the input checking for them.
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            id = (raw[offset] << 16) | (raw[offset + 1] << 8) | raw[offset + 2]
+            addr = Address._interned.get(id)
+            return addr if addr is not None else Address._make(id)
+
         return Address(raw[0 + offset], raw[1 + offset], raw[2 + offset])
 
     #-----------------------------------------------------------------------
@@ -53,7 +79,41 @@ class Address:
         return Address(data)
 
     #-----------------------------------------------------------------------
-    def __init__(self, addr, addr2=None, addr3=None):
+    @staticmethod
+    def _make(id):
+        """Return the Address for an integer ID.
+
+        Args:
+          id (int):  The valid integer ID of the address.
+
+        Returns:
+          Address: Returns the interned Address or a new one if the intern
+          table is full.
+        """
+        addr = Address._interned.get(id)
+        if addr is not None:
+            return addr
+
+        # Addresses are interned so they're built here instead of in an
+        # __init__ which would be called again for every existing object
+        # returned by __new__.
+        # pylint: disable=attribute-defined-outside-init
+        addr = object.__new__(Address)
+        addr.id = id
+
+        # Create the byte sequence for the address.
+        addr.bytes = bytes([id >> 16, id >> 8 & 0xFF, id & 0xFF])
+
+        # And a nicely formatted hex string output.
+        addr.hex = "%02x.%02x.%02x" % tuple(addr.bytes)
+
+        if len(Address._interned) < Address.max_interned:
+            Address._interned[id] = addr
+
+        return addr
+
+    #-----------------------------------------------------------------------
+    def __new__(cls, addr, addr2=None, addr3=None):
         """Construct an Address object.
 
         An address has three bytes AA, BB, and CC that need to be input.  The
@@ -89,23 +149,25 @@ class Address:
 
         # First input has all 3 byte values.
         if addr2 is None:
-            id1, id2, id3 = self._addr1_to_ids(addr)
+            # Addresses can't change so a copy is the same object.
+            if isinstance(addr, Address):
+                return addr
+
+            id1, id2, id3 = Address._addr1_to_ids(addr)
 
         # Input is split into 3 parts
         else:
-            id1, id2, id3 = self._addr3_to_ids(addr, addr2, addr3)
-
-        # Store the 3 integer address ID's
-        self.ids = [id1, id2, id3]
+            id1, id2, id3 = Address._addr3_to_ids(addr, addr2, addr3)
 
         # Convert the 3 integer values to a single integer ID to use.
-        self.id = (id1 << 16) | (id2 << 8) | id3
-
-        # Create the byte sequence for the address.
-        self.bytes = bytes(self.ids)
+        return Address._make((id1 << 16) | (id2 << 8) | id3)
 
-        # And a nicely formatted hex string output.
-        self.hex = ("%02X.%02X.%02X" % tuple(self.ids)).lower()
+    #-----------------------------------------------------------------------
+    @property
+    def ids(self):
+        """List of the three integer byte ID's of the address.
+        """
+        return list(self.bytes)
 
     #-----------------------------------------------------------------------
     def to_bytes(self):
@@ -129,13 +191,19 @@ class Address:
         """
         return self.hex
 
+    #-----------------------------------------------------------------------
+    def __reduce__(self):
+        # Copies and pickles are rebuilt from the ID so they're interned.
+        return (Address, (self.id,))
+
     #-----------------------------------------------------------------------
     def __hash__(self):
-        return self.id.__hash__()
+        return self.id
 
     #-----------------------------------------------------------------------
     def __eq__(self, rhs):
-        return isinstance(rhs, Address) and self.id == rhs.id
+        return self is rhs or (isinstance(rhs, Address) and
+                               self.id == rhs.id)
 
     #-----------------------------------------------------------------------
     def __lt__(self, rhs):
@@ -146,7 +214,8 @@ class Address:
         return self.hex
 
     #-----------------------------------------------------------------------
-    def _addr1_to_ids(self, addr):
+    @staticmethod
+    def _addr1_to_ids(addr):
         """Convert a single input to an Address
 
         Arg:
@@ -155,12 +224,8 @@ class Address:
         Returns:
           [int]: Returns a list of the three integer ID fields.
         """
-        # Copy construction.
-        if isinstance(addr, Address):
-            return addr.ids
-
         # Convert from a string to an integer ID.
-        elif isinstance(addr, str):
+        if isinstance(addr, str):
             # Handles 'AABBCC' 'AA.BB.CC' 'AA:BB:CC' 'AA BB CC'
             s = addr.replace(".", "").replace(":", "").replace(" ", "").strip()
             id = int(s, 16)
@@ -187,7 +252,8 @@ class Address:
         return (id1, id2, id3)
 
     #-----------------------------------------------------------------------
-    def _addr3_to_ids(self, a1, a2, a3):
+    @staticmethod
+    def _addr3_to_ids(a1, a2, a3):
         """Convert three inputs to an Address
 
         Arg:
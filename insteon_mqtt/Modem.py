@@ -6,6 +6,7 @@
 import json
 import os
 import sys
+import time
 import functools
 from .Address import Address
 from .CommandSeq import CommandSeq
@@ -51,15 +52,27 @@ class Modem:
 
         self.save_path = None
 
+        # Write-behind saver for the modem and device databases.  This is
+        # added to the network manager so saves are delayed.
+        self.saver = db.Saver()
+
         # Map of Address.id -> Device and name -> Device.  name is optional
         # so devices might not be in that map.
         self.devices = {}
         self.device_names = {}
-        self.db = db.Modem(None, self)
+        self.db = db.Modem(None, self, self.saver)
+
+        # Cache of broadcast responders.  Map of (controller Address.id,
+        # group) -> (db, db.revision, [(Address, Device)]).  See
+        # find_group_devices().
+        self._group_devices = {}
 
         # Config db is initiated by Scenes
         self.db_config = None
 
+        # Keys of the sync operations that are running.  See db.SyncPlan.
+        self._sync_pending = set()
+
         # Prepare Scenes object
         self.scenes = []
 
@@ -131,8 +144,14 @@ class Modem:
         - baudrate  Optional baud rate of the serial line.
         - address   Insteon address of the modem.  See Address for inputs.
         - storage   Path to store database records in.
+        - storage_format  'json' to rewrite the database files on every
+                    change, 'journal' to append changes to a journal, or
+                    'sqlite' to store all the databases in one SQLite file.
         - startup_refresh    True if device databases should be checked for
                              new entries on start up.
+        - lazy_db_load  True if device databases should be loaded in the
+                    background after start up instead of before the
+                    devices are available.
         - devices   List of devices.  Each device is a type and insteon
                     address of the device.
 
@@ -193,6 +212,7 @@ class Modem:
                           "config %s", self.addr)
 
         self.label = "%s (%s)" % (self.addr, self.name)
+        start_time = time.time()
 
         # Load the modem database.
         if 'storage' in config_data:
@@ -201,11 +221,15 @@ class Modem:
                 os.makedirs(save_path)
 
             self.save_path = save_path
+            fmt = config_data.get('storage_format', 'json')
+            self.saver.journal = fmt == 'journal'
+            if fmt == 'sqlite':
+                self._open_store(save_path)
             self.load_db()
 
             LOG.info("Modem %s database loaded %s entries", self.label,
                      len(self.db))
-            LOG.debug(str(self.db))
+            LOG.debug("%s", self.db)
 
         # Save the modem description if we got it
         if dev_cat is not None:
@@ -214,12 +238,28 @@ class Modem:
                       self.addr, self.db.desc, firmware)
 
         # Read the device definitions
+        modem_time = time.time()
         self._load_devices(config_data.get('devices', []))
+        devices_time = time.time()
+
+        # Load the device databases now or in the background.
+        if config_data.get('lazy_db_load', False) is True:
+            self._load_device_dbs_later()
+        else:
+            for device in self.devices.values():
+                device.load_db()
+        db_time = time.time()
 
         # Read the scenes definitions and load db_configs
         self.scenes = Scenes.SceneManager(self,
                                           config_data.get('scenes', None))
 
+        LOG.info("Startup time: modem db %.3f sec, %d devices %.3f sec, "
+                 "device dbs %.3f sec, scenes %.3f sec",
+                 modem_time - start_time, len(self.devices),
+                 devices_time - modem_time, db_time - devices_time,
+                 time.time() - db_time)
+
         # Send refresh messages to each device to check if the database is up
         # to date.
         if config_data.get('startup_refresh', False) is True:
@@ -298,21 +338,24 @@ class Modem:
         """Load the all link database from a file.
 
         The file is stored in JSON format (by save_db()) and has the path
-        self.db_path().  If the file doesn't exist, nothing is done.
+        self.db_path().  Any changes in the journal are applied after
+        reading the file (see db.Journal).  If the SQLite storage is being
+        used, the database is read from there instead (see db.Store).  If
+        the database doesn't exist, nothing is done.
         """
-        # See if the database file exists.  Tell the modem it's future path
-        # so it can save itself.
+        # Tell the modem it's future path so it can save itself.
         path = self.db_path()
         self.db.set_path(path)
-        if not os.path.exists(path):
-            return
 
         # Read the file and convert it to a db.Modem object.
         try:
-            with open(path) as f:
-                data = json.load(f)
+            loaded = self.saver.load(path)
+            if loaded is None:
+                return
 
-            self.db = db.Modem.from_json(data, path, self)
+            data, changes = loaded
+            self.db = db.Modem.from_json(data, path, self, self.saver)
+            self.db.replay(changes)
         except:
             LOG.exception("Error reading modem db file %s", path)
             return
@@ -346,6 +389,8 @@ class Modem:
         if device.name:
             self.device_names[device.name] = device
 
+        self._group_devices.clear()
+
     #-----------------------------------------------------------------------
     def remove(self, device):
         """Remove a device object from the modem.
@@ -358,6 +403,7 @@ class Modem:
                   nothing is done.
         """
         self.devices.pop(device.addr.id, None)
+        self._group_devices.clear()
         if device.name:
             self.device_names.pop(device.name, None)
 
@@ -406,6 +452,38 @@ class Modem:
         device = self.devices.get(addr.id, None)
         return device
 
+    #-----------------------------------------------------------------------
+    def find_group_devices(self, controller, group):
+        """Find the devices that respond to a controller group broadcast.
+
+        The responders in the controller's all link database are mapped to
+        device objects and cached.  The cache entry is rebuilt if the
+        controller database changes or if devices are added or removed.
+
+        Args:
+          controller:  The controller device (or the modem) that sent the
+                       broadcast.
+          group (int):  The group number of the broadcast.
+
+        Returns:
+          list:  Returns a list of (Address, device) tuples for each
+          responder entry in the group.  The device is None if the responder
+          isn't in the config.
+        """
+        key = (controller.addr.id, group)
+        cache = self._group_devices.get(key)
+        if (cache and cache[0] is controller.db and
+                cache[1] == controller.db.revision):
+            return cache[2]
+
+        responders = controller.db.find_group(group)
+        LOG.debug("Group %s -> %s", group, [i.addr.hex for i in responders])
+        devices = [(i.addr, self.find(i.addr)) for i in responders]
+
+        self._group_devices[key] = (controller.db, controller.db.revision,
+                                    devices)
+        return devices
+
     #-----------------------------------------------------------------------
     def refresh_all(self, battery=False, force=False, on_done=None):
         """Refresh all the all link databases.
@@ -766,14 +844,13 @@ class Modem:
             seq.add(self.sync, dry_run, refresh=False, sequence=sequence)
         else:
             LOG.ui("Syncing %s device %s", self.label, dry_run_text)
-            # Perform diff after refresh
-            diff = self.db_config.diff(self.db)
-
-            if len(diff.del_entries) > 0 or len(diff.add_entries) > 0:
-                for entry in diff.del_entries:
-                    seq.add(self._sync_del, entry, dry_run)
-                for entry in diff.add_entries:
-                    seq.add(self._sync_add, entry, dry_run)
+            plan = db.SyncPlan(self.db_config, self.db, self._sync_pending)
+
+            # The operations are found and run one at a time.  Nothing is
+            # pulled from the plan (and marked pending) until the sequence
+            # gets to it.
+            if not plan.is_empty():
+                seq.add(self._sync_next, plan, iter(plan), dry_run)
             else:
                 LOG.ui("  No changes necessary.")
 
@@ -782,6 +859,67 @@ class Modem:
         else:
             on_done(True, "Sync Complete", None)
 
+    #-----------------------------------------------------------------------
+    def _sync_next(self, plan, ops, dry_run, on_done=None):
+        """Run the next sync operation.
+
+        Used by sync().  Each operation is pulled from the plan when the
+        previous one finishes so it's checked against the current database.
+        If an operation fails, the sync is stopped.  Dry runs log all the
+        operations and the estimated cost.
+
+        Args:
+          plan:    (db.SyncPlan) The sync plan.
+          ops:     Iterator of the plan operations.
+          dry_run: (Boolean) True to only log the operations.
+          on_done: Finished callback.  This is called when all the
+                   operations have completed or one of them fails.
+        """
+        if dry_run:
+            for op in ops:
+                self._sync_op(op, dry_run, util.make_callback(None))
+                plan.done(op)
+
+            num_msgs, seconds = plan.cost()
+            LOG.ui("  Estimated cost: %d messages, %.0f seconds", num_msgs,
+                   seconds)
+            on_done(True, None, None)
+            return
+
+        op = next(ops, None)
+        if op is None:
+            on_done(True, None, None)
+            return
+
+        def op_done(success, msg, data):
+            plan.done(op)
+            if not success:
+                # Stop the plan so nothing else is pulled from it.  Only
+                # the current operation was pending.
+                ops.close()
+                LOG.error("%s sync stopped: %s", self.label, msg)
+                on_done(False, msg, data)
+                return
+
+            self._sync_next(plan, ops, dry_run, on_done)
+
+        self._sync_op(op, dry_run, op_done)
+
+    #-----------------------------------------------------------------------
+    def _sync_op(self, op, dry_run, on_done):
+        """Run a single sync operation.
+
+        Args:
+          op:      (db.SyncOp) The operation to run.
+          dry_run: (Boolean) True to only log the operation.
+          on_done: Finished callback.
+        """
+        if op.kind == "del":
+            self._sync_del(op.target, dry_run, on_done)
+        else:
+            self._sync_add(op.entry, dry_run, on_done)
+
+    #-----------------------------------------------------------------------
     def _sync_del(self, entry, dry_run, on_done=None):
         '''Deletes a link on the device with a Log UI Message
 
@@ -832,9 +970,33 @@ class Modem:
         for device in self.devices.values():
             seq.add(device.sync, dry_run=dry_run, refresh=refresh)
 
+        # Report the total cost so large installs can schedule the sync.
+        if dry_run:
+            seq.add(self._sync_all_cost)
+
         # Start the command sequence.
         seq.run()
 
+    #-----------------------------------------------------------------------
+    def _sync_all_cost(self, on_done=None):
+        """Log the estimated cost of syncing all the devices.
+
+        Used by sync_all() for dry runs after the databases are refreshed.
+
+        Args:
+          on_done:  Finished callback.
+        """
+        num_msgs, seconds = db.SyncPlan(self.db_config, self.db).cost()
+        for device in self.devices.values():
+            if device.db_config is not None:
+                cost = db.SyncPlan(device.db_config, device.db).cost()
+                num_msgs += cost[0]
+                seconds += cost[1]
+
+        LOG.ui("Sync All estimated cost: %d messages, %.1f minutes",
+               num_msgs, seconds / 60)
+        on_done(True, None, None)
+
     #-----------------------------------------------------------------------
     def import_scenes(self, dry_run=True, save=True, on_done=None):
         """Imports Scenes Defined on the Device into the Scenes Config.
@@ -918,12 +1080,8 @@ class Modem:
 
         # Save everything at the end
         if not dry_run:
-            group.add(LOG.ui, "Compressing Scenes 1/3")
-            group.add(self.scenes.compress_responders)
-            group.add(LOG.ui, "Compressing Scenes 2/3")
-            group.add(self.scenes.compress_controllers)
-            group.add(LOG.ui, "Compressing Scenes 3/3")
-            group.add(self.scenes.compress_n_way)
+            group.add(LOG.ui, "Compressing Scenes")
+            group.add(self.scenes.compress)
             group.add(self.scenes.save)
 
         # Output success message to log
@@ -1112,21 +1270,19 @@ class Modem:
         """
         group = msg.group
 
-        responders = self.db.find_group(group)
+        responders = self.find_group_devices(self, group)
         LOG.debug("Found %s responders in group %s", len(responders), group)
-        LOG.debug("Group %s -> %s", group, [i.addr.hex for i in responders])
 
         # For each device that we're the controller of call it's
         # handler for the broadcast message.
-        for elem in responders:
-            device = self.find(elem.addr)
+        for addr, device in responders:
             if device:
                 LOG.info("%s broadcast to %s for group %s", self.label,
                          device.addr, group)
                 device.handle_group_cmd(self.addr, msg)
             else:
                 LOG.info("%s broadcast - device %s not found in config",
-                         self.label, elem.addr)
+                         self.label, addr)
 
     #-----------------------------------------------------------------------
     def run_command(self, **kwargs):
@@ -1190,6 +1346,57 @@ class Modem:
         # The modem has nothing to do for these messages.
         pass
 
+    #-----------------------------------------------------------------------
+    def _open_store(self, save_path):
+        """Switch the database storage to a SQLite store.
+
+        If the store is empty, the existing JSON database files in the
+        storage directory are imported into it.  Otherwise any JSON files
+        that were written after the store (i.e. the json storage was used
+        for a while) are imported so their changes aren't lost.
+
+        Args:
+          save_path (str):  The storage directory.
+        """
+        if self.saver.store is not None:
+            self.saver.store.close()
+
+        store = db.Store(os.path.join(save_path, db.Store.file_name))
+        if not len(store):
+            store.import_json(save_path)
+        else:
+            write_time = store.write_time()
+            num = store.import_json(save_path, write_time)
+            if num:
+                LOG.warning("Imported %d database files from %s that are "
+                            "newer than %s", num, save_path, store.path)
+
+        self.saver.store = store
+
+    #-----------------------------------------------------------------------
+    def _load_device_dbs_later(self):
+        """Load the device databases in the background.
+
+        One database is loaded per event loop iteration so that MQTT and the
+        Insteon network are handled in between.  Databases that are used
+        before then are loaded on first use (see device.Base.db).
+        """
+        group = self.stack.new(error_stop=False)
+        start_time = time.time()
+
+        def load(device):
+            if not device.is_db_loaded():
+                device.load_db()
+
+        def done():
+            LOG.info("Startup time: %d device dbs loaded in the background "
+                     "in %.3f sec", len(self.devices),
+                     time.time() - start_time)
+
+        for device in self.devices.values():
+            group.add(load, device)
+        group.add(done)
+
     #-----------------------------------------------------------------------
     def _load_devices(self, data):
         """Load device definitions from a configuration data object.
@@ -1206,6 +1413,7 @@ class Modem:
 
         self.devices.clear()
         self.device_names.clear()
+        self._group_devices.clear()
 
         for device_type in data:
             # Use a default list so that if the config field is empty, the
@@ -5,10 +5,12 @@
 #===========================================================================
 import collections
 import enum
+import logging
 import time
 import datetime
 from . import log
 from . import message as Msg
+from .Scheduler import Scheduler
 from .Signal import Signal
 #from . import util
 
@@ -27,6 +29,23 @@ class WriteStatus(enum.Enum):
     WAIT_FOR_REPLY = 2
 
 
+class Priority(enum.IntEnum):
+    """Write queue priority levels.
+
+    Messages in a lower valued priority are always written before messages
+    in a higher valued priority.  Messages with the same priority are written
+    in the order they were sent.
+    """
+    # Protocol.send() with high_priority=True.
+    HIGH = 0
+    # Commands - normally the result of a user or MQTT request.
+    COMMAND = 1
+    # Device state refresh requests.
+    REFRESH = 2
+    # All link database scans.
+    DB = 3
+
+
 # Output message and handler stored together.
 OutputMsg = collections.namedtuple('OutputMsg', ['msg', 'handler'])
 
@@ -68,6 +87,16 @@ class Protocol:
        sending one command, getting an ACK, then reading a series of messages
        (1 per db entry) until we get a final message which ends the sequence.
     """
+    # Number of bytes that can be consumed at the front of the read buffer
+    # before they are removed from the buffer.
+    read_compact_size = 4096
+
+    # The write queue depth is logged each time the number of queued
+    # messages reaches a multiple of this so large bursts (refresh or sync
+    # of all the devices) can be followed in the log.  0 to disable.
+    queue_log_size = 50
+
+    #-----------------------------------------------------------------------
     def __init__(self, link):
         """Constructor
 
@@ -82,6 +111,11 @@ class Protocol:
         self._linkPoll = self.link.poll
         self.link.poll = self._poll
 
+        # Forward next_poll_time() calls as well so that the network manager
+        # will wake up in time to send any timed messages.
+        self._linkNextPollTime = getattr(self.link, "next_poll_time", None)
+        self.link.next_poll_time = self._next_poll_time
+
         # Connect the link read/write signals to our callback methods.
         link.signal_read.connect(self._data_read)
         link.signal_wrote.connect(self._msg_written)
@@ -94,44 +128,60 @@ class Protocol:
         # been removed from the _write_queue
         self.signal_msg_finished = Signal()  # (Message)
 
-        # Inbound message buffer.
+        # Inbound message buffer and the read cursor into it.  Messages are
+        # parsed directly from offsets in the buffer and the consumed bytes
+        # are only dropped from the front of the buffer when it's fully read
+        # or the cursor moves past read_compact_size.  This avoids copying
+        # the whole buffer for every message in a burst of reads.
         self._buf = bytearray()
-
-        # List of messages to send.  These contain an OutputMsg object which
-        # has the message and handler from oldest to newest.  The handlers
-        # are used to process responses.  We have to wait until the handler
-        # says that it's done receiving replies until we can send the next
-        # message.  If we write to the modem before that, it basically
-        # cancels the previous action.  The _write_status flag indicates what
-        # state the [0] message is in during the write process.  Status of
-        # READY_TO_WRITE indicates we can write to the serial link.  When we
-        # send a message to the serial link, status will change to
-        # PENDING_WRITE.  When the serial link actually sends out the
-        # message, status is changed to WAIT_FOR_REPLY.  When the message
-        # handler says that it's done processing replies, status is changed
-        # back to READY_TO_WRITE and we can write, the [0] object is removed,
-        # can we'll write any other messages in the queue.
-        self._write_queue = []
+        self._buf_pos = 0
+
+        # Queues of messages to send, one per Priority level.  These contain
+        # an OutputMsg object which has the message and handler from oldest
+        # to newest.  The handlers are used to process responses.  We have to
+        # wait until the handler says that it's done receiving replies until
+        # we can send the next message.  If we write to the modem before
+        # that, it basically cancels the previous action.
+        #
+        # When a message is sent, it's removed from the queue and stored in
+        # _write_current.  The _write_status flag indicates what state that
+        # message is in during the write process.  Status of READY_TO_WRITE
+        # indicates we can write to the serial link.  When we send a message
+        # to the serial link, status will change to PENDING_WRITE.  When the
+        # serial link actually sends out the message, status is changed to
+        # WAIT_FOR_REPLY.  When the message handler says that it's done
+        # processing replies, status is changed back to READY_TO_WRITE, the
+        # current message is cleared, and we'll write the next message from
+        # the highest priority queue.
+        self._write_queue = [collections.deque() for i in Priority]
+        self._write_current = None
         self._write_status = WriteStatus.READY_TO_WRITE
 
+        # Number of queued (and current) messages for each device address.
+        # Used by is_addr_in_write_queue() to avoid searching the queues.
+        self._write_addr_count = collections.Counter()
+
         # Set of possible message handlers to use.  These are handlers that
         # handle any message that isn't handled by an explicit write handler.
         # # write handler.
         self._read_handlers = []
 
-        # This is a list of prior read messages that are checked against to
-        # determine if a subsequent message is a duplicate and can be
-        # ignored.  Message are removed when their expired time is exceeded.
-        # Only InpStandard and InpExtended messsages are de-duplicated at
-        # this time.
-        self._read_history = []
-
-        # List of Msg.Timed objects which store a message and a time at which
-        # to send the message.  It will be sorted by send time.  These are
-        # messages that should be sent after a certain time has passed.  The
-        # _poll() call will this and push them onto the message queue when
-        # the current time is after the message time.
-        self._timed_messages = []
+        # This is a map of prior read message keys (msg.dedupe_key()) to
+        # their expire time that are checked against to determine if a
+        # subsequent message is a duplicate and can be ignored.  Messages
+        # are removed when their expired time is exceeded.  _read_expire is
+        # a deque of (expire_time, key) in the order the messages were read
+        # which is used to remove old keys from the map.  Only InpStandard
+        # messsages are de-duplicated at this time.
+        self._read_history = {}
+        self._read_expire = collections.deque()
+
+        # Scheduler of Msg.Timed objects which store a message and a time at
+        # which to send the message.  These are messages that should be sent
+        # after a certain time has passed.  The _poll() call will push them
+        # onto the message queue when the current time is after the message
+        # time.
+        self._timed_messages = Scheduler()
 
         # Next time that a message can be written.  When a message is read,
         # we wait until it's expiration time (which is set by the hop count)
@@ -199,28 +249,37 @@ class Protocol:
                         write out the msg are passed to this handler until
                         the handler returns the message.FINISHED flags.
           high_priority (bool):  False to add the message at the end of the
-                        queue.  True to insert this message at the start of
-                        the queue.  This is ignored in timed messages.
+                        queue for the handler priority.  True to add the
+                        message to the Priority.HIGH queue.
           after (float):  Unix clock time tag to send the message after. If
                 None, the message is sent as soon as possible.  Exact time is
                 not guaranteed - the message will be send no earlier than this.
         """
-        # If the time is input, append the inputs to the timer list and sort
-        # the list by the times field.
+        # If the time is input, add the inputs to the timed message queue.
         if after is not None:
             timed = Msg.Timed(msg, msg_handler, high_priority, after)
-            self._timed_messages.append(timed)
-            self._timed_messages.sort(key=lambda i: i.time)
+            self._timed_messages.add(after, timed)
             return
 
-        # Normal message queue.
-        output = OutputMsg(msg, msg_handler)
+        # High priority messages go to the front of the line.  Otherwise the
+        # handler sets the priority of the message.
+        priority = Priority.HIGH
         if not high_priority:
-            self._write_queue.append(output)
+            priority = getattr(msg_handler, "priority", None)
+            if not isinstance(priority, Priority):
+                priority = Priority.COMMAND
 
-        # High priority messages insert at the front of the queue.
-        else:
-            self._write_queue.insert(0, output)
+        output = OutputMsg(msg, msg_handler)
+        self._write_queue[priority].append(output)
+
+        if self.queue_log_size:
+            num = sum(len(q) for q in self._write_queue)
+            if num % self.queue_log_size == 0:
+                LOG.info("Write queue has %d messages: %s", num,
+                         self.write_queue_stats())
+
+        if isinstance(msg, Msg.OutStandard):  # also handles OutExtended
+            self._write_addr_count[msg.to_addr] += 1
 
         # If there are no existing messages that we're waiting to send or
         # processing replies for, send the message immediately.
@@ -241,9 +300,10 @@ class Protocol:
         if wait_time == 0 or wait_time > self._next_write_time:
             wait_time = time.time() if wait_time == 0 else wait_time
             self._next_write_time = wait_time
-            print_time = datetime.datetime.fromtimestamp(
-                self._next_write_time).strftime('%H:%M:%S.%f')[:-3]
-            LOG.debug("Setting next write time: %s", print_time)
+            if LOG.isEnabledFor(logging.DEBUG):
+                print_time = datetime.datetime.fromtimestamp(
+                    self._next_write_time).strftime('%H:%M:%S.%f')[:-3]
+                LOG.debug("Setting next write time: %s", print_time)
 
     #-----------------------------------------------------------------------
     def get_next_write_time(self):
@@ -265,11 +325,19 @@ class Protocol:
         Args:
           addr (Address): The address to search for.
         """
-        for out in self._write_queue:
-            if isinstance(out.msg, (Msg.OutExtended, Msg.OutStandard)):
-                if out.msg.to_addr == addr:
-                    return True
-        return False
+        return self._write_addr_count[addr] > 0
+
+    #-----------------------------------------------------------------------
+    def write_queue_stats(self):
+        """Return the number of messages waiting to be written.
+
+        The message currently being processed is not included.
+
+        Returns:
+          dict:  Returns a dictionary of the lower case Priority name to the
+                 number of messages in the queue for that priority.
+        """
+        return {p.name.lower(): len(self._write_queue[p]) for p in Priority}
 
     #-----------------------------------------------------------------------
     def _poll(self, t):
@@ -286,8 +354,7 @@ class Protocol:
         self._linkPoll(t)
 
         # See if any timed messages should sent.
-        while self._timed_messages and self._timed_messages[0].is_active(t):
-            timed = self._timed_messages.pop(0)
+        for timed in self._timed_messages.pop_due(t):
             LOG.info("Moving timer based message to queue: %s", timed.msg)
             timed.send(self)
 
@@ -295,9 +362,32 @@ class Protocol:
         # the time out in which case we'll mark this message as finished and
         # move on.
         if (self._write_status == WriteStatus.WAIT_FOR_REPLY and
-                self._write_queue[0].handler.is_expired(self, t)):
+                self._write_current.handler.is_expired(self, t)):
             self._write_finished()
 
+    #-----------------------------------------------------------------------
+    def _next_poll_time(self):
+        """Return the next time that _poll() needs to be called.
+
+        The network manager calls this to find out how long it can wait
+        before calling poll() again.
+
+        Returns:
+          float:  Returns the Unix clock time tag of the earliest of the
+                  next timed message, the write handler time out, and the
+                  link poll time.  None if there is nothing scheduled.
+        """
+        times = [self._timed_messages.next_time()]
+        if self._linkNextPollTime:
+            times.append(self._linkNextPollTime())
+
+        # The write handler is checked for a time out in _poll().
+        if self._write_status == WriteStatus.WAIT_FOR_REPLY:
+            times.append(self._write_current.handler.next_expire_time())
+
+        times = [i for i in times if i is not None]
+        return min(times) if times else None
+
     #-----------------------------------------------------------------------
     def _data_read(self, link, data):
         """PLM modem data read callback.
@@ -313,18 +403,47 @@ class Protocol:
         # Append the read data to the inbound message buffer.
         self._buf.extend(data)
 
+        # Parse everything we can from the buffer.  The messages are read
+        # through a memoryview so no copies are made while framing.  The
+        # view must be released before the buffer can be resized.
+        with memoryview(self._buf) as view:
+            pos = self._read_msgs(view, self._buf_pos)
+
+        # Drop the consumed bytes.  If everything was read, the buffer can
+        # just be cleared.  Otherwise only shift the remaining bytes down
+        # once enough of the buffer has been consumed.
+        if pos >= len(self._buf):
+            self._buf.clear()
+            pos = 0
+        elif pos >= self.read_compact_size:
+            del self._buf[:pos]
+            pos = 0
+
+        self._buf_pos = pos
+
+    #-----------------------------------------------------------------------
+    def _read_msgs(self, view, pos):
+        """Parse and process all the complete messages in the read buffer.
+
+        Args:
+          view (memoryview):  View of the inbound message buffer.
+          pos (int):  The read cursor in the buffer to start parsing at.
+
+        Returns:
+          int:  Returns the updated read cursor.  Bytes before the cursor
+                have been consumed.
+        """
+        buf = self._buf
+        end = len(view)
+
         # Keep processing until there are no more messages to handle.  There
         # must be at least 2 bytes so we can read the message type code.
-        while len(self._buf) > 1:
-            #LOG.debug("Searching message (len %d): %s... ",
-            #               len(self._buf), util.to_hex(self._buf,20))
-
+        while end - pos > 1:
             # Look for PLM slow down messages
-            start = self._buf.find(0x15)
-            if start == 0:
+            if buf[pos] == 0x15:
                 LOG.info("PLM is busy, pausing briefly")
                 self.set_wait_time(time.time() + .3)
-                self._buf = self._buf[1:]
+                pos += 1
                 continue
 
             # Find a message start token.  Note that this token could also
@@ -333,57 +452,63 @@ class Protocol:
             # starting token - we're probably reading at the start in the
             # middle of a message so just clear it and wait until we get a
             # start token.
-            start = self._buf.find(0x02)
+            start = buf.find(0x02, pos)
             if start == -1:
                 LOG.debug("No 0x02 starting byte found - clearing")
-                self._buf = bytearray()
-                break
-
-            # Move the buffer to the start token.  Make sure we still have at
-            # least 2 bytes or wait for more to arrive.
-            if start != 0:
-                LOG.debug("0x02 found at byte %d - shifting", start)
-                self._buf = self._buf[start:]
-                if len(self._buf) < 2:
+                return end
+
+            # Move the cursor to the start token.  Make sure we still have
+            # at least 2 bytes or wait for more to arrive.
+            if start != pos:
+                LOG.debug("0x02 found at byte %d - shifting", start - pos)
+                pos = start
+                if end - pos < 2:
                     break
 
             # Messages are [0x02,TYPE] so find map the type code to the
             # message class we need to use to read it.
-            msg_type = self._buf[1]
+            msg_type = buf[pos + 1]
             msg_class = Msg.types.get(msg_type, None)
             if not msg_class:
                 LOG.info("Skipping unknown message type %#04x", msg_type)
                 # Only dropping the first byte (0x02), as the second byte could
                 # be 0x02. Let the find function to locate the next 0x02
-                self._buf = self._buf[1:]
+                pos += 1
                 continue
 
             # See if we have enough bytes to read the message.  If not, wait
             # until more data is read.
-            msg_size = msg_class.msg_size(self._buf)
-            if len(self._buf) < msg_size:
+            raw = view[pos:]
+            msg_size = msg_class.msg_size(raw)
+            if end - pos < msg_size:
                 break
 
-            # Read the message and move the buffer forward.
+            # Read the message and move the cursor forward.
             try:
-                msg = msg_class.from_bytes(self._buf)
+                msg = msg_class.from_bytes(raw)
             except:
                 LOG.exception("Unknown message bytes sequence")
                 # Skip the initial 0x02 - this way if we got a weird message
                 # with a 0x02 in the message, we won't miss an actual message
                 # by moving msg_size bytes forward which could be wrong.
-                self._buf = self._buf[1:]
+                pos += 1
                 continue
 
-            self._buf = self._buf[msg_size:]
+            pos += msg_size
             LOG.info("Read %#04x: %s", msg_type, msg)
 
             if self._is_duplicate(msg):
                 LOG.info("Ignored duplicate %s", msg)
             else:
+                # Save the cursor first so if a handler raises, the message
+                # isn't parsed and processed again on the next read.
+                self._buf_pos = pos
+
                 # And try to process the message using the handlers.
                 self._process_msg(msg)
 
+        return pos
+
     #-----------------------------------------------------------------------
     def _is_duplicate(self, msg):
         """Check whether incomming message is a duplicate.
@@ -400,7 +525,7 @@ class Protocol:
         Returns:
           bool: True if this is a duplicate message, false otherwise
         """
-        if not isinstance(msg, Msg.InpStandard):  # Also matches InpExtended
+        if not isinstance(msg, Msg.InpStandard):
             return False
 
         current = time.time()
@@ -412,33 +537,37 @@ class Protocol:
         # are remaining on the inbound message.
         self.set_wait_time(msg.expire_time)
 
-        # See if we have a duplicate message.
-        if msg in self._read_history:
+        # See if we have a duplicate message.  Keys can still be in the map
+        # after they expire (see _remove_expired_read) so check the time.
+        key = msg.dedupe_key()
+        expire_time = self._read_history.get(key)
+        if expire_time is not None and current <= expire_time:
             return True
-        else:
-            self._read_history.append(msg)
-            return False
+
+        self._read_history[key] = msg.expire_time
+        self._read_expire.append((msg.expire_time, key))
+        return False
 
     #-----------------------------------------------------------------------
     def _remove_expired_read(self, t):
         """Removes old messages from the input message history.
 
         Removes messages which have expired from the input message history.
+        Messages are removed from the front of the read order.  Message
+        expire times depend on the number of hops so an unexpired message
+        can hold up the removal of later ones for a fraction of a second.
 
         Args:
           t (float): The current time.
         """
-        expired_idx = []
-
-        # Find all the messages where the current time is after the message
-        # expiration time.
-        for i, msg in enumerate(self._read_history):
-            if t > msg.expire_time:
-                expired_idx.append(i)
+        history = self._read_history
+        expire = self._read_expire
+        while expire and t > expire[0][0]:
+            expire_time, key = expire.popleft()
 
-        # Remove them in reverse order so that the list indices remain valid.
-        for i in reversed(expired_idx):
-            del self._read_history[i]
+            # Only remove the key if it wasn't read again after expiring.
+            if history.get(key) == expire_time:
+                del history[key]
 
     #-----------------------------------------------------------------------
     def _process_msg(self, msg):
@@ -459,8 +588,8 @@ class Protocol:
         # status is FINISHED, then the handler has seen all the messages it
         # expects. If it's CONTINUE, it processed the message but expects
         # more.  If it's UNKNOWN, the handler ignored that message.
-        if self._write_queue:
-            handler = self._write_queue[0].handler
+        if self._write_current:
+            handler = self._write_current.handler
             LOG.debug("Passing msg to write handler: %s", handler)
             status = handler.msg_received(self, msg)
 
@@ -509,12 +638,18 @@ class Protocol:
         The write handler is cleared and the next message in the queue is
         written.  It can also be called if the handler times out.
         """
-        assert self._write_queue
+        assert self._write_current
+
+        msg = self._write_current.msg
+        if isinstance(msg, Msg.OutStandard):  # also handles OutExtended
+            self._write_addr_count[msg.to_addr] -= 1
+            if self._write_addr_count[msg.to_addr] <= 0:
+                del self._write_addr_count[msg.to_addr]
 
-        self._write_queue.pop(0)
+        self._write_current = None
         self._write_status = WriteStatus.READY_TO_WRITE
 
-        if self._write_queue:
+        if any(self._write_queue):
             self._send_next_msg()
 
     #-----------------------------------------------------------------------
@@ -529,31 +664,33 @@ class Protocol:
                communicate with the PLM modem.
           data (bytes): The data that was written to the link.
         """
-        assert self._write_queue
+        assert self._write_current
         assert self._write_status == WriteStatus.PENDING_WRITE
 
-        # Set the status to show that the [0] message in the queue was
-        # written out.
+        # Set the status to show that the current message was written out.
         self._write_status = WriteStatus.WAIT_FOR_REPLY
 
         # Tell the handler that we've sent the message to update the current
         # time out time.
-        out = self._write_queue[0]
+        out = self._write_current
         out.handler.sending_message(out.msg)
 
     #-----------------------------------------------------------------------
     def _send_next_msg(self):
         """Send the next message in the write queue.
 
-        This grabs the first message in the queue and sets it into the
-        write_data field for later processing of replies.
+        This grabs the first message in the highest priority queue and sets
+        it as the current message for later processing of replies.
         """
         # Get the next output message and handler from the write queue.
-        out = self._write_queue[0]
+        queue = next(q for q in self._write_queue if q)
+        out = queue.popleft()
+        self._write_current = out
         msg_bytes = out.msg.to_bytes()
 
         LOG.info("Write message to modem: %s", out.msg)
-        LOG.debug("Write bytes to modem: %s", msg_bytes.hex())
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug("Write bytes to modem: %s", msg_bytes.hex())
 
         # Write the message to the PLM modem.  The message will only be sent
         # when the current time is after the next write time as tracked by
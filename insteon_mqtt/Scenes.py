@@ -115,86 +115,69 @@ class SceneManager:
                 # 3 Append only new responder
                 scene.append_responder(new_responder)
 
+    #-----------------------------------------------------------------------
+    def compress(self):
+        """Compress Scenes Down into a Human Readable Form
+
+        Runs compress_responders, compress_controllers, and compress_n_way
+        until a full round doesn't merge any more scenes.  Merging scenes by
+        one of the functions can allow more merges by the others.
+
+        Returns:
+          int:  The number of scenes that were merged.
+        """
+        total = 0
+        while True:
+            num = (self.compress_responders() + self.compress_controllers() +
+                   self.compress_n_way())
+            if not num:
+                return total
+            total += num
+
     #-----------------------------------------------------------------------
     def compress_controllers(self):
         """Compress Scenes Down into a Human Readable Form by Controllers
 
         Attempts to make things more readable to humans, by compressing
         scene defintions.  Any two definitions that have identical
-        controllers are merged.
+        responders are merged.
 
         This is a companion to compress_responders and compress_n_way.  These
         are seperate functions so that they can be called seperately using
-        Stacks.
-
-        This function only processes the scenes in a single pass.  If it runs
-        multiple passes, it may further compress things.  However, this
-        function is a bit time consuming, so can't keep looping through it.
-
-        """
-        i = 0
-        while i < len(self.entries):
-            found = False
-            test_scene = self.entries[i]
-            # Anything less than or equal to ourselves has already been tested
-            j = i + 1
-            while j < len(self.entries):
-                scene = self.entries[j]
-                j += 1
-                # Merge controllers that have identical responders
-                if Counter(test_scene.responders) == Counter(scene.responders):
-                    for new_controller in test_scene.controllers:
-                        scene.append_controller(new_controller)
-                    if test_scene.name is not None:
-                        scene.name = test_scene.name
-                    self.del_scene(test_scene)
-                    found = True
-                    break
-            if found is not True:
-                # if we found something we deleted the current entry so check
-                # this position again.
-                i += 1
+        Stacks.  Use compress() to run all of them until nothing changes.
+
+        Returns:
+          int:  The number of scenes that were merged.
+        """
+        def merge(scene, into):
+            for new_controller in scene.controllers:
+                into.append_controller(new_controller)
+
+        return self._merge_scenes(
+            lambda scene: self._signature(scene.responders), merge)
 
     #-----------------------------------------------------------------------
     def compress_responders(self):
         """Compress Scenes Down into a Human Readable Form by Responders
 
         Attempts to make things more readable to humans, by compressing scene
-        defintions.  Any two definitions that have identical responders are
+        defintions.  Any two definitions that have identical controllers are
         merged.
 
         This is a companion to compress_controllers and compress_n_way.
         These are seperate functions so that they can be called seperately
-        using Stacks.
-
-        This function only processes the scenes in a single pass.  If it runs
-        multiple passes, it may further compress things.  However, this
-        function is a bit time consuming, so can't keep looping through it.
-
-        """
-        i = 0
-        while i < len(self.entries):
-            found = False
-            test_scene = self.entries[i]
-            # Anything less than or equal to ourselves has already been tested
-            j = i + 1
-            while j < len(self.entries):
-                scene = self.entries[j]
-                j += 1
-                # Merge responders that have identical controllers
-                test_ctrls = test_scene.controllers
-                if Counter(test_ctrls) == Counter(scene.controllers):
-                    for new_responder in test_scene.responders:
-                        scene.append_responder(new_responder)
-                    if test_scene.name is not None:
-                        scene.name = test_scene.name
-                    self.del_scene(test_scene)
-                    found = True
-                    break
-            if found is not True:
-                # if we found something we deleted the current entry so check
-                # this position again.
-                i += 1
+        using Stacks.  Use compress() to run all of them until nothing
+        changes.
+
+        Returns:
+          int:  The number of scenes that were merged.
+        """
+        def merge(scene, into):
+            for new_responder in scene.responders:
+                into.append_responder(new_responder)
+
+        return self._merge_scenes(
+            lambda scene: self._signature(scene.controllers), merge)
 
     #-----------------------------------------------------------------------
     def compress_n_way(self):
@@ -202,69 +185,84 @@ class SceneManager:
 
         Attempts to make things more readable to humans, by compressing scene
         defintions.  3-way or N-way links are compressed into a single
-        definition..
+        definition.  Two scenes can be merged if all the devices (ctrl &
+        resp) appear on both of them.  Only the address and group of the
+        devices are compared.
 
         This is a companion to compress_responders and compress_controllers.
         These are seperate functions so that they can be called seperately
-        using Stacks.
-
-        This function only processes the scenes in a single pass.  If it runs
-        multiple passes, it may further compress things.  However, this
-        function is a bit time consuming, so can't keep looping through it.
-
-        """
-        i = 0
-        while i < len(self.entries):
-            found = False
-            test_scene = self.entries[i]
-            # Anything less than or equal to ourselves has already been tested
-            j = i + 1
-            while j < len(self.entries):
-                scene = self.entries[j]
-                j += 1
-                # Merge n-way switches
-                if self._can_merge_n_way(test_scene, scene):
-                    for new_controller in test_scene.controllers:
-                        scene.append_controller(new_controller)
-                    for new_responder in test_scene.responders:
-                        scene.append_responder(new_responder)
-                    if test_scene.name is not None:
-                        scene.name = test_scene.name
-                    self.del_scene(test_scene)
-                    found = True
-                    break
-            if found is not True:
-                # if we found something we deleted the current entry so check
-                # this position again.
-                i += 1
+        using Stacks.  Use compress() to run all of them until nothing
+        changes.
+
+        Returns:
+          int:  The number of scenes that were merged.
+        """
+        def merge(scene, into):
+            for new_controller in scene.controllers:
+                into.append_controller(new_controller)
+            for new_responder in scene.responders:
+                into.append_responder(new_responder)
+
+        def signature(scene):
+            return frozenset((i.addr, i.group) for i in
+                             scene.controllers + scene.responders)
+
+        return self._merge_scenes(signature, merge)
 
     #-----------------------------------------------------------------------
-    def _can_merge_n_way(self, lhs, rhs):
-        """Determines Whether two Scenes Can be Merged as N-Way Scenes
+    @staticmethod
+    def _signature(devices):
+        """Returns a Hashable Signature of a List of Scene Devices
+
+        Two lists have the same signature if they have the same devices
+        (using SceneDevice equality) the same number of times in any order.
 
-        The test is whether all of the devices (ctrl & resp) appear on both
-        the left and right side
+        Args:
+          devices (list):  The SceneDevice objects.
 
         Returns:
-          True if they are N-way compatible, False otherwise
-        """
-        for controller in lhs.controllers:
-            if (rhs.find_controller(controller) is None and
-                    rhs.find_responder(controller) is None):
-                return False
-        for responder in lhs.responders:
-            if (rhs.find_controller(responder) is None and
-                    rhs.find_responder(responder) is None):
-                return False
-        for controller in rhs.controllers:
-            if (lhs.find_controller(controller) is None and
-                    lhs.find_responder(controller) is None):
-                return False
-        for responder in rhs.responders:
-            if (lhs.find_controller(responder) is None and
-                    lhs.find_responder(responder) is None):
-                return False
-        return True
+          frozenset:  The signature.
+        """
+        return frozenset(Counter(i.key for i in devices).items())
+
+    #-----------------------------------------------------------------------
+    def _merge_scenes(self, signature, merge):
+        """Merges all the Scenes that Have the Same Signature
+
+        The scenes are grouped by signature in a single pass so this is
+        linear in the number of scenes.  The scenes in a group are merged in
+        order into the next scene in the group so everything ends up in the
+        last scene of the group.  The name of the first named scene in the
+        group is kept.
+
+        Args:
+          signature:  Function that takes a SceneEntry and returns a hashable
+                      signature.  Scenes w/ the same signature are merged.
+                      Merging must not change the signature of the scene.
+          merge:  Function that takes the SceneEntry to merge and the
+                  SceneEntry to merge it into.
+
+        Returns:
+          int:  The number of scenes that were merged.
+        """
+        groups = {}
+        for index, scene in enumerate(self.entries):
+            groups.setdefault(signature(scene), []).append((index, scene))
+
+        removed = []
+        for group in groups.values():
+            for (index, scene), (_, into) in zip(group, group[1:]):
+                merge(scene, into)
+                if scene.name is not None:
+                    into.name = scene.name
+                removed.append(index)
+
+        # Delete from the end so the indexes stay valid.
+        for index in sorted(removed, reverse=True):
+            del self.data[index]
+            del self.entries[index]
+
+        return len(removed)
 
     #-----------------------------------------------------------------------
     def _load(self):
@@ -767,6 +765,18 @@ class SceneDevice:
     def __hash__(self):
         return hash(str(self))
 
+    @property
+    def key(self):
+        """Returns a Hashable Key for the Device
+
+        Devices that are equal (see __eq__) have the same key.  Used by the
+        compress_* functions to build scene signatures.
+
+        Returns:
+          (tuple): The address, group, and data1-3 values.
+        """
+        return (self.addr, self.group, tuple(self.link_data))
+
     @property
     def style(self):
         """Returns the Style Type of the Raw Data
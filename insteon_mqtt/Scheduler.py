@@ -0,0 +1,136 @@
+#===========================================================================
+#
+# Time ordered scheduling queue.
+#
+#===========================================================================
+import heapq
+import itertools
+
+
+class Scheduler:
+    """Time ordered queue of items.
+
+    This stores arbitrary items along with the time at which they are due.
+    It's used by the Protocol class for timed messages and by the
+    network.TimedCall class for scheduled function calls.
+
+    Items are stored in a heap so adding an item is O(log n).  Removing an
+    item is O(1) - the heap entry is marked as removed (a tombstone) and is
+    discarded later when it reaches the top of the heap.  Items with the
+    same time are returned in the order they were added.
+
+        sched = Scheduler()
+        entry = sched.add(time.time() + 5, item)
+        ...
+        for item in sched.pop_due(time.time()):
+            # process item
+    """
+    # Marker stored in heap entries that have been removed or popped.
+    _REMOVED = object()
+
+    #-----------------------------------------------------------------------
+    def __init__(self):
+        """Constructor
+        """
+        # Heap of [time, sequence, item] lists.  The sequence number keeps
+        # the sort stable and insures the items themselves are never
+        # compared.
+        self._heap = []
+        self._counter = itertools.count()
+
+        # Number of active (not removed) entries in the heap.
+        self._size = 0
+
+    #-----------------------------------------------------------------------
+    def add(self, time, item):
+        """Add an item to the queue.
+
+        Args:
+          time (float):  Unix clock time tag at which the item is due.
+          item:  The item to store.
+
+        Returns:
+          Returns the queue entry.  Pass this to remove() to remove the item
+          from the queue.
+        """
+        entry = [time, next(self._counter), item]
+        heapq.heappush(self._heap, entry)
+        self._size += 1
+        return entry
+
+    #-----------------------------------------------------------------------
+    def remove(self, entry):
+        """Remove an item from the queue.
+
+        Args:
+          entry:  The entry returned by add().
+
+        Returns:
+          bool:  Returns True if the item was removed.  False if the item
+                 was already popped or removed.
+        """
+        if entry[2] is self._REMOVED:
+            return False
+
+        entry[2] = self._REMOVED
+        self._size -= 1
+
+        # If the heap is mostly tombstones, rebuild it so removed entries
+        # don't accumulate.
+        if len(self._heap) > 2 * self._size + 16:
+            self._heap = [i for i in self._heap if i[2] is not self._REMOVED]
+            heapq.heapify(self._heap)
+
+        return True
+
+    #-----------------------------------------------------------------------
+    def next_time(self):
+        """Return the time of the next item that is due.
+
+        Returns:
+          float:  Returns the time of the earliest item or None if the queue
+                  is empty.
+        """
+        heap = self._heap
+        while heap and heap[0][2] is self._REMOVED:
+            heapq.heappop(heap)
+
+        return heap[0][0] if heap else None
+
+    #-----------------------------------------------------------------------
+    def pop_due(self, t):
+        """Remove and return all the items that are due.
+
+        Args:
+          t (float):  Current Unix clock time tag.  Items with a time <= t
+            are returned.
+
+        Returns:
+          list:  Returns the due items in time order.
+        """
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= t:
+            entry = heapq.heappop(heap)
+            if entry[2] is not self._REMOVED:
+                due.append(entry[2])
+                entry[2] = self._REMOVED
+                self._size -= 1
+
+        return due
+
+    #-----------------------------------------------------------------------
+    def items(self):
+        """Return all the active items in time order.
+
+        Returns:
+          list:  Returns the list of items.
+        """
+        return [i[2] for i in sorted(self._heap)
+                if i[2] is not self._REMOVED]
+
+    #-----------------------------------------------------------------------
+    def __len__(self):
+        return self._size
+
+    #-----------------------------------------------------------------------
@@ -29,4 +29,5 @@ from .Address import Address
 from .CommandSeq import CommandSeq
 from .Modem import Modem
 from .Protocol import Protocol
+from .Scheduler import Scheduler
 from .Signal import Signal
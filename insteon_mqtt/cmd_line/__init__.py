@@ -12,8 +12,10 @@ or send a variety of commands to a running server process.
 """
 
 #===========================================================================
+from . import batch
 from . import device
 from . import modem
+from . import storage
 from . import util
 
 from .main import main
@@ -0,0 +1,97 @@
+#===========================================================================
+#
+# Batch commands
+#
+#===========================================================================
+import shlex
+import sys
+import time
+from . import start
+from . import util
+
+
+#===========================================================================
+def batch(args, config):
+    """Run multiple commands using one broker connection.
+
+    Each line of the input file (or stdin) is a regular command line w/o the
+    config file (e.g. 'on aa.bb.cc' or 'refresh --force aa.bb.cc').  Blank
+    lines and lines starting with '#' are skipped.  Lines are read as
+    they're needed so this can also be used interactively.  Commands are
+    sent as soon as they're read and up to args.jobs commands can be running
+    at once.
+
+    Args:
+      args:    The parsed command line arguments.  args.parse_args is the
+               function to parse each line with (see main.parse_args).
+      config:  (dict) Configuration dictionary.
+
+    Returns:
+      int:  Returns 0 if every command succeeded.  Otherwise -1.
+    """
+    if args.file == "-":
+        return _run(args, config, sys.stdin)
+
+    with open(args.file, encoding="utf-8") as lines:
+        return _run(args, config, lines)
+
+
+#===========================================================================
+def _run(args, config, lines):
+    """Run the commands from a file.
+
+    Args:
+      args:    The parsed command line arguments.
+      config:  (dict) Configuration dictionary.
+      lines:   The file of commands to read.
+
+    Returns:
+      int:  Returns 0 if every command succeeded.  Otherwise -1.
+    """
+    client = util.Client(config, args.jobs, args.quiet)
+    util.CLIENT = client
+    start_time = time.time()
+    errors = 0
+    try:
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            try:
+                cmd_args = args.parse_args([args.config] + shlex.split(line))
+            except (SystemExit, ValueError):
+                # argparse prints the error.
+                print("Invalid command: %s" % line)
+                errors += 1
+                continue
+
+            if cmd_args.func in (batch, start.start):
+                print("Command can't be run in batch mode: %s" % line)
+                errors += 1
+                continue
+
+            if hasattr(args, "topic"):
+                cmd_args.topic = args.topic
+
+            # Commands send using util.send() which uses the client and
+            # returns w/o waiting for the reply.
+            client.label = line
+            cmd_args.func(cmd_args, config)
+
+        client.wait()
+    finally:
+        util.CLIENT = None
+        client.close()
+
+    sessions = client.finished
+    errors += sum(1 for i in sessions if i["status"])
+    if not args.quiet and sessions:
+        print("%d commands, %d errors in %.3f sec, average latency %.3f sec"
+              % (len(sessions), errors, time.time() - start_time,
+                 sum(i["latency"] for i in sessions) / len(sessions)))
+
+    return -1 if errors else 0
+
+
+#===========================================================================
@@ -5,10 +5,13 @@
 #===========================================================================
 import argparse
 import sys
+import time
 from .. import config
+from . import batch
 from . import device
 from . import modem
 from . import start
+from . import storage
 
 
 def parse_args(args):
@@ -31,6 +34,9 @@ def parse_args(args):
     sp.add_argument("--level", metavar="log_level", type=int,
                     help="Logging level to use.  10=debug, 20=info,"
                     "30=warn, 40=error, 50=critical")
+    sp.add_argument("--event-loop", choices=["poll", "asyncio"],
+                    default="poll", help="Network event loop to use.  The "
+                    "default uses poll (select on Windows).")
     sp.set_defaults(func=start.start)
 
     #---------------------------------------
@@ -410,6 +416,32 @@ def parse_args(args):
                     help="Don't print any command results to the screen.")
     sp.set_defaults(func=device.set_low_battery_voltage)
 
+    #---------------------------------------
+    # storage.export_db
+    sp = sub.add_parser("export-db", help="Export the databases in the "
+                        "SQLite storage to JSON files.  Use this before "
+                        "switching storage_format back to json.")
+    sp.add_argument("-o", "--output", metavar="dir", help="Directory to "
+                    "write the files to.  Defaults to the storage "
+                    "directory.")
+    sp.add_argument("-q", "--quiet", action="store_true",
+                    help="Don't print any command results to the screen.")
+    sp.set_defaults(func=storage.export_db)
+
+    #---------------------------------------
+    # batch.batch
+    sp = sub.add_parser("batch", help="Run commands from a file or stdin "
+                        "using one connection to the broker.  Each line is "
+                        "a command w/o the config file (e.g. 'on aa.bb.cc').")
+    sp.add_argument("file", nargs="?", default="-", help="File of commands "
+                    "to run.  Defaults to stdin.")
+    sp.add_argument("-j", "--jobs", type=int, default=4, help="Number of "
+                    "commands to run at the same time.")
+    sp.add_argument("-q", "--quiet", action="store_true",
+                    help="Don't print the command times and summary.")
+    # The batch command parses each line w/ this function.
+    sp.set_defaults(func=batch.batch, parse_args=parse_args)
+
     return p.parse_args(args)
 
 
@@ -417,8 +449,11 @@ def parse_args(args):
 def main(mqtt_converter=None):
     args = parse_args(sys.argv[1:])
 
-    # Load the configuration file.
+    # Load the configuration file.  The time is logged by the start
+    # command.
+    start_time = time.time()
     cfg = config.load(args.config)
+    args.config_time = time.time() - start_time
 
     topic = cfg.get("mqtt", {}).get("cmd_topic", None)
     if topic:
@@ -3,6 +3,7 @@
 # Start the main server
 #
 #===========================================================================
+import signal
 from .. import config
 from .. import log
 from .. import mqtt
@@ -10,6 +11,8 @@ from .. import network
 from ..Modem import Modem
 from ..Protocol import Protocol
 
+LOG = log.get_logger()
+
 
 def start(args, cfg):
     """Main start command
@@ -28,21 +31,22 @@ def start(args, cfg):
     # inputs or the config file.  If these vars are None, then the
     # config file logging data is used.
     log.initialize(args.level, args.log_screen, args.log, config=cfg)
+    LOG.info("Startup time: config parse %.3f sec",
+             getattr(args, "config_time", 0.0))
 
     # Create the network event loop and MQTT and serial modem clients.
-    loop = network.Manager()
+    if args.event_loop == "asyncio":
+        loop = network.AsyncManager()
+    else:
+        loop = network.Manager()
     mqtt_link = network.Mqtt()
     stack_link = network.Stack()
 
-    # Setup the PLM or Hub
+    # Setup the PLM or Hub.  The Hub reports the time it needs to be polled
+    # to the network manager so the select/poll time out doesn't need to be
+    # changed.
     use_hub = cfg['insteon'].get('use_hub', False)
-    time_out = None
     if use_hub:
-        # This reduces the time that the select/poll call will block. The
-        # default of None is 3 seconds.  A half a second is the same speed at
-        # which we query the hub for incoming messages. If that rate is
-        # changed, consider changing this as well.
-        time_out = .5
         plm_link = network.Hub()
         loop.add_poll(plm_link)
     else:
@@ -64,9 +68,37 @@ def start(args, cfg):
     modem = Modem(insteon, stack_link, timed_link)
     mqtt_handler = mqtt.Mqtt(mqtt_link, modem)
 
+    # The database saver delays database file writes while it's in the
+    # event loop.
+    loop.add_poll(modem.saver)
+
     # Load the configuration data into the objects.
     config.apply(cfg, mqtt_handler, modem)
 
-    # Start the network event loop.
-    while loop.active():
-        loop.select(time_out=time_out)
+    # Docker, systemd, and hassio stop the server w/ SIGTERM.  Exit normally
+    # in that case so the clean up below is run.
+    signal.signal(signal.SIGTERM, _terminate)
+
+    # Start the network event loop.  Make sure any unsaved database changes
+    # are written and any delayed MQTT messages are sent on the way out.
+    try:
+        while loop.active():
+            loop.select()
+    finally:
+        modem.saver.close()
+        mqtt_handler.close()
+        plm_link.close()
+
+
+#===========================================================================
+def _terminate(signum, frame):
+    """SIGTERM handler.
+
+    Raises SystemExit so the shutdown code in start() is run.
+
+    Args:
+      signum (int):  The signal number.
+      frame:  The current stack frame.
+    """
+    LOG.info("Received signal %d, shutting down", signum)
+    raise SystemExit(0)
@@ -0,0 +1,30 @@
+#===========================================================================
+#
+# Database storage commands
+#
+#===========================================================================
+import os
+from .. import db
+
+
+#===========================================================================
+def export_db(args, config):
+    save_path = config['insteon']['storage']
+    path = os.path.join(save_path, db.Store.file_name)
+    if not os.path.exists(path):
+        print("SQLite database storage %s doesn't exist" % path)
+        return -1
+
+    out_dir = args.output if args.output else save_path
+    store = db.Store(path)
+    try:
+        num = store.export_json(out_dir)
+    finally:
+        store.close()
+
+    if not args.quiet:
+        print("Exported %d databases to %s" % (num, out_dir))
+    return 0
+
+
+#===========================================================================
@@ -5,6 +5,7 @@
 #===========================================================================
 import json
 import random
+import threading
 import time
 import paho.mqtt.client as mqtt
 from ..mqtt import Reply
@@ -14,6 +15,9 @@ from ..mqtt import Reply
 # there is no pure right answer for what this should be.
 TIME_OUT = 30
 
+# Persistent client used by send() if it's set.  See batch.batch().
+CLIENT = None
+
 
 #===========================================================================
 def send(config, topic, payload, quiet=False):
@@ -29,8 +33,12 @@ def send(config, topic, payload, quiet=False):
 
     Returns:
       Returns the session reply object.  This is a dict with the results of the
-      command.
+      command.  If CLIENT is set, the command is sent using it and the
+      session is returned right away.  See Client.send().
     """
+    if CLIENT is not None:
+        return CLIENT.send(topic, payload, quiet)
+
     session = {
         "result" : None,
         "done" : False,
@@ -99,16 +107,226 @@ def callback(client, session, message):
     if reply.type == Reply.Type.END:
         session["done"] = True
 
-    # Print messages to the screen.
+    # Print messages to the screen.  Batch sessions have a prefix to show
+    # which command the message is for.
     elif reply.type == Reply.Type.MESSAGE:
         # quiet = 0 or 2: show messages
         if quiet != 1:
-            print(reply.data)
+            print(session.get("prefix", "") + str(reply.data))
 
     elif reply.type == Reply.Type.ERROR:
         session["status"] = -1
         if quiet != 1:
-            print('ERROR:', reply.data)
+            print(session.get("prefix", "") + 'ERROR:', reply.data)
+
+
+#===========================================================================
+class Client:
+    """Persistent command line MQTT client.
+
+    This keeps one connection to the broker open and sends multiple commands
+    with it.  Up to max_sessions commands can be running at the same time.
+    Each command gets it's own session topic so the replies are routed to
+    the right session and printed with the session prefix as they arrive.
+    When a session finishes, the time from sending the command to the end
+    reply is printed.
+
+    The network traffic is handled by the paho client thread so replies and
+    keep alive messages are processed while the caller is waiting for input.
+    The session data is shared w/ that thread so it's only accessed while
+    holding the lock.
+    """
+    def __init__(self, config, max_sessions=4, quiet=False):
+        """Constructor
+
+        Args:
+          config:   (dict) Configuration dictionary.  The MQTT broker and
+                    connection information is read from this.
+          max_sessions:  (int) Maximum number of commands to run at once.
+          quiet:    (bool) True to not print the session latencies.
+        """
+        self.max_sessions = max(1, max_sessions)
+        self.quiet = quiet
+
+        # Map of session topic -> session dict.
+        self.sessions = {}
+
+        # Finished session dicts in the order they finished.
+        self.finished = []
+
+        # Description of the next command to print w/ the results.  If this
+        # is None, the command name is used.
+        self.label = None
+
+        # Lock for the session data.  This is notified when a session
+        # finishes.
+        self._lock = threading.Condition()
+
+        # Topics of the finished sessions to unsubscribe from.  The client
+        # isn't called while holding the lock so the network thread can't
+        # block on it while the client is busy.
+        self._unsub = []
+
+        self.client = mqtt.Client()
+        self.client.on_message = self._on_message
+
+        # Add user/password if the config file has them set.
+        if config["mqtt"].get("username", None):
+            user = config["mqtt"]["username"]
+            password = config["mqtt"].get("password", None)
+            self.client.username_pw_set(user, password)
+
+        self.client.connect(config["mqtt"]["broker"], config["mqtt"]["port"])
+        self.client.loop_start()
+
+    #-----------------------------------------------------------------------
+    def send(self, topic, payload, quiet=False):
+        """Send a command.
+
+        If max_sessions commands are already running, this waits for one
+        of them to finish first.
+
+        Args:
+          topic:    (str) The MQTT topic string.
+          payload:  (dict) Message payload dictionary.
+          quiet:    0: show all messages.  1: show no messages.  2: show only
+                    the reply messages.
+
+        Returns:
+          Returns the session object.  This is updated with the results as
+          the replies arrive.
+        """
+        id = str(random.getrandbits(32))
+        payload["session"] = id
+
+        # Session topic - this must match the servers definition of the
+        # session topic.
+        rtn_topic = "%s/session/%s" % (topic, id)
+
+        with self._lock:
+            while len(self.sessions) >= self.max_sessions:
+                self.loop()
+
+            num = len(self.sessions) + len(self.finished) + 1
+            now = time.time()
+            session = {
+                "result" : None,
+                "done" : False,
+                "status" : 0,  # 0 == success
+                "quiet" : int(quiet),
+                "prefix" : "[%d] " % num,
+                "label" : self.label or payload.get("cmd"),
+                "start_time" : now,
+                "end_time" : now + TIME_OUT,
+                }
+            self.sessions[rtn_topic] = session
+
+        self._unsubscribe()
+        self.client.subscribe(rtn_topic)
+        self.client.publish(topic, json.dumps(payload), qos=2)
+        return session
+
+    #-----------------------------------------------------------------------
+    def wait(self):
+        """Wait for all the running commands to finish.
+        """
+        with self._lock:
+            while self.sessions:
+                self.loop()
+
+        self._unsubscribe()
+
+    #-----------------------------------------------------------------------
+    def loop(self, timeout=0.5):
+        """Wait for a session to finish and time out any stalled sessions.
+
+        The lock must be held when calling this.
+
+        Args:
+          timeout:  (float) Time in seconds to wait for a session to finish.
+        """
+        self._lock.wait(timeout)
+
+        now = time.time()
+        for topic, session in list(self.sessions.items()):
+            if now >= session["end_time"]:
+                session["status"] = -1
+                print("%sCommand line timed out waiting for a reply, the "
+                      "command may still be running." % session["prefix"])
+                self._finish(topic, session, now)
+
+    #-----------------------------------------------------------------------
+    def close(self):
+        """Disconnect from the broker.
+        """
+        self.client.disconnect()
+        self.client.loop_stop()
+
+    #-----------------------------------------------------------------------
+    def _unsubscribe(self):
+        """Unsubscribe from the finished session topics.
+
+        The lock must not be held when calling this.
+        """
+        with self._lock:
+            topics = self._unsub
+            self._unsub = []
+
+        for topic in topics:
+            self.client.unsubscribe(topic)
+
+    #-----------------------------------------------------------------------
+    def _finish(self, topic, session, now):
+        """Finish a session.
+
+        The lock must be held when calling this.  The topic is
+        unsubscribed from later by _unsubscribe().
+
+        Args:
+          topic:    (str) The session topic.
+          session:  (dict) The session to finish.
+          now:      (float) The time the session finished.
+        """
+        del self.sessions[topic]
+        self._unsub.append(topic)
+        session["latency"] = now - session["start_time"]
+        self.finished.append(session)
+        self._lock.notify_all()
+
+        if not self.quiet:
+            print("%s%s %s in %.3f sec" % (
+                session["prefix"], session["label"],
+                "failed" if session["status"] else "done",
+                session["latency"]))
+
+    #-----------------------------------------------------------------------
+    def _on_message(self, client, data, message):
+        """MQTT message callback.
+
+        This is called by the paho client thread.  The session is finished
+        when the end reply arrives so the latency doesn't include any time
+        spent waiting for input.
+
+        Args:
+          client:   The MQTT client.
+          data:     User data (unused).
+          message:  The incoming message.
+        """
+        now = time.time()
+        with self._lock:
+            session = self.sessions.get(message.topic, None)
+            if session is None:
+                return
+
+            callback(client, session, message)
+            if not session["done"]:
+                return
+
+            self._finish(message.topic, session, now)
+
+        self._unsubscribe()
+
+    #-----------------------------------------------------------------------
 
 
 #===========================================================================
@@ -5,13 +5,13 @@
 #===========================================================================
 import io
 import itertools
-import json
 from ..Address import Address
 from .. import catalog
 from ..CommandSeq import CommandSeq
 from .. import handler
 from .DeviceEntry import DeviceEntry
 from .DbDiff import DbDiff
+from .Saver import Saver
 from .. import log
 from .. import message as Msg
 from .. import util
@@ -41,7 +41,7 @@ class Device:
     """
 
     @staticmethod
-    def from_json(data, path, device):
+    def from_json(data, path, device, saver=None):
         """Read a Device database from a JSON input.
 
         The inverse of this is to_json().
@@ -51,26 +51,16 @@ class Device:
           path:   (str) The file to save the database to when changes are
                   made.
           device: (Device) The device object.
+          saver:  (Saver) The saver to write the database with.
         Returns:
           Device: Returns the created Device object.
         """
         # Create the basic database object.
-        obj = Device(Address(data['address']), path, device)
+        obj = Device(Address(data['address']), path, device, saver)
 
         # Extract the various files from the JSON data.
-        obj.delta = data['delta']
-        obj.engine = data.get('engine', None)
-
-        # Load the category fields and turn them into description objecdt.
-        dev_cat = data.get('dev_cat', None)
-        sub_cat = data.get('sub_cat', None)
-        obj.desc = None
-        if dev_cat is not None:
-            obj.desc = catalog.find(dev_cat, sub_cat)
-
-        obj.firmware = data.get('firmware', None)
         # pylint: disable=protected-access
-        obj._meta = data.get('meta', {})
+        obj._info_from_json(data)
 
         for d in data['used']:
             obj.add_entry(DeviceEntry.from_json(d, db=obj), save=False)
@@ -96,7 +86,7 @@ class Device:
         return obj
 
     #-----------------------------------------------------------------------
-    def __init__(self, addr, path=None, device=None):
+    def __init__(self, addr, path=None, device=None, saver=None):
         """Constructor
 
         Args:
@@ -105,9 +95,13 @@ class Device:
           path:  (str) The file to save the database to when changes are
                  made.
           device: (Device) The device object.
+          saver:  (Saver) The saver to write the database with.  This is
+                  normally the modem saver.  If None, a saver is created
+                  which writes the file right away.
         """
         self.addr = addr
         self.save_path = path
+        self.saver = saver if saver is not None else Saver()
 
         # All link delta number.  This is incremented by the device when the
         # db changes on the device.  It's returned in a refresh (cmd=0x19)
@@ -154,9 +148,51 @@ class Device:
         # that group command.
         self.groups = {}
 
+        # Indexes of the active entries to speed up find() and find_all().
+        # _index is (Address, group, is_controller) -> {mem_loc: DeviceEntry}
+        # and _addr_index is Address -> {mem_loc: DeviceEntry}.  _index_keys
+        # is mem_loc -> key that the entry was indexed with.  Entries can be
+        # modified in place so the stored key is used to remove the entry
+        # from the indexes.
+        self._index = {}
+        self._addr_index = {}
+        self._index_keys = {}
+
+        # Local change counter.  This is incremented every time the entries
+        # change so cached lookups (see Modem.find_group_devices) can tell
+        # if they are out of date.
+        self.revision = 0
+
         # Link to the Modem device
         self.device = device
 
+    #-----------------------------------------------------------------------
+    def replay(self, changes):
+        """Apply a list of changes read from a journal.
+
+        This is used when loading the database to apply the changes that
+        were made after the database file was written (see Journal).  The
+        changes are:
+
+        - ["add", entry]:  Add the DeviceEntry JSON data.
+        - ["info", info]:  Set the delta, engine, model, and meta data.
+        - ["clear"]:  Clear the database.
+
+        Args:
+          changes:  (list) The list of changes to apply.
+        """
+        for change in changes:
+            if change[0] == "add":
+                entry = DeviceEntry.from_json(change[1], db=self)
+                self.add_entry(entry, save=False)
+            elif change[0] == "info":
+                self._info_from_json(change[1])
+            elif change[0] == "clear":
+                self.clear(save=False)
+            else:
+                LOG.warning("Ignoring unknown %s db change: %s", self.addr,
+                            change)
+
     #-----------------------------------------------------------------------
     def is_current(self, delta):
         """See if the database is current.
@@ -184,7 +220,7 @@ class Device:
         if self.delta is not None:
             self.delta += 1
             self.delta = self.delta % 256  # Roll over db if it goes past 256
-            self.save()
+            self._changed(["info", self._info_to_json()])
 
     #-----------------------------------------------------------------------
     def set_engine(self, engine):
@@ -198,7 +234,7 @@ class Device:
         """
         self.engine = engine
         if engine is not None:
-            self.save()
+            self._changed(["info", self._info_to_json()])
 
     #-----------------------------------------------------------------------
     def set_info(self, dev_cat, sub_cat, firmware):
@@ -241,7 +277,7 @@ class Device:
         """
         self.desc = catalog.find(dev_cat, sub_cat)
         self.firmware = firmware
-        self.save()
+        self._changed(["info", self._info_to_json()])
 
     #-----------------------------------------------------------------------
     def set_meta(self, key, value):
@@ -255,7 +291,7 @@ class Device:
           value:  A data type capable of being represented in json
         """
         self._meta[key] = value
-        self.save()
+        self._changed(["info", self._info_to_json()])
 
     #-----------------------------------------------------------------------
     def get_meta(self, key):
@@ -270,19 +306,27 @@ class Device:
         return self._meta.get(key, None)
 
     #-----------------------------------------------------------------------
-    def clear(self):
+    def clear(self, save=True):
         """Clear the cached database of entries
 
         This also saves the empty database to file.  It does NOT modify
         the database on the device.  Nor does it clear the meta entries in
         the database file.
+
+        Args:
+          save:  (bool) If True, save the database.
         """
         self.delta = None
         self.entries.clear()
         self.unused.clear()
         self.groups.clear()
+        self._index.clear()
+        self._addr_index.clear()
+        self._index_keys.clear()
+        self.revision += 1
         self.last.mem_loc = START_MEM_LOC
-        self.save()
+        if save:
+            self._changed(["clear"])
 
     #-----------------------------------------------------------------------
     def set_path(self, path):
@@ -295,16 +339,35 @@ class Device:
         self.save_path = path
 
     #-----------------------------------------------------------------------
-    def save(self):
+    def save(self, flush=False):
         """Save the database.
 
-        If a save path wasn't set, nothing is done.
+        If a save path wasn't set, nothing is done.  The file is written by
+        the write-behind Saver so multiple changes in a row only write the
+        file once.
+
+        Args:
+          flush:  (bool) If True, write the file now.
+        """
+        if not self.save_path:
+            return
+
+        self.saver.save(self, flush)
+
+    #-----------------------------------------------------------------------
+    def _changed(self, change):
+        """Save a change to the database.
+
+        If a save path wasn't set, nothing is done.  The change is appended
+        to the journal if it's enabled.  Otherwise the database is saved.
+
+        Args:
+          change:  (list) The change in replay() format.
         """
         if not self.save_path:
             return
 
-        with open(self.save_path, "w") as f:
-            json.dump(self.to_json(), f, indent=2)
+        self.saver.record(self, change)
 
     #-----------------------------------------------------------------------
     def __len__(self):
@@ -384,6 +447,42 @@ class Device:
         else:
             self._add_using_new(addr, group, is_controller, data, on_done)
 
+    #-----------------------------------------------------------------------
+    def replace_on_device(self, entry, addr, group, is_controller, data,
+                          on_done=None):
+        """Overwrite an entry on the Insteon device with a different link.
+
+        The new link is written to the memory location of the input entry.
+        This takes a single write instead of deleting the entry and then
+        adding the new link.  If that command succeeds, the new DeviceEntry
+        replaces the input entry in the database.
+
+        IMPORTANT: Multiple calls to this method are NOT possible.  You must
+        chain calls together using a CommandSeq object to insure that the
+        first call finishes before another one is made.
+
+        Args:
+          entry:         (DeviceEntry) The entry to overwrite.
+          addr:          (Address) The address of the device in the database.
+          group:         (int) The group the entry is for.
+          is_controller: (bool) True if the device is a controller.
+          data:          (bytes) 3 data bytes.  See add_on_device().
+          on_done:       Optional callback which will be called when the
+                         command completes.
+        """
+        addr = Address(addr)
+        group = int(group)
+        data = data if data else bytes(3)
+        on_done = util.make_callback(on_done)
+
+        LOG.info("Device %s replacing db: %s grp %s %s D: %s", self.addr,
+                 addr, group, util.ctrl_str(is_controller), data.hex())
+
+        # Copy the entry so the database isn't changed unless the write
+        # works.
+        self._add_using_unused(addr, group, is_controller, data, on_done,
+                               entry.copy())
+
     #-----------------------------------------------------------------------
     def delete_on_device(self, entry, on_done=None):
         """Delete an entry on the Insteon device.
@@ -465,13 +564,13 @@ class Device:
         addr = Address(addr)
         group = int(group)
 
-        for e in self.entries.values():
-            # Address, group, and is_controller must match.  group has to
-            # match data[2] if it was input.
-            if (e.addr == addr and e.group == group and
-                    e.is_controller == is_controller and
-                    (local_group is None or local_group == e.data[2])):
-                return e
+        # Address, group, and is_controller must match.  group has to match
+        # data[2] if it was input.
+        entries = self._index.get((addr, group, bool(is_controller)))
+        if entries:
+            for e in entries.values():
+                if local_group is None or local_group == e.data[2]:
+                    return e
 
         return None
 
@@ -506,8 +605,19 @@ class Device:
         addr = None if addr is None else Address(addr)
         group = None if group is None else int(group)
 
+        # Use the indexes to limit the entries that need to be checked.
+        if (addr is not None and group is not None and
+                is_controller is not None):
+            entries = self._index.get((addr, group, bool(is_controller)), {})
+            return list(entries.values())
+
+        if addr is not None:
+            entries = self._addr_index.get(addr, {}).values()
+        else:
+            entries = self.entries.values()
+
         results = []
-        for e in self.entries.values():
+        for e in entries:
             if addr is not None and e.addr != addr:
                 continue
             if group is not None and e.group != group:
@@ -544,63 +654,81 @@ class Device:
                       self.addr, rhs.addr)
             return None
 
-        # Copy the rhs entry dict of mem_loc->DeviceEntry.  For each match
-        # that we find, we'll remove that address from the dict.  The result
-        # will be the entries that need to be removed from rhs to make it
-        # match.
-        rhsRemove = rhs.entries.copy()
-
         delta = DbDiff(self.addr)
-        for entry in self.entries.values():
-            rhsEntry = rhs.find(entry.addr, entry.group, entry.is_controller,
-                                entry.data[2])
-
-            # RHS is missing this entry or has different data bytes we need
-            # to update.
-            if rhsEntry is None or not entry.identical(rhsEntry):
-                # Ignore certain links created by 'join' or 'pair'
-                # See notes below.
-                if (entry.is_controller and
-                        entry.addr == self.device.modem.addr):
-                    # This is a link from the pair command
-                    pass
-                elif (not entry.is_controller and
-                      entry.group in (0x00, 0x01) and
-                      entry.addr == self.device.modem.addr):
-                    # This is a link from the join command
-                    pass
-                else:
-                    delta.add(entry)
-
-            # Otherwise this is match so we can note that by removing this
-            # address from the set, if it is there.  If there are duplicates
-            # on the left hand side, this address may already have been removed
-            elif rhsEntry and rhsEntry.mem_loc in rhsRemove:
-                del rhsRemove[rhsEntry.mem_loc]
-
-        # Ignore certain links created by 'join' or 'pair'
-        # #1 any controller link to the modem.  These are normally
-        # created by the 'pair' command.  There is currently no way to know the
-        # groups that should exist on a device.  So we ignore all, but in the
-        # future may want to add something to each device so that we can delete
-        # erroneous entries.
-        # #2 any responder links from the modem for groups 0x01 or 0x02,
-        # these are results from the 'join' command
-        for _addr in list(rhsRemove):
-            entry = rhsRemove[_addr]
-            if entry.is_controller and entry.addr == rhs.device.modem.addr:
-                del rhsRemove[_addr]
-            if (not entry.is_controller and entry.group in (0x00, 0x01) and
-                    entry.addr == rhs.device.modem.addr):
-                del rhsRemove[_addr]
-
-        # Add in remaining rhs entries that where not matches as entries that
-        # need to be removed.
-        for entry in rhsRemove.values():
+        for entry in self.diff_adds(rhs):
+            delta.add(entry)
+        for entry in self.diff_dels(rhs):
             delta.remove(entry)
 
         return delta
 
+    #-----------------------------------------------------------------------
+    def diff_adds(self, rhs):
+        """Find the entries that need to be added to another database.
+
+        This is a generator so the entries are found as they're needed (see
+        SyncPlan).  Each entry is checked using the rhs indexes so this is
+        linear in the number of entries.  Links created by the 'join' and
+        'pair' commands are ignored.
+
+        Args:
+           rhs:   (db.Device) The other device db to compare with.
+
+        Returns:
+           Yields the DeviceEntry objects in this database that are missing
+           from or different in rhs.
+        """
+        modem_addr = self.device.modem.addr
+        for entry in list(self.entries.values()):
+            rhs_entry = rhs.find(entry.addr, entry.group, entry.is_controller,
+                                 entry.data[2])
+            if rhs_entry is not None and entry.identical(rhs_entry):
+                continue
+
+            # Ignore controller links to the modem from the 'pair' command
+            # and group 0/1 responder links from the 'join' command.
+            if entry.addr == modem_addr and (entry.is_controller or
+                                             entry.group in (0x00, 0x01)):
+                continue
+
+            yield entry
+
+    #-----------------------------------------------------------------------
+    def diff_dels(self, rhs):
+        """Find the entries that need to be removed from another database.
+
+        This is a generator - see diff_adds().  An rhs entry is kept if this
+        database has an identical entry and the rhs entry is the one that
+        rhs.find() returns for it (so duplicates on rhs are removed).
+
+        Links created by the 'join' and 'pair' commands are ignored.  There
+        is currently no way to know the groups that should exist on a device
+        so all the pair controller links are kept.  In the future we may want
+        to add something to each device so that we can delete erroneous
+        entries.
+
+        Args:
+           rhs:   (db.Device) The other device db to compare with.
+
+        Returns:
+           Yields the DeviceEntry objects in rhs that aren't in this
+           database.
+        """
+        modem_addr = rhs.device.modem.addr
+        for entry in list(rhs.entries.values()):
+            if entry.addr == modem_addr and (entry.is_controller or
+                                             entry.group in (0x00, 0x01)):
+                continue
+
+            matches = self.find_all(entry.addr, entry.group,
+                                    entry.is_controller)
+            if (any(entry.identical(i) for i in matches) and
+                    rhs.find(entry.addr, entry.group, entry.is_controller,
+                             entry.data[2]) is entry):
+                continue
+
+            yield entry
+
     #-----------------------------------------------------------------------
     def to_json(self):
         """Convert the database to JSON format.
@@ -608,17 +736,27 @@ class Device:
         Returns:
           (dict) Returns the database as a JSON dictionary.
         """
-        used = [i.to_json() for i in self.entries.values()]
-        unused = [i.to_json() for i in self.unused.values()]
+        data = self._info_to_json()
+        data['address'] = self.addr.to_json()
+        data['used'] = [i.to_json() for i in self.entries.values()]
+        data['unused'] = [i.to_json() for i in self.unused.values()]
+        return data
+
+    #-----------------------------------------------------------------------
+    def _info_to_json(self):
+        """Convert the database information fields to JSON format.
+
+        This is everything but the address and the entries.
+
+        Returns:
+          (dict) Returns the information as a JSON dictionary.
+        """
         data = {
-            'address' : self.addr.to_json(),
             'delta' : self.delta,
             'engine' : self.engine,
             'dev_cat' : None,
             'sub_cat' : None,
             'firmware' : self.firmware,
-            'used' : used,
-            'unused' : unused,
             'meta' : self._meta
             }
         if self.desc:
@@ -627,6 +765,28 @@ class Device:
 
         return data
 
+    #-----------------------------------------------------------------------
+    def _info_from_json(self, data):
+        """Read the database information fields from JSON format.
+
+        The inverse of this is _info_to_json().
+
+        Args:
+          data:  (dict) The data to read from.
+        """
+        self.delta = data['delta']
+        self.engine = data.get('engine', None)
+
+        # Load the category fields and turn them into description objecdt.
+        dev_cat = data.get('dev_cat', None)
+        sub_cat = data.get('sub_cat', None)
+        self.desc = None
+        if dev_cat is not None:
+            self.desc = catalog.find(dev_cat, sub_cat)
+
+        self.firmware = data.get('firmware', None)
+        self._meta = data.get('meta', {})
+
     #-----------------------------------------------------------------------
     def __str__(self):
         o = io.StringIO()
@@ -663,6 +823,7 @@ class Device:
         Args:
           entry:  (DeviceEntry) The entry to add.
         """
+        self.revision += 1
 
         # Entry is a new last record to use
         if entry.db_flags.is_last_rec:
@@ -676,6 +837,8 @@ class Device:
             # address off unused to insure both dicts stay in sync.
             self.entries[entry.mem_loc] = entry
             self.unused.pop(entry.mem_loc, None)
+            self._index_remove(entry.mem_loc)
+            self._index_add(entry)
 
             # If we're the controller for this entry, add it to the list of
             # entries for that group.
@@ -692,6 +855,7 @@ class Device:
             # address off entries to insure both dicts stay in sync.
             self.unused[entry.mem_loc] = entry
             self.entries.pop(entry.mem_loc, None)
+            self._index_remove(entry.mem_loc)
 
             # If the entry is a controller and it's in the group dict, erase
             # it from the group map.
@@ -704,7 +868,7 @@ class Device:
 
         # Save the updated database.
         if save:
-            self.save()
+            self._changed(["add", entry.to_json()])
 
     #-----------------------------------------------------------------------
     def add_from_config(self, remote, local):
@@ -735,6 +899,37 @@ class Device:
         # Add the Entry to the DB
         self.add_entry(entry, save=False)
 
+    #-----------------------------------------------------------------------
+    def _index_add(self, entry):
+        """Add an active entry to the lookup indexes.
+
+        Args:
+          entry:  (DeviceEntry) The entry to add.
+        """
+        key = (entry.addr, entry.group, bool(entry.is_controller))
+        self._index.setdefault(key, {})[entry.mem_loc] = entry
+        self._addr_index.setdefault(entry.addr, {})[entry.mem_loc] = entry
+        self._index_keys[entry.mem_loc] = key
+
+    #-----------------------------------------------------------------------
+    def _index_remove(self, mem_loc):
+        """Remove the entry at a memory location from the lookup indexes.
+
+        Args:
+          mem_loc:  (int) The memory location of the entry.  If there is no
+                    indexed entry there, nothing is done.
+        """
+        key = self._index_keys.pop(mem_loc, None)
+        if key is None:
+            return
+
+        for index, index_key in ((self._index, key),
+                                 (self._addr_index, key[0])):
+            entries = index[index_key]
+            del entries[mem_loc]
+            if not entries:
+                del index[index_key]
+
     #-----------------------------------------------------------------------
     def _add_using_unused(self, addr, group, is_controller, data,
                           on_done, entry=None):
@@ -37,7 +37,12 @@ class DeviceEntry:
         Data 2    Listed as Ignored?
         Data 3    Listed as 00 for switchlinc type devices and 01-08 for KPL
                   type devices
+
+    Devices can have hundreds of entries so the class uses slots to keep
+    the memory use down.
     """
+    __slots__ = ("addr", "group", "mem_loc", "db_flags", "is_controller",
+                 "data", "db")
 
     @staticmethod
     def from_json(data, db=None):
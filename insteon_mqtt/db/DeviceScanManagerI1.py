@@ -150,6 +150,7 @@ class DeviceScanManagerI1:
             # in other designs I have skipped reading the rest of
             # a record if these are found
             if entry.db_flags.is_last_rec:
+                self.db.save(flush=True)
                 on_done(True, "Database received", entry)
                 return
 
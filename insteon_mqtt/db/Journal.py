@@ -0,0 +1,172 @@
+#===========================================================================
+#
+# Append only database change journal.
+#
+#===========================================================================
+import json
+import os
+from .. import log
+
+LOG = log.get_logger()
+
+
+class Journal:
+    """Append only journal of database changes.
+
+    The journal stores the changes made to a database since its JSON file
+    (the snapshot) was last written.  Each change is a single line of JSON
+    appended to a file next to the snapshot with a .journal suffix.  A
+    change is a list with the operation name as the first element (see the
+    database replay() methods for the operations).
+
+    Loading a database reads the snapshot and then replays the journal.  If
+    the program dies while appending to the journal, the last line may be
+    incomplete.  Invalid lines are skipped when the journal is read and the
+    file is rewritten w/o them so later changes are appended on a new line.
+
+    When the number of changes grows past compact_size, the owner should
+    write a new snapshot and call clear() (see Saver.record()).
+    """
+    # Number of changes after which the journal should be compacted.
+    compact_size = 500
+
+    #-----------------------------------------------------------------------
+    @staticmethod
+    def path_for(path):
+        """Return the journal path for a snapshot file.
+
+        Args:
+          path (str):  The snapshot file path.
+
+        Returns:
+          str:  Returns the journal file path.
+        """
+        return os.path.splitext(str(path))[0] + ".journal"
+
+    #-----------------------------------------------------------------------
+    @staticmethod
+    def load(path):
+        """Read a snapshot file and its journal.
+
+        Args:
+          path (str):  The snapshot file path.
+
+        Returns:
+          (dict, list):  Returns the snapshot JSON data and the list of
+          changes from the journal.  The list is empty if there is no
+          journal file.
+        """
+        with open(path) as f:
+            data = json.load(f)
+
+        return data, Journal(path).read()
+
+    #-----------------------------------------------------------------------
+    def __init__(self, path):
+        """Constructor
+
+        Args:
+          path (str):  The snapshot file path.
+        """
+        self.path = self.path_for(path)
+
+        # Number of changes in the journal file.  None if it hasn't been
+        # read yet.
+        self._size = None
+
+    #-----------------------------------------------------------------------
+    def __len__(self):
+        """Return the number of changes in the journal.
+        """
+        if self._size is None:
+            self._size = len(self.read())
+
+        return self._size
+
+    #-----------------------------------------------------------------------
+    def read(self):
+        """Read the changes from the journal file.
+
+        Returns:
+          list:  Returns the list of changes.
+        """
+        changes = []
+        if not os.path.exists(self.path):
+            return changes
+
+        # A partial write from a crash leaves an invalid line or a last line
+        # w/o a newline.  Either way the file is rewritten so the next change
+        # isn't appended to the end of it.
+        rewrite = False
+        with open(self.path) as f:
+            for num, line in enumerate(f):
+                if not line.endswith("\n"):
+                    rewrite = True
+
+                try:
+                    changes.append(json.loads(line))
+                except ValueError:
+                    LOG.warning("Ignoring invalid journal line %d in %s",
+                                num + 1, self.path)
+                    rewrite = True
+
+        if rewrite:
+            try:
+                self._write(changes)
+            except OSError:
+                LOG.exception("Error rewriting journal %s", self.path)
+
+        self._size = len(changes)
+        return changes
+
+    #-----------------------------------------------------------------------
+    def append(self, change):
+        """Append a change to the journal.
+
+        Args:
+          change (list):  The JSON change to append.
+
+        Returns:
+          bool:  Returns True if the journal should be compacted.
+        """
+        size = len(self)
+        with open(self.path, "a") as f:
+            f.write(json.dumps(change) + "\n")
+
+        self._size = size + 1
+        return self._size > self.compact_size
+
+    #-----------------------------------------------------------------------
+    def _write(self, changes):
+        """Replace the journal file with a list of changes.
+
+        The file is written to a temporary file first and then renamed so
+        the journal is never left partially written.
+
+        Args:
+          changes (list):  The JSON changes to write.
+        """
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            for change in changes:
+                f.write(json.dumps(change) + "\n")
+
+        os.replace(temp_path, self.path)
+
+    #-----------------------------------------------------------------------
+    def clear(self):
+        """Remove the journal file.
+
+        This should be called after writing a new snapshot.
+        """
+        if self._size == 0:
+            return
+
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+        self._size = 0
+
+    #-----------------------------------------------------------------------
@@ -4,7 +4,6 @@
 #
 #===========================================================================
 import io
-import json
 from ..Address import Address
 from .. import catalog
 from .. import handler
@@ -14,6 +13,7 @@ from .. import util
 from ..CommandSeq import CommandSeq
 from .ModemEntry import ModemEntry
 from .DbDiff import DbDiff
+from .Saver import Saver
 
 
 LOG = log.get_logger()
@@ -38,7 +38,7 @@ class Modem:
     after requesting them from the modem.
     """
     @staticmethod
-    def from_json(data, path=None, device=None):
+    def from_json(data, path=None, device=None, saver=None):
         """Read a Modem database from a JSON input.
 
         The inverse of this is to_json().
@@ -48,35 +48,32 @@ class Modem:
           path:    (str) The file to save the database to when changes are
                    made.
           device:  (Modem): The Modem device object
+          saver:   (Saver): The saver to write the database with.
 
         Returns:
           Modem: Returns the created Modem object.
         """
-        obj = Modem(path, device)
+        obj = Modem(path, device, saver)
         for d in data['entries']:
             obj.add_entry(ModemEntry.from_json(d, db=obj), save=False)
 
         # pylint: disable=protected-access
-        obj._meta = data.get('meta', {})
-
-        # Load the category fields and turn them into description objecdt.
-        dev_cat = data.get('dev_cat', None)
-        sub_cat = data.get('sub_cat', None)
-        obj.desc = None
-        if dev_cat is not None:
-            obj.desc = catalog.find(dev_cat, sub_cat)
-
+        obj._info_from_json(data)
         return obj
 
     #-----------------------------------------------------------------------
-    def __init__(self, path=None, device=None):
+    def __init__(self, path=None, device=None, saver=None):
         """Constructor
 
         Args:
           path:  (str) The file to save the database to when changes are made.
           device: (Modem) The Modem device object.
+          saver:  (Saver) The saver to write the database with.  This is
+                  normally the modem saver.  If None, a saver is created
+                  which writes the file right away.
         """
         self.save_path = path
+        self.saver = saver if saver is not None else Saver()
 
         # Note: unlike devices, the PLM has no delta value so there doesn't
         # seem to be any way to tell if the db value is current or not.
@@ -96,12 +93,55 @@ class Modem:
         # that group command.
         self.groups = {}
 
+        # Indexes of the entries to speed up find() and find_all().  _index
+        # is (Address, group, is_controller) -> ModemEntry and _addr_index is
+        # Address -> [ModemEntry].
+        self._index = {}
+        self._addr_index = {}
+
+        # Local change counter.  This is incremented every time the entries
+        # change so cached lookups (see Modem.find_group_devices) can tell
+        # if they are out of date.
+        self.revision = 0
+
         # Map of string scene names to integer controller groups
         self.aliases = {}
 
         # Link to the Modem device
         self.device = device
 
+    #-----------------------------------------------------------------------
+    def replay(self, changes):
+        """Apply a list of changes read from a journal.
+
+        This is used when loading the database to apply the changes that
+        were made after the database file was written (see Journal).  The
+        changes are:
+
+        - ["add", entry]:  Add the ModemEntry JSON data.
+        - ["del", entry]:  Remove the entry matching the ModemEntry JSON.
+        - ["info", info]:  Set the model and meta data.
+        - ["clear"]:  Clear the database.
+
+        Args:
+          changes:  (list) The list of changes to apply.
+        """
+        for change in changes:
+            if change[0] == "add":
+                entry = ModemEntry.from_json(change[1], db=self)
+                self.add_entry(entry, save=False)
+            elif change[0] == "del":
+                entry = ModemEntry.from_json(change[1], db=self)
+                exists = self._index.get(self._index_key(entry))
+                if exists is not None:
+                    self.delete_entry(exists, save=False)
+            elif change[0] == "info":
+                self._info_from_json(change[1])
+            elif change[0] == "clear":
+                self.clear(save=False)
+            else:
+                LOG.warning("Ignoring unknown modem db change: %s", change)
+
     #-----------------------------------------------------------------------
     def set_path(self, path):
         """Set the save path to use for the database.
@@ -153,7 +193,7 @@ class Modem:
         """
         self.desc = catalog.find(dev_cat, sub_cat)
         self.firmware = firmware
-        self.save()
+        self._changed(["info", self._info_to_json()])
 
     #-----------------------------------------------------------------------
     def set_meta(self, key, value):
@@ -167,7 +207,7 @@ class Modem:
           value:  A data type capable of being represented in json
         """
         self._meta[key] = value
-        self.save()
+        self._changed(["info", self._info_to_json()])
 
     #-----------------------------------------------------------------------
     def get_meta(self, key):
@@ -182,16 +222,35 @@ class Modem:
         return self._meta.get(key, None)
 
     #-----------------------------------------------------------------------
-    def save(self):
+    def save(self, flush=False):
         """Save the database.
 
-        If a save path wasn't set, nothing is done.
+        If a save path wasn't set, nothing is done.  The file is written by
+        the write-behind Saver so multiple changes in a row only write the
+        file once.
+
+        Args:
+          flush:  (bool) If True, write the file now.
         """
         if not self.save_path:
             return
 
-        with open(self.save_path, "w") as f:
-            json.dump(self.to_json(), f, indent=2)
+        self.saver.save(self, flush)
+
+    #-----------------------------------------------------------------------
+    def _changed(self, change):
+        """Save a change to the database.
+
+        If a save path wasn't set, nothing is done.  The change is appended
+        to the journal if it's enabled.  Otherwise the database is saved.
+
+        Args:
+          change:  (list) The change in replay() format.
+        """
+        if not self.save_path:
+            return
+
+        self.saver.record(self, change)
 
     #-----------------------------------------------------------------------
     def __len__(self):
@@ -219,7 +278,7 @@ class Modem:
         return ret
 
     #-----------------------------------------------------------------------
-    def delete_entry(self, entry):
+    def delete_entry(self, entry, save=True):
         """Remove an entry from the database without updating the device.
 
         After removal, the database will be saved.
@@ -227,8 +286,18 @@ class Modem:
         Args:
           entry:  (DeviceEntry) The entry to remove.  This entry must exist
                   or an exception is raised.
+          save:   (bool) If True, save the database.
         """
         self.entries.remove(entry)
+        self.revision += 1
+
+        key = self._index_key(entry)
+        exists = self._index.pop(key, None)
+        if exists is not None:
+            entries = self._addr_index[key[0]]
+            entries.remove(exists)
+            if not entries:
+                del self._addr_index[key[0]]
 
         if entry.is_controller:
             responders = self.groups.get(entry.group)
@@ -239,19 +308,27 @@ class Modem:
             elif entry.group in self.groups:
                 del self.groups[entry.group]
 
-        self.save()
+        if save:
+            self._changed(["del", entry.to_json()])
 
     #-----------------------------------------------------------------------
-    def clear(self):
+    def clear(self, save=True):
         """Clear the complete database of entries.
 
         This also removes the saved file if it exists.  It does NOT modify
         the database on the device.
+
+        Args:
+          save:  (bool) If True, save the database.
         """
         self.entries = []
         self.groups = {}
         self.aliases = {}
-        self.save()
+        self._index = {}
+        self._addr_index = {}
+        self.revision += 1
+        if save:
+            self._changed(["clear"])
 
     #-----------------------------------------------------------------------
     def find_group(self, group):
@@ -281,12 +358,7 @@ class Modem:
           (ModemEntry): Returns the entry that matches or None if it
           doesn't exist.
         """
-        for e in self.entries:
-            if (e.addr == addr and e.group == group and
-                    e.is_controller == is_controller):
-                return e
-
-        return None
+        return self._index.get((addr, group, bool(is_controller)))
 
     #-----------------------------------------------------------------------
     def find_all(self, addr=None, group=None, is_controller=None):
@@ -307,8 +379,14 @@ class Modem:
         addr = None if addr is None else Address(addr)
         group = None if group is None else int(group)
 
+        # Use the address index to limit the entries that need to be checked.
+        if addr is not None:
+            entries = self._addr_index.get(addr, [])
+        else:
+            entries = self.entries
+
         results = []
-        for e in self.entries:
+        for e in entries:
             if addr is not None and e.addr != addr:
                 continue
             if group is not None and e.group != group:
@@ -523,60 +601,70 @@ class Modem:
                       type(self).__name__, type(rhs).__name__)
             return None
 
-        # Copy the rhs entry list of ModemEntry.  For each match
-        # that we find, we'll remove that address from the dict.  The result
-        # will be the entries that need to be removed from rhs to make it
-        # match.
-        rhsRemove = rhs.entries.copy()
-
         delta = DbDiff(None)  # Modem db doesn't have addr
-        for entry in self.entries:
-            rhsEntry = rhs.find(entry.addr, entry.group, entry.is_controller)
-
-            # RHS is missing this entry
-            # The Modem Data bytes never matter, we ignore them entirely
-            if rhsEntry is None:
-                # Ignore certain links created by 'join' or 'pair'
-                # See notes below.
-                if not entry.is_controller:
-                    # This is a link from the pair command
-                    pass
-                elif (entry.is_controller and
-                      entry.group in (0x00, 0x01)):
-                    # This is a link from the join command
-                    pass
-                else:
-                    delta.add(entry)
-
-            # Otherwise this is match so we can note that from the list
-            # if it is there.  If there are duplicates on the left hand side,
-            # may already have been removed
-            elif rhsEntry and rhsEntry in rhsRemove:
-                rhsRemove.remove(rhsEntry)
-
-        # Ignore certain links created by 'join' or 'pair'
-        # #1 any responder link from a valid device.  These are normally
-        # created by the 'pair' command.  There is currently no way to know the
-        # groups that should exist on a device.  So we ignore all, but in the
-        # future may want to add something to each device so that we can delete
-        # erroneous entries.
-        # #2 any controller links from group 0x01 or 0x02 to a valid device,
-        # these are results from the 'join' command
-        for entry in list(rhsRemove):
-            if (not entry.is_controller and
-                    rhs.device.find(entry.addr) is not None):
-                rhsRemove.remove(entry)
-            if (entry.is_controller and entry.group in (0x00, 0x01) and
-                    rhs.device.find(entry.addr) is not None):
-                rhsRemove.remove(entry)
-
-        # Add in remaining rhs entries that where not matches as entries that
-        # need to be removed.
-        for entry in rhsRemove:
+        for entry in self.diff_adds(rhs):
+            delta.add(entry)
+        for entry in self.diff_dels(rhs):
             delta.remove(entry)
 
         return delta
 
+    #-----------------------------------------------------------------------
+    def diff_adds(self, rhs):
+        """Find the entries that need to be added to another database.
+
+        This is a generator so the entries are found as they're needed (see
+        SyncPlan).  The modem data bytes never matter so only the address,
+        group, and controller flag are compared.  Responder links from the
+        'pair' command and group 0/1 controller links from the 'join' command
+        are ignored.
+
+        Args:
+           rhs:   (db.Modem) The other modem db to compare with.
+
+        Returns:
+           Yields the ModemEntry objects in this database that are missing
+           from rhs.
+        """
+        for entry in list(self.entries):
+            if rhs.find(entry.addr, entry.group,
+                        entry.is_controller) is not None:
+                continue
+
+            if not entry.is_controller or entry.group in (0x00, 0x01):
+                continue
+
+            yield entry
+
+    #-----------------------------------------------------------------------
+    def diff_dels(self, rhs):
+        """Find the entries that need to be removed from another database.
+
+        This is a generator - see diff_adds().  Links from the 'join' and
+        'pair' commands for devices that are in the config are ignored.
+        There is currently no way to know the groups that should exist on a
+        device so all the pair responder links are kept.  In the future we
+        may want to add something to each device so that we can delete
+        erroneous entries.
+
+        Args:
+           rhs:   (db.Modem) The other modem db to compare with.
+
+        Returns:
+           Yields the ModemEntry objects in rhs that aren't in this database.
+        """
+        # pylint: disable=protected-access
+        for entry in list(rhs._index.values()):
+            if self.find(entry.addr, entry.group,
+                         entry.is_controller) is not None:
+                continue
+
+            if ((not entry.is_controller or entry.group in (0x00, 0x01)) and
+                    rhs.device.find(entry.addr) is not None):
+                continue
+
+            yield entry
+
     #-----------------------------------------------------------------------
     def to_json(self):
         """Convert the database to JSON format.
@@ -584,9 +672,20 @@ class Modem:
         Returns:
           (dict) Returns the database as a JSON dictionary.
         """
-        entries = [i.to_json() for i in self.entries]
+        data = self._info_to_json()
+        data['entries'] = [i.to_json() for i in self.entries]
+        return data
+
+    #-----------------------------------------------------------------------
+    def _info_to_json(self):
+        """Convert the database information fields to JSON format.
+
+        This is everything but the entries.
+
+        Returns:
+          (dict) Returns the information as a JSON dictionary.
+        """
         data = {
-            'entries' : entries,
             'meta' : self._meta
             }
         if self.desc:
@@ -594,6 +693,24 @@ class Modem:
             data['sub_cat'] = self.desc.sub_cat
         return data
 
+    #-----------------------------------------------------------------------
+    def _info_from_json(self, data):
+        """Read the database information fields from JSON format.
+
+        The inverse of this is _info_to_json().
+
+        Args:
+          data:  (dict) The data to read from.
+        """
+        self._meta = data.get('meta', {})
+
+        # Load the category fields and turn them into description objecdt.
+        dev_cat = data.get('dev_cat', None)
+        sub_cat = data.get('sub_cat', None)
+        self.desc = None
+        if dev_cat is not None:
+            self.desc = catalog.find(dev_cat, sub_cat)
+
     #-----------------------------------------------------------------------
     def __str__(self):
         o = io.StringIO()
@@ -619,12 +736,19 @@ class Modem:
           entry   (ModemEntry) The new entry.
         """
         assert isinstance(entry, ModemEntry)
-
-        try:
-            idx = self.entries.index(entry)
-            self.entries[idx] = entry
-        except ValueError:
+        self.revision += 1
+
+        key = self._index_key(entry)
+        exists = self._index.get(key)
+        if exists is not None:
+            self.entries[self.entries.index(exists)] = entry
+            entries = self._addr_index[key[0]]
+            entries[entries.index(exists)] = entry
+        else:
             self.entries.append(entry)
+            self._addr_index.setdefault(key[0], []).append(entry)
+
+        self._index[key] = entry
 
         # If we're the controller for this entry, add it to the list of
         # entries for that group.
@@ -634,7 +758,7 @@ class Modem:
                 responders.append(entry)
 
         if save:
-            self.save()
+            self._changed(["add", entry.to_json()])
 
     #-----------------------------------------------------------------------
     def add_from_config(self, remote, local):
@@ -660,4 +784,16 @@ class Modem:
         # Add the Entry to the DB
         self.add_entry(entry, save=False)
 
+    #-----------------------------------------------------------------------
+    def _index_key(self, entry):
+        """Return the lookup index key for an entry.
+
+        Args:
+          entry   (ModemEntry) The entry to get the key for.
+
+        Returns:
+          tuple:  Returns the (Address, group, is_controller) key.
+        """
+        return (entry.addr, entry.group, bool(entry.is_controller))
+
 #===========================================================================
@@ -17,7 +17,11 @@ class ModemEntry:
     device, the group the device is part of, and various flags for the entry.
 
     The entry can be converted to/from JSON with to_json() and from_json().
+
+    The modem can have hundreds of entries so the class uses slots to keep
+    the memory use down.
     """
+    __slots__ = ("addr", "group", "is_controller", "data", "db")
 
     @staticmethod
     def from_json(data, db=None):
@@ -0,0 +1,272 @@
+#===========================================================================
+#
+# Write-behind database saving.
+#
+#===========================================================================
+import os
+import sqlite3
+import time
+from ..Signal import Signal
+from .. import log
+from .. import util
+from .Journal import Journal
+
+LOG = log.get_logger()
+
+
+class Saver:
+    """Write-behind saving of the database files.
+
+    Every change to a database calls its save() method.  Downloading a
+    device database changes it once per record so saving the whole file
+    each time is a lot of disk I/O.  Instead, the databases pass themselves
+    to Saver.save() which marks them as dirty.  Dirty databases are written
+    delay seconds after the first unsaved change, when flush() is called,
+    and when the saver is closed.
+
+    The modem owns the saver that all of the databases use (Modem.saver).
+    This is a polling only network "link" like network.TimedCall.  Until it
+    has been added to the network manager, save() writes the file right
+    away.  Once added, saves are delayed.  When the link is closed (or
+    removed from the manager), all the dirty databases are written.
+
+    Files are written atomically (see util.save_json) so a crash can't leave
+    a truncated database file behind.
+
+    If journal is True, individual changes reported with record() are
+    appended to a journal file instead (see Journal).  Each change is a
+    single small write.  The database file is rewritten when the journal
+    gets too big or when save() is called.
+
+    If store is set to a Store object, the databases are written to the
+    SQLite store instead of JSON files.  Databases that are written together
+    (by flush() or poll()) are written in a single transaction.
+    """
+    #-----------------------------------------------------------------------
+    def __init__(self, delay=2.0):
+        """Constructor
+
+        Args:
+          delay (float):  Time in seconds to wait after the first unsaved
+                change before writing the file.
+        """
+        # Sent when the link is going down.  signature: (Link link)
+        self.signal_closing = Signal()
+
+        # The manager will emit this after the connection has been
+        # established and everything is ready.  Links should usually not emit
+        # this directly.  signature: (Link link, bool connected)
+        self.signal_connected = Signal()
+        self.signal_connected.connect(self._connected)
+
+        self.delay = delay
+
+        # True if saves should be delayed.
+        self.active = False
+
+        # True if changes should be appended to a journal.
+        self.journal = False
+
+        # Map of database -> time of the first unsaved change.
+        self._dirty = {}
+
+        # Map of database save path -> Journal.
+        self._journals = {}
+
+        # Optional SQLite Store to use instead of the JSON files.
+        self.store = None
+
+    #-----------------------------------------------------------------------
+    def load(self, path):
+        """Load the JSON data for a database.
+
+        Args:
+          path (str):  The database save path.
+
+        Returns:
+          (dict, list):  Returns the database JSON data and the list of
+          changes from the journal to apply to it (see Journal).  Returns
+          None if the database doesn't exist.
+        """
+        if self.store is not None:
+            data = self.store.load(path)
+            return None if data is None else (data, [])
+
+        if not os.path.exists(path):
+            return None
+
+        return Journal.load(path)
+
+    #-----------------------------------------------------------------------
+    def save(self, db, flush=False):
+        """Save a database.
+
+        Args:
+          db:  The database (db.Device or db.Modem) to save.  db.save_path
+               must be set.
+          flush (bool):  If True, the file is written now.  Otherwise it's
+                written after the delay.
+        """
+        if flush or not self.active:
+            self._dirty.pop(db, None)
+            self._write(db)
+
+        elif db not in self._dirty:
+            self._dirty[db] = time.time()
+
+    #-----------------------------------------------------------------------
+    def record(self, db, change):
+        """Save a single database change.
+
+        If journaling is off, this is the same as save().
+
+        Args:
+          db:  The database (db.Device or db.Modem) that changed.
+               db.save_path must be set.
+          change (list):  The JSON change (see the database replay()
+                 methods).
+        """
+        # The journal holds the changes made after the database file was
+        # written so the file must exist first.  If a write is pending, the
+        # change is in the journal and the file when it's written.
+        if (not self.journal or self.store is not None or
+                not os.path.exists(db.save_path)):
+            self.save(db)
+            return
+
+        try:
+            compact = self._journal(db).append(change)
+        except OSError:
+            LOG.exception("Error writing journal for %s", db.save_path)
+            compact = True
+
+        if compact:
+            self.save(db, flush=True)
+
+    #-----------------------------------------------------------------------
+    def is_dirty(self, db):
+        """Return True if the database has unsaved changes.
+
+        Args:
+          db:  The database to check.
+        """
+        return db in self._dirty
+
+    #-----------------------------------------------------------------------
+    def flush(self):
+        """Write all of the databases that have unsaved changes.
+        """
+        dirty = list(self._dirty)
+        self._dirty.clear()
+        self._write_all(dirty)
+
+    #-----------------------------------------------------------------------
+    def poll(self, t):
+        """Periodic poll callback.
+
+        Writes the databases whose delay has expired.
+
+        Args:
+           t (float):  Current Unix clock time tag.
+        """
+        if not self._dirty:
+            return
+
+        due = [db for db, dirty_time in self._dirty.items()
+               if t >= dirty_time + self.delay]
+        for db in due:
+            del self._dirty[db]
+        self._write_all(due)
+
+    #-----------------------------------------------------------------------
+    def next_poll_time(self):
+        """Return the next time that the link needs to be polled.
+
+        Returns:
+          float:  Returns the time the next database needs to be written or
+                  None if there are no unsaved changes.
+        """
+        if not self._dirty:
+            return None
+
+        return min(self._dirty.values()) + self.delay
+
+    #-----------------------------------------------------------------------
+    def close(self):
+        """Close the link.
+
+        This writes any unsaved databases and switches back to saving right
+        away.
+        """
+        self.flush()
+        self.signal_closing.emit(self)
+
+    #-----------------------------------------------------------------------
+    def _connected(self, link, connected):
+        """Connected callback.
+
+        Saves are delayed while we're connected to the network manager.
+
+        Args:
+          link (Link):  Ourselves.
+          connected (bool):  True if the link is connected.
+        """
+        self.active = connected
+        if not connected:
+            self.flush()
+
+    #-----------------------------------------------------------------------
+    def _write(self, db):
+        """Write a database to its file.
+
+        Args:
+          db:  The database to write.
+        """
+        if self.store is not None:
+            self._write_all([db])
+            return
+
+        try:
+            util.save_json(db.save_path, db.to_json())
+
+            # The changes in the journal are in the file now.
+            self._journal(db).clear()
+        except OSError:
+            LOG.exception("Error saving database %s", db.save_path)
+
+    #-----------------------------------------------------------------------
+    def _write_all(self, dbs):
+        """Write a list of databases.
+
+        Args:
+          dbs:  The databases to write.
+        """
+        if self.store is None:
+            for db in dbs:
+                self._write(db)
+            return
+
+        if not dbs:
+            return
+
+        try:
+            self.store.write([(db.save_path, db.to_json()) for db in dbs])
+        except sqlite3.Error:
+            LOG.exception("Error saving %d databases to %s", len(dbs),
+                          self.store.path)
+
+    #-----------------------------------------------------------------------
+    def _journal(self, db):
+        """Return the journal for a database.
+
+        Args:
+          db:  The database to get the journal for.
+        """
+        journal = self._journals.get(db.save_path)
+        if journal is None:
+            journal = Journal(db.save_path)
+            self._journals[db.save_path] = journal
+
+        return journal
+
+    #-----------------------------------------------------------------------
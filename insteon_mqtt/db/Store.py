@@ -0,0 +1,325 @@
+#===========================================================================
+#
+# SQLite database storage.
+#
+#===========================================================================
+import glob
+import json
+import os
+import sqlite3
+import time
+from .. import log
+from .. import util
+from .Device import Device
+from .Journal import Journal
+from .Modem import Modem
+
+LOG = log.get_logger()
+
+# Keys in the database JSON data that hold lists of entries.
+ENTRY_LISTS = ('used', 'unused', 'entries')
+
+
+class Store:
+    """SQLite storage for all of the device and modem databases.
+
+    This stores every database in a single SQLite file instead of one JSON
+    file per database.  Each database is identified by its save path file
+    name w/o the extension (the hex address) so the databases don't need to
+    know which storage is in use - Saver writes the JSON data from to_json()
+    here and load() returns the same JSON data for from_json().
+
+    The tables are:
+
+    - dbs:  One row per database with the JSON of the fields that aren't
+      entries or meta data.
+    - entries:  One row per database entry.  The address, group, controller
+      flag, and memory location are columns (and indexed) so the links can
+      be queried across devices.  The full entry JSON is in the data column.
+    - meta:  One row per database meta data key.
+    - props:  Store properties.  The time of the last write is stored here
+      so JSON files that are newer than the store can be found.
+
+    All of the databases are read with one query per table the first time
+    that load() is called.  Writes are done in a single transaction.
+    """
+    # Default file name to use in the storage directory.
+    file_name = "insteon-mqtt.sqlite"
+
+    #-----------------------------------------------------------------------
+    @staticmethod
+    def key(path):
+        """Return the store key for a database save path.
+
+        Args:
+          path (str):  The database save path.
+
+        Returns:
+          str:  Returns the file name w/o the extension.
+        """
+        return os.path.splitext(os.path.basename(str(path)))[0]
+
+    #-----------------------------------------------------------------------
+    def __init__(self, path):
+        """Constructor
+
+        The tables are created if they don't exist.
+
+        Args:
+          path (str):  The SQLite file to use.
+        """
+        self.path = path
+        self._conn = sqlite3.connect(str(path))
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dbs (
+                name TEXT PRIMARY KEY,
+                info TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS entries (
+                name TEXT NOT NULL,
+                list TEXT NOT NULL,
+                addr TEXT NOT NULL,
+                grp INTEGER NOT NULL,
+                is_controller INTEGER NOT NULL,
+                mem_loc INTEGER,
+                data TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS entries_name ON entries (name);
+            CREATE INDEX IF NOT EXISTS entries_link ON entries
+                (addr, grp, is_controller, mem_loc);
+            CREATE TABLE IF NOT EXISTS meta (
+                name TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (name, key));
+            CREATE TABLE IF NOT EXISTS props (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL);
+            """)
+
+        # Map of key -> JSON data read by the first load() call.  Each
+        # database is removed from this as it's loaded.
+        self._cache = None
+
+    #-----------------------------------------------------------------------
+    def __len__(self):
+        """Return the number of databases in the store.
+        """
+        return self._conn.execute("SELECT COUNT(*) FROM dbs").fetchone()[0]
+
+    #-----------------------------------------------------------------------
+    def load(self, path):
+        """Load the JSON data for a database.
+
+        The first call reads every database in the store.
+
+        Args:
+          path (str):  The database save path.
+
+        Returns:
+          dict:  Returns the database JSON data or None if the database
+          isn't in the store.
+        """
+        name = self.key(path)
+        if self._cache is None:
+            self._cache = self.load_all()
+
+        data = self._cache.pop(name, None)
+        if data is None:
+            data = self.load_all(name).get(name)
+
+        return data
+
+    #-----------------------------------------------------------------------
+    def load_all(self, name=None):
+        """Read the JSON data for the databases.
+
+        Args:
+          name (str):  The key of the database to read.  If this is None,
+               all of the databases are read.
+
+        Returns:
+          dict:  Returns a map of key -> database JSON data.
+        """
+        where, args = ("", ()) if name is None else (" WHERE name = ?",
+                                                     (name,))
+        dbs = {}
+        for key, info in self._conn.execute("SELECT name, info FROM dbs" +
+                                            where, args):
+            dbs[key] = json.loads(info)
+
+        # Rows are returned in the order they were written which preserves
+        # the entry order.
+        sql = "SELECT name, list, data FROM entries%s ORDER BY rowid" % where
+        for key, entry_list, data in self._conn.execute(sql, args):
+            if key in dbs:
+                dbs[key][entry_list].append(json.loads(data))
+
+        for key, meta_key, value in self._conn.execute(
+                "SELECT name, key, value FROM meta" + where, args):
+            if key in dbs:
+                dbs[key]['meta'][meta_key] = json.loads(value)
+
+        return dbs
+
+    #-----------------------------------------------------------------------
+    def write(self, items):
+        """Write databases to the store.
+
+        All the databases are written in a single transaction.
+
+        Args:
+          items:  Iterable of (path, data) tuples where path is the database
+                  save path and data is the database JSON data.
+        """
+        with self._conn:
+            for path, data in items:
+                self._write(self.key(path), data)
+
+            self._conn.execute("INSERT OR REPLACE INTO props VALUES (?, ?)",
+                               ("write_time", json.dumps(time.time())))
+
+    #-----------------------------------------------------------------------
+    def write_time(self):
+        """Return the time of the last write to the store.
+
+        Stores written before the write time was recorded use the SQLite
+        file modification time.
+
+        Returns:
+          float:  Returns the Unix time of the last write or None if nothing
+          has been written.
+        """
+        row = self._conn.execute("SELECT value FROM props WHERE key = ?",
+                                 ("write_time",)).fetchone()
+        if row is not None:
+            return json.loads(row[0])
+
+        return os.path.getmtime(self.path) if len(self) else None
+
+    #-----------------------------------------------------------------------
+    def import_json(self, directory, newer_than=None):
+        """Import the database JSON files in a directory.
+
+        Any changes in database journal files are applied first (see
+        Journal).  Files that aren't databases are skipped.
+
+        Args:
+          directory (str):  The directory to read the files from.
+          newer_than (float):  If this is set, only files (or journals)
+                     modified after this Unix time are imported.
+
+        Returns:
+          int:  Returns the number of databases that were imported.
+        """
+        items = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+            if newer_than is not None and self._mtime(path) <= newer_than:
+                continue
+
+            try:
+                data, changes = Journal.load(path)
+            except (OSError, ValueError):
+                LOG.exception("Error reading database file %s", path)
+                continue
+
+            if not isinstance(data, dict) or not any(i in data for i in
+                                                     ENTRY_LISTS):
+                continue
+
+            if changes:
+                if 'address' in data:
+                    obj = Device.from_json(data, None, None)
+                else:
+                    obj = Modem.from_json(data)
+
+                obj.replay(changes)
+                data = obj.to_json()
+
+            items.append((path, data))
+
+        self.write(items)
+        LOG.info("Imported %d databases from %s", len(items), directory)
+        return len(items)
+
+    #-----------------------------------------------------------------------
+    def export_json(self, directory):
+        """Export the databases to JSON files.
+
+        The files use the same names and format as the JSON storage.
+
+        Args:
+          directory (str):  The directory to write the files to.
+
+        Returns:
+          int:  Returns the number of databases that were exported.
+        """
+        dbs = self.load_all()
+        for key, data in dbs.items():
+            util.save_json(os.path.join(directory, key + ".json"), data)
+
+        LOG.info("Exported %d databases to %s", len(dbs), directory)
+        return len(dbs)
+
+    #-----------------------------------------------------------------------
+    def close(self):
+        """Close the SQLite connection.
+        """
+        self._conn.close()
+
+    #-----------------------------------------------------------------------
+    def _mtime(self, path):
+        """Return the modification time of a database file.
+
+        Args:
+          path (str):  The database JSON file path.
+
+        Returns:
+          float:  Returns the latest modification time of the file and its
+          journal.
+        """
+        journal_path = Journal.path_for(path)
+        mtime = os.path.getmtime(path)
+        if os.path.exists(journal_path):
+            mtime = max(mtime, os.path.getmtime(journal_path))
+
+        return mtime
+
+    #-----------------------------------------------------------------------
+    def _write(self, name, data):
+        """Write a single database.
+
+        This replaces all the rows for the database.
+
+        Args:
+          name (str):  The database key.
+          data (dict):  The database JSON data.
+        """
+        info = {}
+        entries = []
+        for key, value in data.items():
+            if key in ENTRY_LISTS:
+                info[key] = []
+                for entry in value:
+                    flags = entry.get('db_flags', entry)
+                    entries.append((name, key, entry['addr'], entry['group'],
+                                    int(flags['is_controller']),
+                                    entry.get('mem_loc'), json.dumps(entry)))
+
+            elif key == 'meta':
+                info[key] = {}
+
+            else:
+                info[key] = value
+
+        meta = [(name, str(key), json.dumps(value))
+                for key, value in data.get('meta', {}).items()]
+
+        conn = self._conn
+        conn.execute("INSERT OR REPLACE INTO dbs VALUES (?, ?)",
+                     (name, json.dumps(info)))
+        conn.execute("DELETE FROM entries WHERE name = ?", (name,))
+        conn.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         entries)
+        conn.execute("DELETE FROM meta WHERE name = ?", (name,))
+        conn.executemany("INSERT INTO meta VALUES (?, ?, ?)", meta)
+
+    #-----------------------------------------------------------------------
@@ -0,0 +1,249 @@
+#===========================================================================
+#
+# Incremental database sync planner.
+#
+#===========================================================================
+import collections
+from .. import log
+from .Device import Device
+
+LOG = log.get_logger()
+
+#: A single sync operation.  kind is "add", "del", or "replace".  entry is
+#: the config entry to add ("add", "replace") and target is the existing
+#: database entry to remove or overwrite ("del", "replace").
+SyncOp = collections.namedtuple("SyncOp", ["kind", "entry", "target"])
+
+
+class SyncPlan:
+    """Incremental plan of the changes needed to sync a database.
+
+    This compares the database generated from the scenes config with the
+    database read from the device (or modem) and yields the operations
+    needed to make the device match the config.  Operations are found as
+    they're needed (see Device.diff_adds and diff_dels) instead of building
+    the full difference up front.  Each operation is checked against the
+    current database when it's pulled from the plan so changes made by
+    earlier operations (or another sync) don't cause duplicate writes.
+
+    For device databases, an entry that needs to be removed is overwritten
+    by an entry that needs to be added ("replace") which takes one write
+    instead of a delete and an add.  Adds only use unused or new memory
+    locations once all the removed entries have been reused.  For the modem
+    database, all the deletes are done before the adds so space is freed
+    up first.
+
+    Operations that are currently running are stored in a pending set
+    (shared by all the plans for a device) and skipped by other plans.  Call
+    done() when an operation finishes to remove it from the set.
+
+    For dry runs, cost() returns the estimated number of PLM messages and
+    seconds the sync will take.
+    """
+    # Estimated seconds per message.  Device messages wait for the ACK from
+    # the device, modem messages only for the modem reply.
+    device_msg_time = 0.5
+    modem_msg_time = 0.2
+
+    # Number of messages needed to write one record on an i1 device.  One to
+    # set the memory address and a peek/poke pair per byte.  Deletes only
+    # change the flags byte.
+    i1_write_msgs = 17
+    i1_delete_msgs = 3
+
+    #-----------------------------------------------------------------------
+    def __init__(self, config_db, db, pending=None):
+        """Constructor
+
+        Args:
+          config_db:  (db.Device or db.Modem) The database generated from
+                      the scenes config.
+          db:         (db.Device or db.Modem) The database to sync.  Must be
+                      the same type as config_db.
+          pending:    (set) Set of operation keys that are running.  If this
+                      is None, a new set is used.
+        """
+        self.config_db = config_db
+        self.db = db
+        self.pending = pending if pending is not None else set()
+        self._ops = None
+
+    #-----------------------------------------------------------------------
+    def __iter__(self):
+        """Iterate over the operations.
+
+        Operations that are no longer needed or that are pending are
+        skipped.  Each yielded operation is added to the pending set.
+
+        Returns:
+          Yields SyncOp objects.
+        """
+        if self._ops is None:
+            self._ops = self._plan()
+
+        for op in self._ops:
+            op = self._check(op)
+            if op is None:
+                continue
+
+            key = self._key(op)
+            if key in self.pending:
+                LOG.info("Sync %s already queued: %s", op.kind,
+                         op.entry or op.target)
+                continue
+
+            self.pending.add(key)
+            yield op
+
+    #-----------------------------------------------------------------------
+    def is_empty(self):
+        """Return True if no operations are needed.
+
+        This doesn't change the plan or the pending set.  Operations that
+        are pending in another plan are counted as needed.
+        """
+        return all(self._check(op) is None for op in self._plan())
+
+    #-----------------------------------------------------------------------
+    def done(self, op):
+        """Mark an operation as finished.
+
+        Args:
+          op:  (SyncOp) The operation returned by the plan.
+        """
+        self.pending.discard(self._key(op))
+
+    #-----------------------------------------------------------------------
+    def cost(self):
+        """Estimate the cost of the sync.
+
+        This doesn't change the plan or the pending set.  Database refreshes
+        aren't included.
+
+        Returns:
+          (int, float):  Returns the number of PLM messages and the
+          estimated number of seconds.
+        """
+        is_device = isinstance(self.db, Device)
+        if not is_device:
+            num = 0
+            for op in self._plan():
+                if op.kind == "add":
+                    num += 1
+                else:
+                    # Delete does a search, deletes all the entries w/ the
+                    # same address and group, and restores the other ones.
+                    same = len(self.db.find_all(op.target.addr,
+                                                op.target.group))
+                    num += 2 * max(same, 1)
+            return num, num * self.modem_msg_time
+
+        write_msgs = self.i1_write_msgs if self.db.engine == 0 else 1
+        del_msgs = self.i1_delete_msgs if self.db.engine == 0 else 1
+
+        # Simulate the memory used by adds.  See Device.add_on_device().
+        num_unused = len(self.db.unused)
+        last_in_use = self.db.last.db_flags.in_use
+
+        num = 0
+        for op in self._plan():
+            if op.kind == "del":
+                num += del_msgs
+            elif op.kind == "replace":
+                num += write_msgs
+            elif num_unused > 1:
+                num_unused -= 1
+                num += write_msgs
+            else:
+                # New entry and the new last entry.  If the last entry is in
+                # use, it's updated first.
+                num += write_msgs * (3 if last_in_use else 2)
+                last_in_use = False
+
+        return num, num * self.device_msg_time
+
+    #-----------------------------------------------------------------------
+    def _plan(self):
+        """Generate the operations w/o checking them.
+
+        Returns:
+          Yields SyncOp objects.
+        """
+        dels = self.config_db.diff_dels(self.db)
+        if isinstance(self.db, Device):
+            for entry in self.config_db.diff_adds(self.db):
+                target = next(dels, None)
+                yield SyncOp("add" if target is None else "replace", entry,
+                             target)
+
+            for target in dels:
+                yield SyncOp("del", None, target)
+
+        else:
+            # Deletes go first to free up space in the modem database
+            # before anything is added.
+            for target in dels:
+                yield SyncOp("del", None, target)
+
+            for entry in self.config_db.diff_adds(self.db):
+                yield SyncOp("add", entry, None)
+
+    #-----------------------------------------------------------------------
+    def _check(self, op):
+        """Check an operation against the current database.
+
+        Args:
+          op:  (SyncOp) The operation to check.
+
+        Returns:
+          SyncOp:  Returns the operation to run or None if it's no longer
+          needed.
+        """
+        entry = op.entry
+        if entry is not None:
+            if isinstance(self.db, Device):
+                exists = self.db.find(entry.addr, entry.group,
+                                      entry.is_controller, entry.data[2])
+                if exists is not None and entry.identical(exists):
+                    entry = None
+            elif self.db.find(entry.addr, entry.group,
+                              entry.is_controller) is not None:
+                entry = None
+
+        target = op.target
+        if target is not None:
+            if isinstance(self.db, Device):
+                exists = self.db.find_mem_loc(target.mem_loc)
+                if exists is None or not target.identical(exists):
+                    target = None
+            elif self.db.find(target.addr, target.group,
+                              target.is_controller) is None:
+                target = None
+
+        if entry is None and target is None:
+            return None
+        elif entry is None:
+            return SyncOp("del", None, target)
+        elif target is None:
+            return SyncOp("add", entry, None)
+        return op
+
+    #-----------------------------------------------------------------------
+    def _key(self, op):
+        """Return the pending set key for an operation.
+
+        Args:
+          op:  (SyncOp) The operation.
+
+        Returns:
+          tuple:  Returns a hashable key.
+        """
+        key = [op.kind]
+        for entry in (op.entry, op.target):
+            if entry is not None:
+                key.extend([entry.addr, entry.group, entry.is_controller,
+                            bytes(entry.data),
+                            getattr(entry, "mem_loc", None)])
+        return tuple(key)
+
+    #-----------------------------------------------------------------------
@@ -18,5 +18,9 @@ from .Device import Device
 from .DeviceEntry import DeviceEntry
 from .DeviceModifyManagerI1 import DeviceModifyManagerI1
 from .DeviceScanManagerI1 import DeviceScanManagerI1
+from .Journal import Journal
 from .Modem import Modem
 from .ModemEntry import ModemEntry
+from .Saver import Saver
+from .Store import Store
+from .SyncPlan import SyncPlan, SyncOp
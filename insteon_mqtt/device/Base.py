@@ -3,7 +3,6 @@
 # Base device class
 #
 #===========================================================================
-import json
 import os.path
 from .MsgHistory import MsgHistory
 from ..Address import Address
@@ -107,13 +106,18 @@ class Base:
         if self.name:
             self.label += " (%s)" % self.name
 
+        # The database is read from storage the first time that it's used
+        # (see the db property).  The modem loads them after the devices are
+        # created.
         self.save_path = modem.save_path
-        self.db = db.Device(self.addr, None, self)
-        self.load_db()
+        self._db = None
 
         # Config db is initiated by Scenes
         self.db_config = None
 
+        # Keys of the sync operations that are running.  See db.SyncPlan.
+        self._sync_pending = set()
+
         # Map (mqtt) commands mapped to methods calls.  These are handled in
         # run_command().  Derived classes can add more commands to the dict
         # to expand the list.  Commands should all be lower case (inputs are
@@ -148,6 +152,34 @@ class Base:
         # not need to be paired
         self.group_map = {}
 
+    #-----------------------------------------------------------------------
+    @property
+    def db(self):
+        """The device all link database (db.Device).
+
+        If the database hasn't been loaded yet, it's read from storage.
+        """
+        if self._db is None:
+            self.load_db()
+
+        return self._db
+
+    #-----------------------------------------------------------------------
+    @db.setter
+    def db(self, value):
+        """Set the device all link database.
+
+        Args:
+          value (db.Device):  The new database.
+        """
+        self._db = value
+
+    #-----------------------------------------------------------------------
+    def is_db_loaded(self):
+        """Return True if the database has been loaded from storage.
+        """
+        return self._db is not None
+
     #-----------------------------------------------------------------------
     def clear_db_config(self):
         """Clears and initializes the device config database
@@ -218,21 +250,27 @@ class Base:
         """Load the all link database from a file.
 
         The file is stored in JSON format (by save_db()) and has the path
-        self.db_path().  If the file doesn't exist, nothing is done.
+        self.db_path().  Any changes in the journal are applied after
+        reading the file (see db.Journal).  If the SQLite storage is being
+        used, the database is read from there instead (see db.Store).  If
+        the database doesn't exist, nothing is done.
         """
-        # See if the database file exists.
         path = self.db_path()
-        self.db.set_path(path)
-        if not os.path.exists(path):
-            LOG.debug("Device %s db doesn't exist", self.label)
-            return
+        if self._db is None:
+            self._db = db.Device(self.addr, None, self, self.modem.saver)
+        self._db.set_path(path)
 
         try:
             LOG.debug("Device %s reading db file", self.label)
-            with open(path) as f:
-                data = json.load(f)
-
-            self.db = db.Device.from_json(data, path, self)
+            loaded = self.modem.saver.load(path)
+            if loaded is None:
+                LOG.debug("Device %s db doesn't exist", self.label)
+                return
+
+            data, changes = loaded
+            self.db = db.Device.from_json(data, path, self,
+                                          self.modem.saver)
+            self.db.replay(changes)
         except:
             LOG.exception("Error reading file %s", path)
             return
@@ -551,14 +589,13 @@ class Base:
             seq.add(self.sync, dry_run, refresh=False, sequence=sequence)
         else:
             LOG.ui("Syncing %s device %s", self.label, dry_run_text)
-            # Perform diff after refresh if asked for
-            diff = self.db_config.diff(self.db)
-
-            if len(diff.del_entries) > 0 or len(diff.add_entries) > 0:
-                for entry in diff.del_entries:
-                    seq.add(self._sync_del, entry, dry_run)
-                for entry in diff.add_entries:
-                    seq.add(self._sync_add, entry, dry_run)
+            plan = db.SyncPlan(self.db_config, self.db, self._sync_pending)
+
+            # The operations are found and run one at a time.  Nothing is
+            # pulled from the plan (and marked pending) until the sequence
+            # gets to it.
+            if not plan.is_empty():
+                seq.add(self._sync_next, plan, iter(plan), dry_run)
             else:
                 LOG.ui("  No changes necessary.")
 
@@ -567,6 +604,68 @@ class Base:
         else:
             on_done(True, "Sync Complete", None)
 
+    #-----------------------------------------------------------------------
+    def _sync_next(self, plan, ops, dry_run, on_done=None):
+        """Run the next sync operation.
+
+        Used by sync().  Each operation is pulled from the plan when the
+        previous one finishes so it's checked against the current database.
+        If an operation fails, the sync is stopped.  Dry runs log all the
+        operations and the estimated cost.
+
+        Args:
+          plan:    (db.SyncPlan) The sync plan.
+          ops:     Iterator of the plan operations.
+          dry_run: (Boolean) True to only log the operations.
+          on_done: Finished callback.  This is called when all the
+                   operations have completed or one of them fails.
+        """
+        if dry_run:
+            for op in ops:
+                self._sync_op(op, dry_run, util.make_callback(None))
+                plan.done(op)
+
+            num_msgs, seconds = plan.cost()
+            LOG.ui("  Estimated cost: %d messages, %.0f seconds", num_msgs,
+                   seconds)
+            on_done(True, None, None)
+            return
+
+        op = next(ops, None)
+        if op is None:
+            on_done(True, None, None)
+            return
+
+        def op_done(success, msg, data):
+            plan.done(op)
+            if not success:
+                # Stop the plan so nothing else is pulled from it.  Only
+                # the current operation was pending.
+                ops.close()
+                LOG.error("%s sync stopped: %s", self.label, msg)
+                on_done(False, msg, data)
+                return
+
+            self._sync_next(plan, ops, dry_run, on_done)
+
+        self._sync_op(op, dry_run, op_done)
+
+    #-----------------------------------------------------------------------
+    def _sync_op(self, op, dry_run, on_done):
+        """Run a single sync operation.
+
+        Args:
+          op:      (db.SyncOp) The operation to run.
+          dry_run: (Boolean) True to only log the operation.
+          on_done: Finished callback.
+        """
+        if op.kind == "del":
+            self._sync_del(op.target, dry_run, on_done)
+        elif op.kind == "replace":
+            self._sync_replace(op.target, op.entry, dry_run, on_done)
+        else:
+            self._sync_add(op.entry, dry_run, on_done)
+
     #-----------------------------------------------------------------------
     def _sync_del(self, entry, dry_run, on_done=None):
         '''Deletes a link on the device with a Log UI Message
@@ -595,6 +694,21 @@ class Base:
                                   entry.is_controller, entry.data,
                                   on_done=on_done)
 
+    #-----------------------------------------------------------------------
+    def _sync_replace(self, old_entry, entry, dry_run, on_done=None):
+        '''Overwrites a link on the device with a Log UI Message
+
+        Used by sync() so that messages are displayed in a logical fashion
+        '''
+        if dry_run:
+            LOG.ui("  Would Replace %s with %s:", old_entry, entry)
+            on_done(True, None, None)
+        else:
+            LOG.ui("  Replacing %s with %s:", old_entry, entry)
+            self.db.replace_on_device(old_entry, entry.addr, entry.group,
+                                      entry.is_controller, entry.data,
+                                      on_done=on_done)
+
     #-----------------------------------------------------------------------
     def import_scenes(self, dry_run=True, save=True, on_done=None):
         """Imports Scenes Defined on the Device into the Scenes Config.
@@ -1105,21 +1219,19 @@ class Base:
         # (without sending anything out).
         group = msg.group
 
-        responders = self.db.find_group(group)
+        responders = self.modem.find_group_devices(self, group)
         LOG.debug("Found %s responders in group %s", len(responders), group)
-        LOG.debug("Group %s -> %s", group, [i.addr.hex for i in responders])
 
         # For each device that we're the controller of call it's handler for
         # the broadcast message.
-        for elem in responders:
-            device = self.modem.find(elem.addr)
+        for addr, device in responders:
             if device:
                 LOG.info("%s broadcast to %s for group %s", self.label,
                          device.addr, group)
                 device.handle_group_cmd(self.addr, msg)
             else:
                 LOG.info("%s broadcast - device %s is not in config.",
-                         self.label, elem.addr)
+                         self.label, addr)
 
     #-----------------------------------------------------------------------
     def handle_group_cmd(self, addr, msg):
@@ -7,6 +7,7 @@ import time
 from .. import log
 from .. import message as Msg
 from .. import util
+from ..Protocol import Priority
 
 LOG = log.get_logger()
 
@@ -30,7 +31,13 @@ class Base:
     callback is stored in the base class.  The API for the callback is
     always:
        on_done( bool success, str message, data )
+
+    Priority: the Protocol write queue priority for messages sent with this
+    handler.  Derived classes can override this to move their messages ahead
+    of or behind other messages in the queue.
     """
+    priority = Priority.COMMAND
+
     #-----------------------------------------------------------------------
     def __init__(self, on_done=None, num_retry=0, time_out=5):
         """Constructor
@@ -106,6 +113,16 @@ class Base:
         """
         self._expire_time = time.time() + self._time_out
 
+    #-----------------------------------------------------------------------
+    def next_expire_time(self):
+        """Return the time at which the handler will time out.
+
+        Returns:
+          float:  Returns the Unix clock time tag of the time out or None if
+                  the message hasn't been sent yet.
+        """
+        return self._expire_time
+
     #-----------------------------------------------------------------------
     def is_expired(self, protocol, t):
         """See if the time out time has been exceeded.
@@ -6,6 +6,7 @@
 # pylint: disable=too-many-return-statements
 from .. import log
 from .. import message as Msg
+from ..Protocol import Priority
 from .Base import Base
 
 LOG = log.get_logger()
@@ -22,6 +23,8 @@ class DeviceDbGet(Base):
     Each reply is passed to the callback function set in the constructor
     which is usually a method on the device to update it's database.
     """
+    priority = Priority.DB
+
     def __init__(self, device_db, on_done, num_retry=3, time_out=5):
         """Constructor
 
@@ -143,6 +146,7 @@ class DeviceDbGet(Base):
             # Note that if the entry is a null entry (all zeros), then
             # is_last_rec will be True as well.
             if entry.db_flags.is_last_rec:
+                self.db.save(flush=True)
                 self.on_done(True, "Database received", entry)
                 return Msg.FINISHED
 
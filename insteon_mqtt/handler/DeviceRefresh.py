@@ -6,6 +6,7 @@
 from .. import log
 from .. import message as Msg
 from .. import db
+from ..Protocol import Priority
 from .Base import Base
 from .DeviceDbGet import DeviceDbGet
 
@@ -26,6 +27,8 @@ class DeviceRefresh(Base):
     the database needs to re-downloaded from the device.  If it does, the
     handler will send a new message to request the database.
     """
+    priority = Priority.REFRESH
+
     def __init__(self, device, callback, force, on_done=None, num_retry=3,
                  skip_db=False):
         """Constructor
@@ -6,6 +6,7 @@
 from .. import log
 from .. import message as Msg
 from .. import util
+from ..Protocol import Priority
 from .Base import Base
 
 LOG = log.get_logger()
@@ -22,6 +23,8 @@ class ModemDbGet(Base):
 
     Each reply is used to update the modem class's database records.
     """
+    priority = Priority.DB
+
     def __init__(self, modem_db, on_done=None):
         """Constructor
 
@@ -63,10 +66,10 @@ class ModemDbGet(Base):
         if isinstance(msg, (Msg.OutAllLinkGetFirst, Msg.OutAllLinkGetNext)):
             # If we get a NAK, then there are no more db records.
             if not msg.is_ack:
-                LOG.ui("Modem database download complete:\n%s", str(self.db))
+                LOG.ui("Modem database download complete:\n%s", self.db)
 
                 # Save the database to a local file.
-                self.db.save()
+                self.db.save(flush=True)
 
                 self.on_done(True, "Database download complete", None)
                 return Msg.FINISHED
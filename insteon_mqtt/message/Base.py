@@ -25,6 +25,10 @@ class Base:
         This should only be called if raw[1] == msg_code and len(raw) >=
         msg_size().
 
+        The Protocol class passes a memoryview into its read buffer so any
+        slices of raw that are stored in the message must be copied (e.g.
+        bytes(raw[8:11])) rather than referenced.
+
         Args:
           raw (bytes):  The current byte stream to read from.
 
@@ -12,6 +12,8 @@ class DbFlags:
     This class handles message bit flags for all link database records.  It
     can be converted to/from bytes and to/from JSON format.
     """
+    __slots__ = ("in_use", "is_controller", "is_last_rec")
+
     #-----------------------------------------------------------------------
     @classmethod
     def from_json(cls, data):
@@ -39,7 +39,7 @@ class InpAllLinkRec(Base):
         db_flags = DbFlags.from_bytes(raw, 2)
         group = raw[3]
         addr = Address.from_bytes(raw, 4)
-        data = raw[7:10]
+        data = bytes(raw[7:10])
 
         return InpAllLinkRec(db_flags, group, addr, data)
 
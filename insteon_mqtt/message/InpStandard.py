@@ -80,7 +80,7 @@ class InpStandard(Base):
         self.cmd2 = cmd2
         self.group = None
         if self.flags.is_broadcast:
-            self.group = self.to_addr.ids[2]
+            self.group = self.to_addr.bytes[2]
         elif (self.flags.type == Flags.Type.ALL_LINK_CLEANUP or
               self.flags.type == Flags.Type.CLEANUP_ACK):
             # The INSTEON Whitepaper defines cmd2 as status for CLEANUP_ACK
@@ -88,6 +88,10 @@ class InpStandard(Base):
             # with caution.
             self.group = self.cmd2
 
+        # Input messages aren't changed after they're read so the string is
+        # built the first time it's needed (usually by logging) and cached.
+        self._str = None
+
         # This is the time by which the final hop would arrive, used to
         # detect duplicates.  87 msec is empirical and was found to be an OK
         # value to use with standard length messages in other Insteon
@@ -128,14 +132,18 @@ class InpStandard(Base):
 
     #-----------------------------------------------------------------------
     def __str__(self):
+        if self._str is not None:
+            return self._str
+
         if self.group is None:
-            return ("Std: %s->%s %s cmd: %02x %02x" %
-                    (self.from_addr, self.to_addr, self.flags, self.cmd1,
-                     self.cmd2))
+            self._str = ("Std: %s->%s %s cmd: %02x %02x" %
+                         (self.from_addr, self.to_addr, self.flags, self.cmd1,
+                          self.cmd2))
         else:
-            return ("Std: %s %s grp: %02x cmd: %02x %02x" %
-                    (self.from_addr, self.flags, self.group, self.cmd1,
-                     self.cmd2))
+            self._str = ("Std: %s %s grp: %02x cmd: %02x %02x" %
+                         (self.from_addr, self.flags, self.group, self.cmd1,
+                          self.cmd2))
+        return self._str
 
     #-----------------------------------------------------------------------
     def __eq__(self, rhs):
@@ -160,6 +168,19 @@ class InpStandard(Base):
                 self.cmd2 == rhs.cmd2)
 
     #-----------------------------------------------------------------------
+    def dedupe_key(self):
+        """Return a hashable key for duplicate detection.
+
+        Messages that are equal (see __eq__) have the same key.  So like
+        __eq__, this ignores the hops_left and max_hops fields.
+
+        Returns:
+          tuple:  Returns the message key.
+        """
+        return (self.from_addr.id, self.flags.type, self.flags.is_ext,
+                self.group, self.cmd1, self.cmd2)
+
+    #-----------------------------------------------------------------------
 
 #===========================================================================
 
@@ -197,7 +218,7 @@ class InpExtended(Base):
         flags = Flags.from_bytes(raw, 8)
         cmd1 = raw[9]
         cmd2 = raw[10]
-        data = raw[11:25]
+        data = bytes(raw[11:25])
         return InpExtended(from_addr, to_addr, flags, cmd1, cmd2, data)
 
     #-----------------------------------------------------------------------
@@ -224,11 +245,14 @@ class InpExtended(Base):
         self.data = data
         self.group = None
         if self.flags.is_broadcast:
-            self.group = self.to_addr.ids[2]
+            self.group = self.to_addr.bytes[2]
         elif (self.flags.type == Flags.Type.ALL_LINK_CLEANUP or
               self.flags.type == Flags.Type.CLEANUP_ACK):
             self.group = self.cmd2
 
+        # Cached string - see InpStandard.
+        self._str = None
+
         # This is the time by which the final hop would arrive, used to
         # detect duplicates.  183 msec is empirical and was found to be an OK
         # value to use with extended length messages in other Insteon
@@ -237,6 +261,9 @@ class InpExtended(Base):
 
     #-----------------------------------------------------------------------
     def __str__(self):
+        if self._str is not None:
+            return self._str
+
         o = io.StringIO()
         if self.group is None:
             o.write("Ext: %s->%s %s cmd: %02x %02x\n" %
@@ -249,7 +276,8 @@ class InpExtended(Base):
 
         for i in self.data:
             o.write("%02x " % i)
-        return o.getvalue()
+        self._str = o.getvalue()
+        return self._str
 
     #-----------------------------------------------------------------------
     def __eq__(self, rhs):
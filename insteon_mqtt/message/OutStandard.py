@@ -23,6 +23,14 @@ class OutStandard(Base):
     msg_code = 0x62
     fixed_msg_size = 9
 
+    # Encoded frames shared by all messages.  Most messages are the same few
+    # commands (on, off, status refresh, db requests) sent to the same
+    # devices so new messages can reuse an existing frame.  The key is the
+    # fields the frame was built from (see _frame_key()).  Frames stop being
+    # added once the table is full.
+    _frames = {}
+    max_frames = 4096
+
     #-----------------------------------------------------------------------
     @classmethod
     def from_bytes(cls, raw):
@@ -57,7 +65,7 @@ class OutStandard(Base):
 
         # Read the extended message payload.
         assert len(raw) >= OutExtended.fixed_msg_size
-        data = raw[8:22]
+        data = bytes(raw[8:22])
         is_ack = raw[22] == 0x06
         return OutExtended(to_addr, flags, cmd1, cmd2, data, is_ack)
 
@@ -136,6 +144,9 @@ class OutStandard(Base):
 
         assert isinstance(flags, Flags)
 
+        # Cached (key, header, payload) encoding.  See to_bytes().
+        self._frame = None
+
         self.to_addr = to_addr
         self.flags = flags
         self.cmd1 = cmd1
@@ -146,15 +157,48 @@ class OutStandard(Base):
     def to_bytes(self):
         """Convert the message to a byte array.
 
+        The bytes other than the flags are encoded the first time this is
+        called and cached along with the fields they were built from (or an
+        identical frame from another message is reused).  The cache is used
+        until one of those fields changes.  The flags are
+        encoded on every call so changing the hop count when the message is
+        resent doesn't require re-encoding the rest.
+
         Returns:
           bytes:  Returns the message as bytes.
         """
-        o = io.BytesIO()
-        o.write(bytes([0x02, self.msg_code]))
-        o.write(self.to_addr.to_bytes())
-        o.write(self.flags.to_bytes())
-        o.write(bytes([self.cmd1, self.cmd2]))
-        return o.getvalue()
+        key = self._frame_key()
+        frame = self._frame
+        if frame is None or frame[0] != key:
+            frame = self._frames.get(key)
+            if frame is None:
+                frame = (key,) + self._encode()
+                if len(self._frames) < self.max_frames:
+                    self._frames[key] = frame
+
+            self._frame = frame
+
+        return frame[1] + self.flags.to_bytes() + frame[2]
+
+    #-----------------------------------------------------------------------
+    def _frame_key(self):
+        """Return the fields that the cached frame depends on.
+
+        Returns:
+          tuple:  Returns the fields that are encoded by _encode().
+        """
+        return (self.to_addr, self.cmd1, self.cmd2)
+
+    #-----------------------------------------------------------------------
+    def _encode(self):
+        """Encode the message bytes before and after the flags.
+
+        Returns:
+          (bytes, bytes):  Returns the header (start, message code, and
+          address) and the payload (commands) bytes.
+        """
+        return (bytes([0x02, self.msg_code]) + self.to_addr.to_bytes(),
+                bytes([self.cmd1, self.cmd2]))
 
     #-----------------------------------------------------------------------
     def __str__(self):
@@ -231,11 +275,25 @@ class OutExtended(OutStandard):
         self.crc_type = crc_type
 
     #-----------------------------------------------------------------------
-    def to_bytes(self):
-        """Convert the message to a byte array.
+    def _frame_key(self):
+        """Return the fields that the cached frame depends on.
 
         Returns:
-          bytes:  Returns the message as bytes.
+          tuple:  Returns the fields that are encoded by _encode().
+        """
+        return (self.to_addr, self.cmd1, self.cmd2, bytes(self.data),
+                self.crc_type)
+
+    #-----------------------------------------------------------------------
+    def _encode(self):
+        """Encode the message bytes before and after the flags.
+
+        The checksum or CRC is computed here so it's only done once per
+        message no matter how many times it's sent.
+
+        Returns:
+          (bytes, bytes):  Returns the header (start, message code, and
+          address) and the payload (commands and extended data) bytes.
         """
         # NOTE: both of these checksum/CRC algorithms were built from the
         # insteon-terminal messages.py file at:
@@ -264,7 +322,8 @@ class OutExtended(OutStandard):
         else:
             ext_data = self.data
 
-        return OutStandard.to_bytes(self) + ext_data
+        header, cmds = OutStandard._encode(self)
+        return (header, cmds + bytes(ext_data))
 
     #-----------------------------------------------------------------------
     def __str__(self):
@@ -0,0 +1,129 @@
+#===========================================================================
+#
+# MQTT input topic dispatcher
+#
+#===========================================================================
+import paho.mqtt.client as paho
+from .. import log
+
+LOG = log.get_logger()
+
+
+class Dispatch:
+    """MQTT input topic dispatcher.
+
+    Normally each MQTT device subscribes to each of it's input topics (set,
+    scene, level, etc) with the broker and registers a callback for each
+    topic with the paho client.  On a large network that's thousands of
+    broker subscriptions and paho callback filters.
+
+    This class has the same subscribe() and unsubscribe() API as the
+    network.Mqtt link and can be passed to the MQTT devices in place of the
+    link.  Device topics that match one of the configured wildcard topics
+    (e.g. 'insteon/+/set') are stored in a topic -> callback dictionary
+    instead of being subscribed to.  The link is subscribed once to each
+    wildcard topic and input messages are routed to the device callback by
+    looking up the exact message topic.  Device topics that don't match any
+    of the wildcard topics are passed through to the link.
+    """
+    def __init__(self, link, topics):
+        """Constructor
+
+        Args:
+          link (network.Mqtt):  The network MQTT link to subscribe with.
+          topics (list):  List of wildcard topic strings to subscribe to.
+        """
+        self.link = link
+        self.topics = list(topics)
+
+        # Map of input topic to device callback.
+        self._handlers = {}
+
+    #-----------------------------------------------------------------------
+    def __len__(self):
+        """Returns the number of dispatched device topics."""
+        return len(self._handlers)
+
+    #-----------------------------------------------------------------------
+    def subscribe(self, topic, qos=0, callback=None):
+        """Subscribe a device to a topic.
+
+        See network.Mqtt.subscribe() for details.  If the topic matches one
+        of the wildcard topics, the callback will be called from
+        handle_message().  Otherwise the topic is subscribed to using the
+        link.
+
+        Args:
+          topic (str):  The topic to subscribe to.
+          qos (int): The quality of service level to use (0,1,2).
+          callback:  Optional message callback.
+        """
+        if callback is None or not self._matches(topic):
+            self.link.subscribe(topic, qos, callback)
+            return
+
+        self._handlers[topic] = callback
+        LOG.debug("MQTT dispatch %s", topic)
+
+    #-----------------------------------------------------------------------
+    def unsubscribe(self, topic):
+        """Unsubscribe a device from a topic.
+
+        Args:
+          topic (str):  The topic to unsubscribe from.
+        """
+        if self._handlers.pop(topic, None) is None:
+            self.link.unsubscribe(topic)
+
+    #-----------------------------------------------------------------------
+    def subscribe_topics(self, qos):
+        """Subscribe the link to the wildcard topics.
+
+        Args:
+          qos (int): The quality of service level to use (0,1,2).
+        """
+        for topic in self.topics:
+            self.link.subscribe(topic, qos, self.handle_message)
+
+    #-----------------------------------------------------------------------
+    def unsubscribe_topics(self):
+        """Unsubscribe the link from the wildcard topics.
+        """
+        for topic in self.topics:
+            self.link.unsubscribe(topic)
+
+    #-----------------------------------------------------------------------
+    def handle_message(self, client, data, message):
+        """MQTT wildcard topic message callback.
+
+        Args:
+          client (paho.Client):  The paho mqtt client.
+          data:  Optional user data (unused).
+          message:  MQTT message - has attrs: topic, payload, qos, retain.
+        """
+        callback = self._handlers.get(message.topic)
+        if callback is None:
+            LOG.debug("MQTT dispatch has no handler for %s", message.topic)
+            return
+
+        callback(client, data, message)
+
+    #-----------------------------------------------------------------------
+    def _matches(self, topic):
+        """Return True if a topic matches one of the wildcard topics.
+
+        Args:
+          topic (str):  The device topic to check.  Topics with wildcards
+                are never matched since they can't be looked up by the
+                message topic.
+        """
+        if "+" in topic or "#" in topic:
+            return False
+
+        for sub in self.topics:
+            if paho.topic_matches_sub(sub, topic):
+                return True
+
+        return False
+
+    #-----------------------------------------------------------------------
@@ -6,9 +6,12 @@
 import functools
 import json
 import logging
+import time
 from .. import log
 from . import config
+from .Dispatch import Dispatch
 from .MsgTemplate import MsgTemplate
+from .Publisher import Publisher
 from .Reply import Reply
 
 LOG = log.get_logger()
@@ -59,12 +62,22 @@ class Mqtt:
         self.link = mqtt_link
         self.link.signal_connected.connect(self.handle_connected)
 
+        # Outbound message filter.  The modem timer is used to send messages
+        # that are held for coalescing.
+        self.publisher = Publisher(mqtt_link,
+                                   getattr(modem, "timed_call", None))
+
         # Map of Address ID to MQTT device.
         self.devices = {}
 
         # The command topic template (MstTemplate) to use.
         self._cmd_topic = None
 
+        # Optional device input topic dispatcher.  If this is set, devices
+        # subscribe through it instead of the link.  See Dispatch for
+        # details.
+        self._dispatch = None
+
         # MQTT message parameters.  These get loaded via the config.
         self.qos = 1
         self.retain = True
@@ -89,6 +102,10 @@ class Mqtt:
         - retain:      (bool) Retain sent messages (Default True)
         - cmd_topic:   (str) The MQTT topic prefix to subscribe to for
                        system commands.
+        - dispatch_topics:  (list) Optional wildcard topics to subscribe to
+                            in place of the individual device input topics.
+        - publish_dedupe, publish_window, publish_overrides:  Optional
+          outbound message filtering.  See Publisher.load_config().
 
         Args:
           data (dict):  Configuration data to load.
@@ -100,9 +117,15 @@ class Mqtt:
         # Create a template for prcessing messages on the command topic.
         self._cmd_topic = MsgTemplate.clean_topic(data['cmd_topic'])
 
+        # Route device input topics through a dispatcher if wildcard topics
+        # are configured.
+        topics = data.get('dispatch_topics')
+        self._dispatch = Dispatch(self.link, topics) if topics else None
+
         # MQTT message parameters.
         self.qos = data.get('qos', self.qos)
         self.retain = data.get('retain', self.retain)
+        self.publisher.load_config(data)
 
         # Save the config for later passing to devices when they are created.
         self._config = data
@@ -126,13 +149,17 @@ class Mqtt:
         qos = self.qos if qos is None else qos
         retain = self.retain if retain is None else retain
 
-        # Pass the message to the network link.
-        self.link.publish(topic, payload, qos, retain)
+        # Pass the message to the network link through the filter.
+        self.publisher.publish(topic, payload, qos, retain)
 
     #-----------------------------------------------------------------------
     def close(self):
         """Close the MQTT link.
         """
+        self.publisher.flush()
+        LOG.info("MQTT published %d messages, %d unchanged suppressed, %d "
+                 "coalesced", self.publisher.num_published,
+                 self.publisher.num_suppressed, self.publisher.num_coalesced)
         self.link.close()
 
     #-----------------------------------------------------------------------
@@ -152,6 +179,8 @@ class Mqtt:
           connected (bool):  True if connected, False if disconnected.
         """
         if self.link.connected:
+            # The broker may not have the retained messages any more.
+            self.publisher.clear()
             self._subscribe()
 
     #-----------------------------------------------------------------------
@@ -186,7 +215,7 @@ class Mqtt:
 
         # If we are already connected we need to subscribe this device
         if self.link.connected:
-            obj.subscribe(self.link, self.qos)
+            obj.subscribe(self._device_link(), self.qos)
 
     #-----------------------------------------------------------------------
     def handle_cmd(self, client, userdata, message):
@@ -331,12 +360,22 @@ class Mqtt:
         This will subscribe to the command topic and tell all the MQTT
         devices to subscribe to their command topics.
         """
+        start_time = time.time()
         if self._cmd_topic:
             self.link.subscribe(self._cmd_topic + "/+", self.qos,
                                 self.handle_cmd)
 
+        link = self._device_link()
         for device in self.devices.values():
-            device.subscribe(self.link, self.qos)
+            device.subscribe(link, self.qos)
+
+        if self._dispatch is not None:
+            self._dispatch.subscribe_topics(self.qos)
+            LOG.info("MQTT dispatching %d topics from %d subscriptions",
+                     len(self._dispatch), len(self._dispatch.topics))
+
+        LOG.info("Startup time: MQTT subscribed %d devices in %.3f sec",
+                 len(self.devices), time.time() - start_time)
 
     #-----------------------------------------------------------------------
     def _unsubscribe(self):
@@ -347,8 +386,24 @@ class Mqtt:
         if self._cmd_topic:
             self.link.unsubscribe(self._cmd_topic + "/+")
 
+        link = self._device_link()
         for device in self.devices.values():
-            device.unsubscribe(self.link)
+            device.unsubscribe(link)
+
+        if self._dispatch is not None:
+            self._dispatch.unsubscribe_topics()
+
+    #-----------------------------------------------------------------------
+    def _device_link(self):
+        """Return the object the devices should subscribe with.
+
+        Returns:
+          Returns the Dispatch object if one is configured.  Otherwise the
+          network link is returned.
+        """
+        if self._dispatch is not None:
+            return self._dispatch
+        return self.link
 
     #-----------------------------------------------------------------------
 
@@ -4,11 +4,32 @@
 #
 #===========================================================================
 import json
+import re
 import jinja2
+import jinja2.meta
 from .. import log
 
 LOG = log.get_logger()
 
+# Shared jinja environment for all the templates.  This uses the same
+# settings as jinja2.Template().
+_ENV = jinja2.Environment()
+
+# Compiled templates by source string.  Every device of the same type uses
+# the same template strings so each one is only compiled once.
+_TEMPLATES = {}
+
+# Simple variable substitution w/ an optional lower() or upper() call.
+_SIMPLE_VAR = re.compile(r"{{\s*([A-Za-z_][A-Za-z0-9_]*)"
+                         r"(?:\.(lower|upper)\(\))?\s*}}")
+
+# Variable names that jinja treats as constants, operators, or globals.
+_RESERVED = {"true", "false", "none", "True", "False", "None", "and", "or",
+             "not", "in", "is", "if", "else"} | set(_ENV.globals)
+
+# Marker for variables that aren't in the template data.
+_MISSING = object()
+
 
 class MsgTemplate:
     """MQTT message template helper.
@@ -16,6 +37,8 @@ class MsgTemplate:
     This class stores a topic and payload jinja2 template for use in
     formatting and parsing MQTT messages.
     """
+    # Maximum number of rendered topics to cache.
+    max_topics = 64
 
     @staticmethod
     def clean_topic(topic):
@@ -52,10 +75,14 @@ class MsgTemplate:
 
         # Keep the original string around for better log and error messages.
         self.topic_str = topic
-        self.topic = None if topic is None else jinja2.Template(topic)
+        self.topic = None if topic is None else compile_template(topic)
 
         self.payload_str = payload
-        self.payload = None if payload is None else jinja2.Template(payload)
+        self.payload = None if payload is None else compile_template(payload)
+
+        # Rendered topics by the template variable values.  Each device has
+        # it's own templates so this is per device and button.
+        self._topics = {}
 
     #-----------------------------------------------------------------------
     def load_config(self, config, topic, payload, qos=None):
@@ -79,17 +106,21 @@ class MsgTemplate:
         template = config.get(topic, None)
         if template is not None:
             self.topic_str = template
-            self.topic = jinja2.Template(template)
+            self.topic = compile_template(template)
+            self._topics.clear()
 
         template = config.get(payload, None)
         if template is not None:
             self.payload_str = template
-            self.payload = jinja2.Template(template)
+            self.payload = compile_template(template)
 
     #-----------------------------------------------------------------------
     def render_topic(self, data, silent=False):
         """Render the topic template.
 
+        Topics usually only depend on the device and button so the rendered
+        topic is cached using the values of the variables in the template.
+
         Args:
           data (dict):  Data dictionary with template variables to pass to the
                jinja template.
@@ -99,6 +130,19 @@ class MsgTemplate:
           str:  Returns the rendered topic.  This may be None if the
           constructor or config topic data was None.
         """
+        if self.topic is None:
+            return None
+
+        try:
+            key = tuple(data.get(i, _MISSING) for i in self.topic.names)
+            ret = self._topics.get(key)
+        except TypeError:
+            # Unhashable variable values (json data) can't be cached.
+            key = ret = None
+
+        if ret is not None:
+            return ret
+
         try:
             ret = self._render(self.topic_str, self.topic, data, silent)
         except jinja2.exceptions.UndefinedError as exc:
@@ -108,6 +152,14 @@ class MsgTemplate:
                           self.topic_str.strip())
                 LOG.error("Data passed was: %s", data)
             ret = None
+
+        if key is not None and ret is not None:
+            # Templates w/ variables like level can have lots of values so
+            # don't let the cache grow forever.
+            if len(self._topics) >= self.max_topics:
+                self._topics.clear()
+            self._topics[key] = ret
+
         return ret
 
     #-----------------------------------------------------------------------
@@ -217,3 +269,143 @@ class MsgTemplate:
         return template.render(data)
 
     #-----------------------------------------------------------------------
+
+
+#===========================================================================
+def compile_template(source):
+    """Compile a template string.
+
+    Templates that are plain strings or only substitute variables (with an
+    optional lower() or upper() call) are rendered w/o jinja.  All other
+    templates are compiled using the shared jinja environment.  Compiled
+    templates are cached by the source string.
+
+    Args:
+      source (str):  The template string.
+
+    Returns:
+      Returns an object w/ a render(data) method and a names attribute with
+      the set of variables used by the template.
+    """
+    template = _TEMPLATES.get(source)
+    if template is None:
+        template = SimpleTemplate.parse(source)
+        if template is None:
+            template = _ENV.from_string(source)
+            template.names = jinja2.meta.find_undeclared_variables(
+                _ENV.parse(source))
+
+        _TEMPLATES[source] = template
+
+    return template
+
+
+#===========================================================================
+class SimpleTemplate:
+    """Variable substitution template.
+
+    This renders the same output as jinja for templates that are literal
+    text and {{name}}, {{name.lower()}}, or {{name.upper()}} variables.
+    Variables that aren't in the data render as empty strings like jinja
+    does.  If lower() or upper() is used on a value that isn't a string,
+    the template is rendered by jinja so the same result or error is
+    returned.
+    """
+    @staticmethod
+    def parse(source):
+        """Parse a template string.
+
+        Args:
+          source (str):  The template string.
+
+        Returns:
+          SimpleTemplate:  Returns the template or None if the template
+          needs jinja.
+        """
+        if "\r" in source:
+            return None
+
+        # Split into literal, name, method, literal, ...  jinja strips a
+        # single trailing newline.
+        items = _SIMPLE_VAR.split(source)
+        if items[-1].endswith("\n"):
+            items[-1] = items[-1][:-1]
+
+        literals = items[::3]
+        for text in literals:
+            if "{{" in text or "{%" in text or "{#" in text:
+                return None
+
+        fields = list(zip(items[1::3], items[2::3]))
+        for name, _ in fields:
+            if name in _RESERVED:
+                return None
+
+        return SimpleTemplate(source, literals, fields)
+
+    #-----------------------------------------------------------------------
+    def __init__(self, source, literals, fields):
+        """Constructor
+
+        Args:
+          source (str):  The template string.
+          literals (list):  The literal text before, between, and after the
+                   fields.  This is one longer than fields.
+          fields (list):  List of (name, method) variables to substitute.
+                 method is None, 'lower', or 'upper'.
+        """
+        self.source = source
+        self.literals = literals
+        self.fields = fields
+        self.names = {i[0] for i in fields}
+
+        # Jinja template used if a method can't be applied.
+        self._jinja = None
+
+    #-----------------------------------------------------------------------
+    def render(self, data):
+        """Render the template.
+
+        Args:
+          data (dict):  Data dictionary with the template variables.
+
+        Returns:
+          str:  Returns the rendered string.
+        """
+        if not self.fields:
+            return self.literals[0]
+
+        out = [self.literals[0]]
+        for (name, method), text in zip(self.fields, self.literals[1:]):
+            value = data.get(name, _MISSING)
+            if value is _MISSING:
+                if method:
+                    return self._render_jinja(data)
+                value = ""
+            elif method:
+                if not isinstance(value, str):
+                    return self._render_jinja(data)
+                value = value.lower() if method == "lower" else value.upper()
+            else:
+                value = str(value)
+
+            out.append(value)
+            out.append(text)
+
+        return "".join(out)
+
+    #-----------------------------------------------------------------------
+    def _render_jinja(self, data):
+        """Render the template using jinja.
+
+        Args:
+          data (dict):  Data dictionary with the template variables.
+
+        Returns:
+          str:  Returns the rendered string.
+        """
+        if self._jinja is None:
+            self._jinja = _ENV.from_string(self.source)
+        return self._jinja.render(data)
+
+    #-----------------------------------------------------------------------
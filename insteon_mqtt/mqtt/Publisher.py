@@ -0,0 +1,193 @@
+#===========================================================================
+#
+# MQTT outbound publish stage
+#
+#===========================================================================
+import time
+import paho.mqtt.client as paho
+from .. import log
+
+LOG = log.get_logger()
+
+
+class Publisher:
+    """MQTT outbound message filter.
+
+    Devices publish their state every time the Insteon device reports it.
+    Duplicate broadcasts, cleanup messages, and refreshes all report the
+    same state and ramping dimmers can report many levels in a row.  This
+    class sits between mqtt.Mqtt.publish() and the network link and can
+    reduce that traffic in two ways:
+
+    - dedupe: A retained message is not sent if the payload is the same as
+      the last retained payload sent on the topic.  The broker already has
+      that value.
+    - window: Messages are held for window seconds after the first message
+      on a topic.  Only the last payload in that time is sent.
+
+    Both are off by default.  The overrides config maps MQTT topic filters
+    (e.g. 'insteon/aa.bb.cc/#') to dedupe and window settings so they can be
+    changed for individual devices.
+
+    The num_published, num_suppressed, and num_coalesced attributes count
+    the messages that were sent, dropped by dedupe, and replaced by a later
+    message in the window.
+    """
+    def __init__(self, link, timed_call=None):
+        """Constructor
+
+        Args:
+          link (network.Mqtt):  The network MQTT link to publish to.
+          timed_call (network.TimedCall):  Timer used to send the messages
+                     held by the window.  This is required if a window is
+                     used.
+        """
+        self.link = link
+        self.timed_call = timed_call
+
+        self.dedupe = False
+        self.window = 0
+        self.overrides = {}
+
+        # Map of topic -> last retained payload sent.
+        self._last = {}
+
+        # Map of topic -> [payload, qos, retain] held by the window.
+        self._pending = {}
+
+        # Map of topic -> (dedupe, window) from the overrides.
+        self._options = {}
+
+        self.num_published = 0
+        self.num_suppressed = 0
+        self.num_coalesced = 0
+
+    #-----------------------------------------------------------------------
+    def load_config(self, data):
+        """Load the publish settings from the mqtt configuration.
+
+        The input configuration dictionary can contain:
+        - publish_dedupe:  (bool) True to drop unchanged retained messages.
+        - publish_window:  (float) Time in seconds to hold messages.
+        - publish_overrides:  (dict) Topic filter -> dict with optional
+                              dedupe and window keys.
+
+        Args:
+          data (dict):  The mqtt configuration data.
+        """
+        self.dedupe = data.get('publish_dedupe', self.dedupe)
+        self.window = data.get('publish_window', self.window)
+        self.overrides = data.get('publish_overrides', None) or {}
+        self._options.clear()
+
+        if self.window or self.overrides:
+            LOG.info("MQTT publish dedupe=%s window=%s overrides=%d",
+                     self.dedupe, self.window, len(self.overrides))
+
+    #-----------------------------------------------------------------------
+    def publish(self, topic, payload, qos, retain):
+        """Publish a message.
+
+        Args:
+          topic (str):  The MQTT topic to publish with.
+          payload (str):  The MQTT payload to send.
+          qos (int):  The QOS level to use.
+          retain (bool):  The retain flag to use.
+        """
+        dedupe, window = self._find_options(topic)
+        if not window:
+            self._send(topic, payload, qos, retain, dedupe)
+            return
+
+        pending = self._pending.get(topic)
+        if pending is not None:
+            self.num_coalesced += 1
+            pending[:] = [payload, qos, retain]
+            return
+
+        self._pending[topic] = [payload, qos, retain]
+        self.timed_call.add(time.time() + window, self._send_pending, topic)
+
+    #-----------------------------------------------------------------------
+    def flush(self):
+        """Send all the messages held by the window.
+        """
+        for topic in list(self._pending):
+            self._send_pending(topic)
+
+    #-----------------------------------------------------------------------
+    def clear(self):
+        """Clear the last sent payloads.
+
+        This should be called when connecting to the broker since a broker
+        that restarted may not have the retained messages.
+        """
+        self._last.clear()
+
+    #-----------------------------------------------------------------------
+    def _send_pending(self, topic):
+        """Send the message held by the window for a topic.
+
+        Args:
+          topic (str):  The MQTT topic to send.
+        """
+        pending = self._pending.pop(topic, None)
+        if pending is not None:
+            payload, qos, retain = pending
+            self._send(topic, payload, qos, retain,
+                       self._find_options(topic)[0])
+
+    #-----------------------------------------------------------------------
+    def _send(self, topic, payload, qos, retain, dedupe):
+        """Send a message to the link.
+
+        Args:
+          topic (str):  The MQTT topic to publish with.
+          payload (str):  The MQTT payload to send.
+          qos (int):  The QOS level to use.
+          retain (bool):  The retain flag to use.
+          dedupe (bool):  True to drop the message if it's unchanged.
+        """
+        if retain:
+            if dedupe and self._last.get(topic) == payload:
+                self.num_suppressed += 1
+                LOG.debug("MQTT publish unchanged %s %s", topic, payload)
+                return
+
+            self._last[topic] = payload
+
+        else:
+            # Subscribers saw a different value so the next retained message
+            # must be sent.
+            self._last.pop(topic, None)
+
+        self.num_published += 1
+        self.link.publish(topic, payload, qos, retain)
+
+    #-----------------------------------------------------------------------
+    def _find_options(self, topic):
+        """Return the dedupe and window settings for a topic.
+
+        Args:
+          topic (str):  The MQTT topic.
+
+        Returns:
+          (bool, float):  Returns the dedupe flag and window time.
+        """
+        if not self.overrides:
+            return self.dedupe, self.window
+
+        options = self._options.get(topic)
+        if options is None:
+            options = self.dedupe, self.window
+            for sub, values in self.overrides.items():
+                if paho.topic_matches_sub(sub, topic):
+                    options = (values.get('dedupe', self.dedupe),
+                               values.get('window', self.window))
+                    break
+
+            self._options[topic] = options
+
+        return options
+
+    #-----------------------------------------------------------------------
@@ -20,6 +20,7 @@ MQTT messages.
 
 from .BatterySensor import BatterySensor
 from .Dimmer import Dimmer
+from .Dispatch import Dispatch
 from .EZIO4O import EZIO4O
 from .FanLinc import FanLinc
 from .IOLinc import IOLinc
@@ -30,6 +31,7 @@ from .Motion import Motion
 from .Mqtt import Mqtt
 from .MsgTemplate import MsgTemplate
 from .Outlet import Outlet
+from .Publisher import Publisher
 from .Remote import Remote
 from .Reply import Reply
 from .SmokeBridge import SmokeBridge
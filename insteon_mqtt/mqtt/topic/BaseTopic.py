@@ -21,6 +21,10 @@ class BaseTopic:
         self.mqtt = mqtt
         self.device = device
 
+        # Base template data by button.  The address and name don't change
+        # so this is only built once per button.
+        self._base_data = {}
+
     #-----------------------------------------------------------------------
     def base_template_data(self, **kwargs):
         """Create the Jinja templating data variables for use in topics.
@@ -35,10 +39,16 @@ class BaseTopic:
         Returns:
           dict:  Returns a dict with the variables available for templating.
         """
-        data = {"address" : self.device.addr.hex,
-                "name" : self.device.addr.hex}
-        if self.device.name:
-            data['name'] = self.device.name
-        if 'button' in kwargs and kwargs['button'] is not None:
-            data['button'] = kwargs['button']
-        return data
+        button = kwargs.get('button', None)
+        data = self._base_data.get(button, None)
+        if data is None:
+            data = {"address" : self.device.addr.hex,
+                    "name" : self.device.addr.hex}
+            if self.device.name:
+                data['name'] = self.device.name
+            if button is not None:
+                data['button'] = button
+            self._base_data[button] = data
+
+        # Callers add their own variables so return a copy.
+        return data.copy()
@@ -3,7 +3,8 @@
 # Insteon Hub class definition.
 #
 #===========================================================================
-import xml.etree.ElementTree as ET
+import base64
+import re
 import time
 import threading
 import queue
@@ -54,12 +55,23 @@ class Hub():
         self._user = user
         self._password = password
 
+        # Idle time between reads of the hub buffer in seconds.
+        self._poll_time = HubClient.idle_dt
+
         self.client = None
 
+        # Time of the last poll() call.
+        self._last_poll = 0
+
         # List of packets to write.  Each is a tuple of (bytes, time) where
         # the time is the time after which to do the write.
         self._write_buf = []
 
+        # Time in seconds between logging the client statistics (0 to
+        # disable).  See stats() for details.
+        self.metrics_interval = 0
+        self._metrics_time = time.time()
+
     #-----------------------------------------------------------------------
     def load_config(self, config):
         """Load a configuration dictionary.
@@ -71,6 +83,10 @@ class Hub():
         - hub_user (str):  The Hub username (mandatory)
         - hub_password (str):  The Hub password (mandatory)
         - hub_port (int): The Hub port (optional)
+        - hub_poll_time (float): The Hub buffer read time in seconds when
+          there is no traffic (optional)
+        - hub_metrics_interval (float): Time in seconds between logging the
+          Hub statistics (optional)
 
         Args:
           config (dict):  Configuration data to load.
@@ -79,6 +95,9 @@ class Hub():
         self._ip = config.get('hub_ip', self._ip)
         self._user = config.get('hub_user', self._user)
         self._password = config.get('hub_password', self._password)
+        self._poll_time = config.get('hub_poll_time', self._poll_time)
+        self.metrics_interval = config.get('hub_metrics_interval',
+                                           self.metrics_interval)
         # Go ahead and crash now, otherwise we will crash in a more confusing
         # place
         assert self._ip is not None
@@ -122,10 +141,39 @@ class Hub():
         if self.client is None:
             # To allow config to load, this is run on the first loop
             self.client = HubClient(self._ip, self._port, self._user,
-                                    self._password)
+                                    self._password, self._poll_time)
+        self._last_poll = t
         self._read_from_hub()
         self._write_to_hub(t)
 
+        if (self.metrics_interval and
+                t - self._metrics_time >= self.metrics_interval):
+            self._metrics_time = t
+            LOG.info("Hub %s stats: %s", self._ip, self.stats())
+
+    #-----------------------------------------------------------------------
+    def next_poll_time(self):
+        """Return the next time that the link needs to be polled.
+
+        The HubClient reads the hub buffer in its own thread so the hub
+        needs to be polled at the client read rate to pick up new data.  If
+        a packet is waiting to be written, the link also needs to be polled
+        when that packet can be written.
+
+        Returns:
+          float:  Returns the Unix clock time tag of the next poll.
+        """
+        # The client is started by the first poll and any data that has been
+        # read should be processed right away.
+        if self.client is None or self.client.has_read_data():
+            return 0
+
+        next_time = self._last_poll + self.client.read_dt
+        if self._write_buf:
+            next_time = min(next_time, self._write_buf[0][1]())
+
+        return next_time
+
     #-----------------------------------------------------------------------
     def _read_from_hub(self):
         """Read data from the hub
@@ -161,6 +209,16 @@ class Hub():
         # Signal that the packet was written.
         self.signal_wrote.emit(self, data)
 
+    #-----------------------------------------------------------------------
+    def stats(self):
+        """Return the HubClient statistics.
+
+        Returns:
+          dict:  Returns the HubClient.stats() dictionary or None if the
+                 client hasn't been started yet.
+        """
+        return self.client.stats() if self.client else None
+
     #-----------------------------------------------------------------------
     def close(self):
         """Close the link.
@@ -169,7 +227,9 @@ class Hub():
         """
         LOG.info("Hib device closing %s", self._ip)
 
-        self.client.close()
+        if self.client:
+            LOG.info("Hub %s stats: %s", self._ip, self.stats())
+            self.client.close()
         self._write_buf = []
         self.signal_closing.emit(self)
 
@@ -181,7 +241,37 @@ class Hub():
 
 
 class HubClient:
-    def __init__(self, ip, port, user, password):
+    """HTTP client for the Hub.
+
+    The client runs in its own thread.  It reads the hub buffer and writes
+    messages to the hub as soon as they are queued.  A single
+    requests.Session is used for all the calls so the TCP connection to the
+    hub is kept alive between requests.
+
+    The buffer read rate adapts to the traffic.  After a write or when new
+    bytes are read, the buffer is read every burst_dt seconds so replies are
+    seen quickly and the hub's small ring buffer doesn't overflow.  When
+    nothing is happening, the time between reads backs off by backoff
+    towards the idle time.
+    """
+    # Matches the hex buffer contents in the buffstatus.xml response.
+    buffer_re = re.compile(rb"<BS>([0-9A-Fa-f]+)</BS>")
+
+    # Default idle time between reads of the hub buffer in seconds.
+    idle_dt = .5
+
+    # Time between reads of the hub buffer when there is traffic.
+    burst_dt = .1
+
+    # Read time multiplier to use when no new data is read.
+    backoff = 1.5
+
+    # Time to wait before reading again after a connection error.  This
+    # doubles for each error in a row up to the max.
+    error_dt = .1
+    max_error_dt = 5
+
+    def __init__(self, ip, port, user, password, idle_dt=None):
         """Constructor.
 
         Args:
@@ -189,16 +279,39 @@ class HubClient:
           port: (int) the port number of the Hub.
           user: (str) the Hub username
           password: (str) the Hub password
+          idle_dt: (float) the time between reads of the hub buffer when
+                   there is no traffic.  If None, HubClient.idle_dt is used.
         """
         self.ip = ip
         self.port = port
         self.user = user
         self.password = password
+
+        # Persistent HTTP session with the basic auth header built once.
+        auth = base64.b64encode(("%s:%s" % (user, password)).encode("latin1"))
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = "Basic %s" % auth.decode()
+        self._url = 'http://%s:%s' % (ip, port)
+
         # Flag for close signal
         self._close = False
         self._read_queue = queue.Queue()
         self._write_queue = queue.Queue()
         self.read_timeout_count = 0
+        self.read_error_count = 0
+
+        # Current time between reads of the hub buffer in seconds.
+        if idle_dt is not None:
+            self.idle_dt = idle_dt
+        self.read_dt = self.idle_dt
+
+        # Statistics - see stats().
+        self.read_count = 0
+        self.write_count = 0
+        self.overflow_count = 0
+        self.latency_total = 0
+        self.latency_max = 0
+
         self._prev_bytestring = ''
         self._prev_byte_end = -1
         # My current hub uses a 200 character buffer, not sure if any other
@@ -246,6 +359,23 @@ class HubClient:
         '''
         self._write_queue.put(bytes)
 
+    def stats(self):
+        '''Returns a dictionary of the client statistics.
+
+        The statistics are the number of buffer reads and writes, the number
+        of buffer overflows, the average and max HTTP request time in
+        seconds, and the current time between buffer reads.
+        '''
+        num = self.read_count + self.write_count
+        return {
+            'reads' : self.read_count,
+            'writes' : self.write_count,
+            'overflows' : self.overflow_count,
+            'latency_avg' : self.latency_total / num if num else 0,
+            'latency_max' : self.latency_max,
+            'read_dt' : self.read_dt,
+            }
+
     def _thread(self):
         '''This runs in its own thread.  It constantly loops until the main
         thread is terminated or self.close() is called.
@@ -254,50 +384,123 @@ class HubClient:
             start_time = time.time()
 
             # Read First, get Buffer Contents
-            response = self._get_hub_buffer()
-            if not response:
-                # Error reading the buffer pause slightly before looping
-                time.sleep(.1)
+            active = self._read_buffer()
+            if active is None:
+                # Error reading the buffer pause before looping.  Back off
+                # while the hub can't be reached.
+                time.sleep(self._error_wait())
                 continue
 
-            # reset on successful read
-            self.read_timeout_count = 0
-
-            (bytestring, byte_end) = self._parse_buffer(response)
-
-            new_string = self._parse_bytes(bytestring, byte_end)
-            if new_string is not None:
-                self._read_queue.put((bytes.fromhex(new_string)))
+            # Read quickly while data is arriving, otherwise slow down.
+            self._update_read_dt(active)
 
             # Now write
             self._perform_write()
 
-            # Only hammering at hub server twice per second.  Seems to result
-            # in the PLM ACK and device message arriving together, but no more
-            # than that. Could consider slowing down, but waiting too long
-            # could cause the buffer to overflow and would slow down our
-            # responses.  Would also need to increase the hub ack_time
-            # accordingly too.  I have done up to 3 requests per second with
-            # good results.
-            sleep_time = (start_time + .5) - time.time()
+            # The idle rate of twice per second seems to result in the PLM ACK
+            # and device message arriving together, but no more than that.
+            # Waiting too long could cause the buffer to overflow and would
+            # slow down our responses.  Would also need to increase the hub
+            # ack_time accordingly too.  Messages that are queued while
+            # waiting are written right away.
+            sleep_time = (start_time + self.read_dt) - time.time()
             if sleep_time > 0:
-                time.sleep(sleep_time)
+                self._wait_for_write(start_time + self.read_dt)
             elif sleep_time < -2:
                 seconds = str(round(abs(sleep_time), 2))
                 LOG.warning('Hub %s loop took %s to complete', self.ip,
                             seconds)
 
+    def _wait_for_write(self, end_time):
+        '''Waits until the end time, writing any messages that are queued.
+
+        Args:
+          end_time (float): The Unix clock time tag to wait until.
+        '''
+        while not self._close:
+            time_out = end_time - time.time()
+            if time_out <= 0:
+                return
+
+            try:
+                command = self._write_queue.get(timeout=time_out)
+            except queue.Empty:
+                return
+
+            # Writing empties the hub buffer so read any bytes that arrived
+            # since the last read first.  Then read the reply soon after the
+            # write.
+            self._read_buffer()
+            self._write_command(command)
+            end_time = min(end_time, time.time() + self.read_dt)
+
+    def _read_buffer(self):
+        '''Reads the hub buffer and queues any new bytes.
+
+        Returns:
+          bool: True if new bytes were read, False otherwise.  None is
+                returned if the buffer couldn't be read.
+        '''
+        response = self._get_hub_buffer()
+        if not response:
+            return None
+
+        # reset on successful read
+        if self.read_error_count:
+            LOG.info('Reading from Hub %s after %d errors', self.ip,
+                     self.read_error_count)
+        self.read_timeout_count = 0
+        self.read_error_count = 0
+
+        (bytestring, byte_end) = self._parse_buffer(response)
+        if bytestring is None:
+            return False
+
+        new_string = self._parse_bytes(bytestring, byte_end)
+        if new_string is None:
+            return False
+
+        self._read_queue.put((bytes.fromhex(new_string)))
+        return True
+
+    def _error_wait(self):
+        '''Returns the time to wait before reading again after an error.
+
+        The time doubles for each connection error in a row up to
+        max_error_dt.
+        '''
+        count = min(self.read_error_count, 10)
+        return min(self.error_dt * 2 ** max(count - 1, 0), self.max_error_dt)
+
+    def _update_read_dt(self, active):
+        '''Updates the time between buffer reads.
+
+        Args:
+          active (bool): True if there was traffic, False otherwise.
+        '''
+        if active:
+            self.read_dt = self.burst_dt
+        else:
+            self.read_dt = min(self.idle_dt, self.read_dt * self.backoff)
+
+    def _record_latency(self, start_time):
+        '''Records the time taken by a HTTP request.
+
+        Args:
+          start_time (float): The Unix clock time tag the request started.
+        '''
+        dt = time.time() - start_time
+        self.latency_total += dt
+        self.latency_max = max(self.latency_max, dt)
+
     def _get_hub_buffer(self):
         '''
         Performs the HTTP call to get the read buffer.
         '''
+        start_time = time.time()
         try:
-            response = requests.get('http://%s:%s/buffstatus.xml' %
-                                    (self.ip, self.port),
-                                    auth=requests.auth.HTTPBasicAuth(
-                                        self.user,
-                                        self.password),
-                                    timeout=5)
+            response = self.session.get(self._url + '/buffstatus.xml',
+                                        timeout=5)
         except requests.exceptions.Timeout:
             # Warn for a bit, this can happen if the hub is overloaded
             LOG.warning('Timeout reading from Hub %s', self.ip)
@@ -308,6 +511,19 @@ class HubClient:
                           self.ip)
                 self.read_timeout_count = 0
             return False
+        except requests.exceptions.RequestException as e:
+            # Warn on the first error and then only every so often so the
+            # log isn't flooded while the hub is offline.
+            self.read_error_count += 1
+            if self.read_error_count == 1:
+                LOG.warning('Error reading from Hub %s: %s', self.ip, e)
+            elif self.read_error_count % 20 == 0:
+                LOG.error('Unable to read from Hub %s (%d errors): %s',
+                          self.ip, self.read_error_count, e)
+            return False
+
+        self.read_count += 1
+        self._record_latency(start_time)
         return response
 
     def _parse_buffer(self, response):
@@ -316,15 +532,18 @@ class HubClient:
         final byte describing the position of the end of the buffer.  This
         function slices the buffer at the end point and stiches it back
         together in the proper order.
+
+        Returns (None, None) if the response doesn't contain a buffer.
         '''
-        # This could be done without ElementTree, I wonder if it is overkill
-        root = ET.fromstring(response.text)
-        # This seems overly complex, can this be directly referenced?
-        # for response in root:
-        #     if response.tag == 'BS':
-        #         bytestring = response.text
-        #         break
-        bytestring = root.find('BS').text
+        # The response is a tiny fixed format XML document so just pull out
+        # the buffer element rather than parsing the whole thing.
+        match = self.buffer_re.search(response.content)
+        if not match:
+            LOG.error('Unknown buffer response from Hub %s: %s', self.ip,
+                      response.content)
+            return (None, None)
+
+        bytestring = match.group(1).decode()
 
         # Place buffer in sequential order
         # The last byte of the bytestring tells us where the buffer ends
@@ -354,9 +573,10 @@ class HubClient:
                 if self._prev_bytestring == verify_bytestring:
                     ret = bytestring[-new_length:]
                 else:
-                    LOG.error('Read buff overflow Hub %s, prev %s, verify %s',
-                              self.ip, self._prev_bytestring,
-                              verify_bytestring)
+                    self.overflow_count += 1
+                    LOG.error('Read buff overflow Hub %s, prev %s, verify %s '
+                              '(%d overflows)', self.ip, self._prev_bytestring,
+                              verify_bytestring, self.overflow_count)
 
         self._prev_bytestring = bytestring[-self.verify_length:]
         self._prev_byte_end = byte_end
@@ -366,22 +586,33 @@ class HubClient:
         ''' Writes to the hub if there are messages Waiting
         '''
         if not self._write_queue.empty():
-            command = self._write_queue.get()
-            cmd_str = command.hex()
-            url = 'http://%s:%s/3?%s=I=3' % (self.ip, self.port, cmd_str)
-            try:
-                requests.get(url,
-                             auth=requests.auth.HTTPBasicAuth(self.user,
-                                                              self.password),
-                             timeout=3)
-            except requests.exceptions.Timeout:
-                # Since there are retries built in above this, we don't resend
-                # here on the chance that the message did get through
-                LOG.error('Unable to write to Hub %s', self.ip)
-            # When we write to the Hub, it empties and resets the read buffer
-            if self.verify_length > 0:
-                empty = '0'
-                self._prev_bytestring = empty * self.verify_length
-            else:
-                self._prev_bytestring = ''
-            self._prev_byte_end = 0
+            self._write_command(self._write_queue.get())
+
+    def _write_command(self, command):
+        ''' Writes a message to the hub.
+
+        Args:
+          command (bytes): The message to write.
+        '''
+        url = '%s/3?%s=I=3' % (self._url, command.hex())
+        start_time = time.time()
+        try:
+            self.session.get(url, timeout=3)
+        except requests.exceptions.RequestException:
+            # Since there are retries built in above this, we don't resend
+            # here on the chance that the message did get through
+            LOG.error('Unable to write to Hub %s', self.ip)
+        else:
+            self.write_count += 1
+            self._record_latency(start_time)
+
+        # Look for the reply quickly.
+        self.read_dt = self.burst_dt
+
+        # When we write to the Hub, it empties and resets the read buffer
+        if self.verify_length > 0:
+            empty = '0'
+            self._prev_bytestring = empty * self.verify_length
+        else:
+            self._prev_bytestring = ''
+        self._prev_byte_end = 0
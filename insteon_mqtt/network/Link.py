@@ -80,6 +80,21 @@ class Link:
         """
         pass  # pragma: no cover
 
+    #-----------------------------------------------------------------------
+    def next_poll_time(self):
+        """Return the next time that the link needs to be polled.
+
+        The manager uses this to limit how long it waits for activity before
+        calling poll().  Links that do time based processing in poll()
+        should return the time of the next event.
+
+        Returns:
+          float:  Returns the Unix clock time tag at which poll() should be
+                  called or None if the link doesn't need to be polled at a
+                  specific time.
+        """
+        return None
+
     #-----------------------------------------------------------------------
     def read_from_link(self):
         """Read data from the link.
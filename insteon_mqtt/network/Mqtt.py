@@ -3,6 +3,7 @@
 # Network link to an MQTT client class
 #
 #===========================================================================
+import time
 import paho.mqtt.client as paho
 from .. import log
 from ..Signal import Signal
@@ -26,6 +27,13 @@ class Mqtt(Link):
 
     Input fields can be set via the constructor or by loading a configuration
     file (see load_config for details).
+
+    Outbound packets are buffered by the paho client and written when the
+    network manager reports the socket is writable.  Everything published
+    during one event loop iteration (e.g. the state messages for all the
+    responders of a scene) is written in a single write cycle.  The number
+    of messages published and the number written per cycle are available
+    from metrics().
     """
     def __init__(self, host="127.0.0.1", port=1883, id=None,
                  reconnect_dt=10):
@@ -59,6 +67,20 @@ class Mqtt(Link):
         self._reconnect_dt = reconnect_dt
         self._fd = None
 
+        # True if signal_needs_write(True) has been emitted.
+        self._write_pending = False
+
+        # Publish metrics.  Time in seconds between logging the metrics (0
+        # to disable).  See metrics() for details.
+        self.metrics_interval = 0
+        self.num_published = 0
+        self.num_flushes = 0
+        self.max_flush_size = 0
+        self._flush_size = 0
+        self._metrics_time = time.time()
+        self._metrics_published = 0
+        self._metrics_flushes = 0
+
         # Create the MQTT client and set the callbacks to our methods.
         self.client = paho.Client(client_id=self.id, clean_session=False)
         self.client.on_connect = self._on_connect
@@ -66,6 +88,11 @@ class Mqtt(Link):
         self.client.on_message = self._on_message
         self.client.on_log = self._on_log
 
+        # Have the client tell us when it has data to write instead of
+        # writing each packet as soon as it's queued.  Older paho versions
+        # don't support this and write the packets right away.
+        self.client.on_socket_register_write = self._on_register_write
+
     #-----------------------------------------------------------------------
     def load_config(self, config):
         """Load a configuration dictionary.
@@ -78,6 +105,8 @@ class Mqtt(Link):
         - username (str):  Optional user name to log in with.
         - password (str):  Optional password to log in with.
         - id (str): Optional MQTT client id (max 23 characters)
+        - metrics_interval (float):  Optional time in seconds between
+          logging the publish metrics.
 
         Args:
           config (dict):  Configuration data to load.
@@ -87,6 +116,8 @@ class Mqtt(Link):
         self.host = config['broker']
         self.port = config['port']
         self.keep_alive = config.get("keep_alive", self.keep_alive)
+        self.metrics_interval = config.get("metrics_interval",
+                                           self.metrics_interval)
 
         id = config.get("id")
         if id is not None:
@@ -109,7 +140,9 @@ class Mqtt(Link):
           retain (bool):  True to mark the message as retained.
         """
         self.client.publish(topic, payload, qos, retain)
-        self.signal_needs_write.emit(self, True)
+        self.num_published += 1
+        self._flush_size += 1
+        self._needs_write(True)
 
         LOG.debug("MQTT publish %s %s qos=%s ret=%s", topic, payload, qos,
                   retain)
@@ -135,7 +168,7 @@ class Mqtt(Link):
         if callback:
             self.client.message_callback_add(topic, callback)
 
-        self.signal_needs_write.emit(self, True)
+        self._needs_write(True)
 
         LOG.debug("MQTT subscribe %s qos=%s", topic, qos)
 
@@ -149,10 +182,40 @@ class Mqtt(Link):
         # Tell the client about it and then notify the manager that we have
         # messages to send.
         self.client.unsubscribe(topic)
-        self.signal_needs_write.emit(self, True)
+        self._needs_write(True)
 
         LOG.debug("MQTT unsubscribe %s", topic)
 
+    #-----------------------------------------------------------------------
+    def metrics(self):
+        """Return the publish metrics.
+
+        The rates are computed from the messages published since the last
+        call to metrics().
+
+        Returns:
+          dict:  Returns a dict with the total number of messages published
+          and write cycles (flushes), the publish rate in messages/sec, the
+          average number of messages per flush, and the maximum number of
+          messages written in one flush.
+        """
+        t = time.time()
+        published = self.num_published - self._metrics_published
+        flushes = self.num_flushes - self._metrics_flushes
+        dt = t - self._metrics_time
+
+        self._metrics_time = t
+        self._metrics_published = self.num_published
+        self._metrics_flushes = self.num_flushes
+
+        return {
+            "published" : self.num_published,
+            "flushes" : self.num_flushes,
+            "publish_rate" : published / dt if dt > 0 else 0.0,
+            "flush_size" : published / flushes if flushes else 0.0,
+            "max_flush_size" : self.max_flush_size,
+            }
+
     #-----------------------------------------------------------------------
     def fileno(self):
         """Return the file descriptor to watch for this link.
@@ -185,6 +248,10 @@ class Mqtt(Link):
         if rc == paho.MQTT_ERR_NO_CONN:
             self._on_disconnect(self.client, None, rc)
 
+        if (self.metrics_interval and
+                t - self._metrics_time >= self.metrics_interval):
+            LOG.info("MQTT publish metrics: %s", self.metrics())
+
     #-----------------------------------------------------------------------
     def retry_connect_dt(self):
         """Return a positive integer (seconds) if the link should reconnect.
@@ -210,6 +277,11 @@ class Mqtt(Link):
                                 keepalive=self.keep_alive)
             self._fd = self.client.socket().fileno()
 
+            # The manager hasn't added the link yet so it can't be told
+            # that we need to write.  Send the connect packet now.
+            self._write_pending = False
+            self.client.loop_write()
+
             LOG.info("MQTT device opened %s %s with keepalive=%s", self.host,
                      self.port, self.keep_alive)
             return True
@@ -253,15 +325,22 @@ class Mqtt(Link):
         Args:
            t (float):  The current time (time.time).
         """
-        LOG.debug("MQTT writing")
-
-        # Tell the MQTT client that it can write.
+        # Number of messages published since the last write.
+        size = self._flush_size
+        if size:
+            self._flush_size = 0
+            self.num_flushes += 1
+            self.max_flush_size = max(self.max_flush_size, size)
+            LOG.debug("MQTT writing %d messages", size)
+
+        # Tell the MQTT client that it can write.  This writes all the
+        # queued packets until the socket would block.
         self.client.loop_write()
 
         # If there is no more data to write, remove us from the write
         # watching.
         if not self.client.want_write():
-            self.signal_needs_write.emit(self, False)
+            self._needs_write(False)
 
     #-----------------------------------------------------------------------
     def close(self):
@@ -272,7 +351,12 @@ class Mqtt(Link):
         LOG.info("MQTT device closing %s %s", self.host, self.port)
 
         self.client.disconnect()
-        self.signal_needs_write.emit(self, True)
+        self._needs_write(True)
+
+        # The event loop may not run again (shutdown) so try to send the
+        # queued messages and the disconnect now.
+        if self.connected:
+            self.write_to_link(time.time())
 
     #-----------------------------------------------------------------------
     def _on_connect(self, client, data, flags, result):
@@ -311,6 +395,7 @@ class Mqtt(Link):
         LOG.info("MQTT disconnection %s %s", self.host, self.port)
 
         self.connected = False
+        self._write_pending = False
         self.signal_closing.emit(self)
 
     #-----------------------------------------------------------------------
@@ -327,6 +412,31 @@ class Mqtt(Link):
         LOG.info("MQTT message %s %s", message.topic, message.payload)
         self.signal_message.emit(self, message)
 
+    #-----------------------------------------------------------------------
+    def _on_register_write(self, client, data, sock):
+        """MQTT client has data to write callback.
+
+        Args:
+          client (paho.Client):  The paho mqtt client (self.client).
+          data:  Optional user data (unused).
+          sock:  The client socket.
+        """
+        self._needs_write(True)
+
+    #-----------------------------------------------------------------------
+    def _needs_write(self, needs_write):
+        """Tell the manager if we need to write.
+
+        The signal is only emitted when the write state changes so the
+        manager isn't notified for every message.
+
+        Args:
+          needs_write (bool):  True if the link has data to write.
+        """
+        if needs_write != self._write_pending:
+            self._write_pending = needs_write
+            self.signal_needs_write.emit(self, needs_write)
+
     #-----------------------------------------------------------------------
     def _on_log(self, client, data, level, buf):
         """MQTT client logging callback
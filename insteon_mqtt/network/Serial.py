@@ -65,6 +65,12 @@ class Serial(Link):
         # the time is the time after which to do the write.
         self._write_buf = []
 
+        # True if the next packet can't be written until its write time.
+        # While waiting, the link doesn't watch for writing (a serial port
+        # is always writable) and poll() re-enables writing when the time
+        # has been reached.
+        self._write_delayed = False
+
         # Create the serial client but don't open it yet.  We'll wait for a
         # connection call to do that.
         self.client = None
@@ -119,6 +125,7 @@ class Serial(Link):
         """
         # Save the input data to the write queue.
         self._write_buf.append((data, next_write_time))
+        self._write_delayed = False
         self.signal_needs_write.emit(self, True)
 
         # if we have exceed the max queue size, pop the oldest packet off.
@@ -159,6 +166,34 @@ class Serial(Link):
             LOG.exception("Serial connection error to %s", self.client.port)
             return False
 
+    #-----------------------------------------------------------------------
+    def poll(self, t):
+        """Periodic poll callback.
+
+        If writing was delayed until the next permitted write time and that
+        time has been reached, start watching for writing again.
+
+        Args:
+           t (float):  Current Unix clock time tag.
+        """
+        if (self._write_delayed and self._write_buf and
+                t >= self._write_buf[0][1]()):
+            self._write_delayed = False
+            self.signal_needs_write.emit(self, True)
+
+    #-----------------------------------------------------------------------
+    def next_poll_time(self):
+        """Return the next time that the link needs to be polled.
+
+        Returns:
+          float:  Returns the write time of the next packet if writing is
+                  delayed.  None otherwise.
+        """
+        if self._write_delayed and self._write_buf:
+            return self._write_buf[0][1]()
+
+        return None
+
     #-----------------------------------------------------------------------
     def read_from_link(self):
         """Read data from the link.
@@ -202,9 +237,13 @@ class Serial(Link):
 
         # Get the next data packet to write from the write queue and see if
         # enough time has elapsed to write the message.
+        # If it's too soon, stop watching for writing until poll() sees that
+        # the write time has been reached.
         data, next_write_time = self._write_buf[0]
         if t < next_write_time():
             #LOG.debug("Waiting to write %f < %f", t, next_write_time())
+            self._write_delayed = True
+            self.signal_needs_write.emit(self, False)
             return
 
         try:
@@ -248,6 +287,7 @@ class Serial(Link):
         self.client.close()
         self._fd = None
         self._write_buf = []
+        self._write_delayed = False
         self.signal_closing.emit(self)
 
     #-----------------------------------------------------------------------
@@ -84,6 +84,16 @@ class Stack:
                         LOG.exception("Error in executing stack function, "
                                       "continuing on to next function.")
 
+    #-----------------------------------------------------------------------
+    def next_poll_time(self):
+        """Return the next time that poll() needs to be called.
+
+        Returns:
+          float:  Returns 0 if there are function calls waiting so the next
+                  call is made on the next loop.  None otherwise.
+        """
+        return 0 if self.groups else None
+
     #-----------------------------------------------------------------------
     def new(self, error_stop=True):
         """Initialize and create a new group of functional calls`
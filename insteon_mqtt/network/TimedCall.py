@@ -3,6 +3,7 @@
 # TimedCall class definition.
 #
 #===========================================================================
+from ..Scheduler import Scheduler
 from ..Signal import Signal
 from .. import log
 
@@ -45,9 +46,9 @@ class TimedCall:
         # this directly.  signature: (Link link, bool connected)
         self.signal_connected = Signal()
 
-        # The list of functions to call.  Each item should be a
+        # The queue of functions to call.  Each item should be a
         # CallObject
-        self.calls = []
+        self.calls = Scheduler()
 
     #-----------------------------------------------------------------------
     def poll(self, t):
@@ -58,25 +59,31 @@ class TimedCall:
 
         This is where we inject the function calls.  The main loop calls this
         once per loop.  This checks to see if the time associated with any of
-        the CallObjects has elapsed.  If it has, call the function.
-
-        Only a single call is performed each loop.  Currently, there is no
-        reason to think that multiple calls would be necessary.
+        the CallObjects has elapsed.  If it has, call the function.  All of
+        the calls that are due are run in the same loop.
 
         Args:
            t (float):  Current Unix clock time tag.
         """
-        if len(self.calls) > 0:
-            if self.calls[0].time < t:
-                entry = self.calls.pop(0)
-                try:
-                    entry.func(*entry.args, **entry.kwargs)
-                except:
-                    LOG.error("Error in executing TimedCall function")
+        for entry in self.calls.pop_due(t):
+            try:
+                entry.func(*entry.args, **entry.kwargs)
+            except:
+                LOG.error("Error in executing TimedCall function")
+
+    #-----------------------------------------------------------------------
+    def next_poll_time(self):
+        """Return the next time that poll() needs to be called.
+
+        Returns:
+          float:  Returns the Unix clock time tag of the next call or None if
+                  there are no calls.
+        """
+        return self.calls.next_time()
 
     #-----------------------------------------------------------------------
     def add(self, time, func, *args, **kwargs):
-        """Adds a call to the calls list and sorts the list
+        """Adds a call to the calls queue
 
         Args:
           time (float):  The Unix clock time tag at which the call should run
@@ -86,24 +93,19 @@ class TimedCall:
           The created (CallObject)
          """
         new_call = CallObject(time, func, *args, **kwargs)
-        self.calls.append(new_call)
-        self.calls.sort(key=lambda call: call.time)
+        new_call.entry = self.calls.add(time, new_call)
         return new_call
 
     #-----------------------------------------------------------------------
     def remove(self, call):
-        """Removes a call from the calls list
+        """Removes a call from the calls queue
 
         Args:
           call (CallObject):  The CallObject to delete, from add()
         Returns:
           True if a call was removed, False otherwise
         """
-        ret = False
-        if call in self.calls:
-            self.calls.remove(call)
-            ret = True
-        return ret
+        return self.calls.remove(call.entry)
 
     #-----------------------------------------------------------------------
     def close(self):
@@ -132,3 +134,6 @@ class CallObject:
         self.func = func
         self.args = args
         self.kwargs = kwargs
+
+        # Scheduler entry - set by TimedCall.add().
+        self.entry = None
@@ -11,6 +11,9 @@ This package handles network and serial connections.  It uses select/poll
 systems to manage multiple connections and read data notifications are
 handled via the Signal class (loose coupling).
 
+An asyncio based manager (AsyncManager) is also available.  It supports
+the same links plus native coroutine links.
+
 The network manager supports delayed connections (so remote hosts don't have
 to be available right away) and automatic reconnections if links get closed
 for maximum robustness.
@@ -31,3 +34,5 @@ if platform.system() != 'Windows':
     from .poll import Manager
 else:
     from .select import Manager
+
+from .asyncio import Manager as AsyncManager
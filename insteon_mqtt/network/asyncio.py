@@ -0,0 +1,422 @@
+#===========================================================================
+#
+# asyncio based network manager.
+#
+#===========================================================================
+import asyncio
+import itertools
+import time
+from .. import log
+
+LOG = log.get_logger(__name__)
+
+
+class Manager:
+    """asyncio based network event loop manager.
+
+    This class implements the same API as the poll and select managers but
+    uses an asyncio event loop to watch the links.  Link file descriptors
+    are registered with the loop reader/writer callbacks so regular Link
+    objects (Serial, Mqtt, etc) work unchanged.
+
+    Links can also be native coroutines.  These links implement an async
+    run() method and are added with add_async().  The manager runs them as
+    tasks on the event loop while select() is running.  Coroutine links can
+    call Manager.wake() to make select() return early.
+
+    Unlike the other managers, links are not polled on every call to
+    select().  A link is polled when it has read or written data, when the
+    time returned by Link.next_poll_time() is reached, or at least every
+    Manager.min_time_out seconds.
+
+        mgr = Manager()
+        mgr.add( MyLink(...) )
+        mgr.add_async( MyAsyncLink(...) )
+        while mgr.active():
+            mgr.select()
+    """
+    # Minimum time out - used to poll links for reconnection and other random
+    # processing.
+    min_time_out = 3  # seconds
+
+    #-----------------------------------------------------------------------
+    def __init__(self, loop=None):
+        """Constructor.
+
+        Args:
+          loop (asyncio.AbstractEventLoop):  Optional event loop to use.  If
+               this is None, a new selector event loop is created.
+        """
+        # The loop must support add_reader() and add_writer() so use a
+        # selector loop by default (the Windows proactor loop doesn't).
+        self.loop = loop if loop else asyncio.SelectorEventLoop()
+
+        # Map of fileno to Link objects.
+        self.links = {}
+        # List of links to only call poll() on.
+        self.poll_links = []
+        # Map of coroutine links to their asyncio.Task.
+        self.tasks = {}
+
+        # List of unconnected link tuples (Link, time) where time is the time
+        # is the next time to try reconnecting the linnk.
+        self.unconnected = []
+
+        # Time out to use when trying to reconnect links.
+        self.unconnected_time_out = 1.0  # sec
+
+        # Links that have read or written data in the current select() call.
+        # These are polled at the end of the call.
+        self._active = set()
+
+        # Future that select() is waiting on.  Setting the result ends the
+        # wait.
+        self._wait = None
+
+        # Last time that every link was polled.
+        self._poll_all_time = 0
+
+        # Exception raised by a link in a reader/writer callback.  The event
+        # loop would log and drop it so select() raises it instead like the
+        # other managers do.
+        self._error = None
+
+    #-----------------------------------------------------------------------
+    def active(self):
+        """Returns non-zero if the link has active links or unconnected links.
+        """
+        return len(self.links) + len(self.unconnected) + len(self.tasks)
+
+    #-----------------------------------------------------------------------
+    def add_poll(self, link):
+        """Add a Link that is only polled.
+
+        The input link does not need a file descriptor and only has to
+        support the poll() method from the Link class.  The link closing
+        signal can be used to remove the link from the manager.
+
+        Args:
+          link (Link):  Link object to add to the manager.
+        """
+        LOG.debug("Polling link added: %s", link)
+        self.poll_links.append(link)
+
+        link.signal_closing.connect(self.poll_link_closing)
+        link.signal_connected.emit(link, True)
+
+    #-----------------------------------------------------------------------
+    def add_async(self, link):
+        """Add a coroutine Link to the manager.
+
+        The link must implement an async run() method which is run as a task
+        on the event loop.  When run() returns, the link is removed from the
+        manager.  If link.retry_connect_dt() returns a time, the link will be
+        started again after that time.
+
+        Coroutine links are also polled like other links if they have a
+        poll() method.
+
+        Args:
+          link:  Link object with an async run() method.
+        """
+        LOG.debug("Async link added: %s", link)
+
+        task = self.loop.create_task(link.run())
+        task.add_done_callback(lambda task: self._async_link_done(link, task))
+        self.tasks[link] = task
+
+        link.signal_connected.emit(link, True)
+
+    #-----------------------------------------------------------------------
+    def add(self, link, connected=True):
+        """Add a Link to the manager.
+
+        To remove a link, call link.close().
+
+        Args:
+          link (Link):  Link object to add to the manager.
+          connected (bool):  True if the link is already connected.  False
+                    if the manager should try and connect the link itself.
+        """
+        LOG.debug("Link added: %s", link)
+
+        # If the link is connected, we can get it's file descriptor and add
+        # it to the event loop.
+        if connected:
+            fd = link.fileno()
+            self.loop.add_reader(fd, self._read_ready, link)
+
+            # Connect the link signals so we know when it closes or needs to
+            # write data.
+            link.signal_closing.connect(self.link_closing)
+            link.signal_needs_write.connect(self.link_needs_write)
+
+            self.links[fd] = link
+
+            # Now that the fd is registered, we can notify others that the
+            # links is ready to read or write.
+            link.signal_connected.emit(link, True)
+
+        # For unconnected links, store them for later checking.
+        else:
+            data = (link, time.time())
+            self.unconnected.append(data)
+
+    #-----------------------------------------------------------------------
+    def remove(self, link):
+        """Remove a link from the manager.
+
+        To remove a link, call link.close() - this method should generally
+        not be used to remove the link.
+
+        Args:
+          link (Link):  The link to remove.  If the link isn't in the
+               manager, nothing is done.
+        """
+        fd = link.fileno()
+        if fd not in self.links:
+            return
+
+        link.signal_closing.disconnect(self.link_closing)
+        link.signal_needs_write.disconnect(self.link_needs_write)
+
+        self.loop.remove_reader(fd)
+        self.loop.remove_writer(fd)
+        self.links.pop(fd, None)
+
+        LOG.debug("Link removed %s", link)
+
+    #-----------------------------------------------------------------------
+    def close_all(self):
+        """Close all the links in the manager.
+
+        This wlil call Link.close() to shut the links down and cancel any
+        coroutine links.
+        """
+        links = list(self.links.values())
+        for link in links:
+            link.close()
+
+        for task in list(self.tasks.values()):
+            task.cancel()
+
+    #-----------------------------------------------------------------------
+    def wake(self):
+        """Make the current select() call return.
+
+        This can be called by coroutine links or reader/writer callbacks
+        when they have done something that requires polling.
+        """
+        if self._wait and not self._wait.done():
+            self._wait.set_result(True)
+
+    #-----------------------------------------------------------------------
+    def select(self, time_out=None):
+        """Run one iteration of the event loop.
+
+        This runs the asyncio event loop until a link reads or writes data,
+        wake() is called, or the time out is reached.  Then the links that
+        need it are polled.
+
+        Arg:
+           time_out (int):  Time out to use in seconds.  The actual time out
+                    value is is the minimum of this, the manager reconnect
+                    time out, the unconnected retry time out, and the time
+                    until the next link poll time.
+        """
+        # Get the actual time out to use.
+        time_out = Manager.min_time_out if time_out is None else time_out
+        if self.unconnected:
+            time_out = min(time_out, self.unconnected_time_out)
+
+        # Don't wait past the next time that a link needs to be polled.
+        next_time = self.next_poll_time()
+        if next_time is not None:
+            time_out = max(0, min(time_out, next_time - time.time()))
+
+        # Run the event loop until the wait future is set by a link callback
+        # or the time out.
+        self._wait = self.loop.create_future()
+        timer = self.loop.call_later(time_out, self.wake)
+        try:
+            self.loop.run_until_complete(self._wait)
+        finally:
+            timer.cancel()
+            self._wait = None
+
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+        # Handle any links that need to be connected.
+        t = time.time()
+        for i in range(len(self.unconnected) - 1, -1, -1):
+            link, next_time = self.unconnected[i]
+
+            # If we're after the reconnect time, try and connect the linkn.
+            if t >= next_time:
+                LOG.debug("Link connection attempt %s", link)
+                if link.connect():
+                    # Connection success - add the link to the manager.
+                    LOG.debug("Link connection success %s", link)
+                    self.add(link)
+                    del self.unconnected[i]
+                else:
+                    LOG.debug("Link connection failed %s", link)
+                    self.unconnected[i] = (link, t + link.retry_connect_dt())
+
+        # Poll the links that had activity or have reached their poll time.
+        # Every link is polled at least every min_time_out seconds in case it
+        # needs to do processing that it doesn't report a poll time for.
+        poll_all = t >= self._poll_all_time + self.min_time_out
+        if poll_all:
+            self._poll_all_time = t
+
+        active = self._active
+        self._active = set()
+
+        # Copy the links before iterating since polling can close a link
+        # which mods the dict.
+        links = itertools.chain(list(self.links.values()), self.poll_links,
+                                list(self.tasks))
+        for link in links:
+            if poll_all or link in active or self._is_poll_due(link, t):
+                poll = getattr(link, "poll", None)
+                if poll:
+                    poll(t)
+
+    #-----------------------------------------------------------------------
+    def next_poll_time(self):
+        """Return the earliest time that any link needs to be polled.
+
+        Returns:
+          float:  Returns the Unix clock time tag of the earliest
+                  Link.next_poll_time() or None if no link has one.
+        """
+        next_time = None
+        for link in itertools.chain(self.links.values(), self.poll_links,
+                                    self.tasks):
+            get_time = getattr(link, "next_poll_time", None)
+            t = get_time() if get_time else None
+            if t is not None and (next_time is None or t < next_time):
+                next_time = t
+
+        return next_time
+
+    #-----------------------------------------------------------------------
+    def link_closing(self, link):
+        """Callback when a link is closing.
+
+        This is called when the Link.close() occurs.  It will remove the link
+        from the manager.  If the link.return_connect_dt() returns a time,
+        the link is added to the unconnected list for later re-connection.
+
+        Arg:
+          link (Link):  The link that is closing.
+        """
+        self.remove(link)
+
+        dt = link.retry_connect_dt()
+        if dt and dt > 0:
+            data = (link, time.time() + dt)
+            self.unconnected.append(data)
+
+        # Emit the connected signal to let anyone else know that the link is
+        # no longer connected.
+        link.signal_connected.emit(link, False)
+
+    #-----------------------------------------------------------------------
+    def poll_link_closing(self, link):
+        """Callback when a poll only link is closing.
+
+        Arg:
+          link (Link):  The link that is closing.
+        """
+        self.poll_links.remove(link)
+
+        # Emit the connected signal to let anyone else know that the link is
+        # no longer connected.
+        link.signal_connected.emit(link, False)
+
+    #-----------------------------------------------------------------------
+    def link_needs_write(self, link, needs_write):
+        """Callback when a link write status changes state.
+
+        This is called when the link write status changes state.  When the
+        link has data to write, we register a writer callback for it with
+        the event loop and then remove it when all the data has been
+        written.
+
+        Arg:
+          link (Link):  The link changing state.
+          needs_write (bool):  True if the link has data to write.  False
+                      if the link no longer has data to write.
+        """
+        if needs_write:
+            self.loop.add_writer(link.fileno(), self._write_ready, link)
+        else:
+            self.loop.remove_writer(link.fileno())
+
+    #-----------------------------------------------------------------------
+    def _read_ready(self, link):
+        """Event loop callback when a link has data to read.
+
+        Arg:
+          link (Link):  The link to read from.
+        """
+        self._active.add(link)
+        try:
+            link.read_from_link()
+        except Exception as e:
+            self._error = e
+        self.wake()
+
+    #-----------------------------------------------------------------------
+    def _write_ready(self, link):
+        """Event loop callback when a link can be written to.
+
+        Arg:
+          link (Link):  The link to write to.
+        """
+        self._active.add(link)
+        try:
+            link.write_to_link(time.time())
+        except Exception as e:
+            self._error = e
+        self.wake()
+
+    #-----------------------------------------------------------------------
+    def _async_link_done(self, link, task):
+        """Callback when a coroutine link task finishes.
+
+        Arg:
+          link:  The coroutine link.
+          task (asyncio.Task):  The finished task.
+        """
+        self.tasks.pop(link, None)
+
+        if not task.cancelled() and task.exception():
+            LOG.error("Async link %s error", link, exc_info=task.exception())
+
+        link.signal_connected.emit(link, False)
+
+        # Restart the link later if it wants to be reconnected.
+        dt = link.retry_connect_dt() if not task.cancelled() else None
+        if dt and dt > 0:
+            self.loop.call_later(dt, self.add_async, link)
+
+        self.wake()
+
+    #-----------------------------------------------------------------------
+    def _is_poll_due(self, link, t):
+        """Return True if the link poll time has been reached.
+
+        Arg:
+          link (Link):  The link to check.
+          t (float):  Current Unix clock time tag.
+        """
+        get_time = getattr(link, "next_poll_time", None)
+        next_time = get_time() if get_time else None
+        return next_time is not None and t >= next_time
+
+    #-----------------------------------------------------------------------
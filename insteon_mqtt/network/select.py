@@ -176,13 +176,19 @@ class Manager:
         Arg:
           time_out (int):  Time out to use in seconds.  The actual time out
                    value is is the minimum of this, the manager reconnect
-                   time out and the unconnected retry time out.
+                   time out, the unconnected retry time out, and the time
+                   until the next link poll time.
         """
         # Get the actual time out to use.
         time_out = Manager.min_time_out if time_out is None else time_out
         if self.unconnected:
             time_out = min(time_out, self.unconnected_time_out)
 
+        # Don't wait past the next time that a link needs to be polled.
+        next_time = self.next_poll_time()
+        if next_time is not None:
+            time_out = max(0, min(time_out, next_time - time.time()))
+
         # If nothing is reading for checking, skip the select call.
         run = self.read or self.write or self.error
         if not run:
@@ -246,6 +252,23 @@ class Manager:
                                     self.poll_links):
             link.poll(t)
 
+    #-----------------------------------------------------------------------
+    def next_poll_time(self):
+        """Return the earliest time that any link needs to be polled.
+
+        Returns:
+          float:  Returns the Unix clock time tag of the earliest
+                  Link.next_poll_time() or None if no link has one.
+        """
+        next_time = None
+        for link in itertools.chain(self.links.values(), self.poll_links):
+            get_time = getattr(link, "next_poll_time", None)
+            t = get_time() if get_time else None
+            if t is not None and (next_time is None or t < next_time):
+                next_time = t
+
+        return next_time
+
     #-----------------------------------------------------------------------
     def link_closing(self, link):
         """Callback when a link is closing.
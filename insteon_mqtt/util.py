@@ -5,6 +5,8 @@
 #===========================================================================
 import binascii
 import io
+import json
+import os
 from . import log
 
 LOG = log.get_logger()
@@ -36,6 +38,27 @@ def to_hex(data, num=None, space=' '):
     return o.getvalue()
 
 
+#===========================================================================
+def save_json(path, data):
+    """Atomically write JSON data to a file.
+
+    The data is written to a temporary file next to the output file which
+    is then renamed over the output.  So a crash while writing will never
+    leave a partially written file.
+
+    Args:
+      path (str):  The file to write.
+      data:  The JSON data to write.
+    """
+    temp_path = str(path) + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, path)
+
+
 #===========================================================================
 def make_callback(callback):
     """Insure that callback is a valid function.
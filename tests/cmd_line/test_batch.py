@@ -0,0 +1,160 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/cmd_line/batch.py
+#
+#===========================================================================
+import json
+import threading
+import time
+import insteon_mqtt as IM
+from insteon_mqtt.cmd_line.main import parse_args
+import helpers
+
+
+class Test_batch:
+    def make_args(self, tmpdir, lines, jobs=2):
+        path = tmpdir.join("cmds.txt")
+        path.write("\n".join(lines))
+        MockClient.jobs = jobs
+        return helpers.Data(config="config.yaml", topic="insteon/command",
+                            file=str(path), jobs=jobs, quiet=False,
+                            parse_args=parse_args)
+
+    #-----------------------------------------------------------------------
+    def test_batch(self, mocker, tmpdir, capsys):
+        mocker.patch('insteon_mqtt.cmd_line.util.mqtt.Client', MockClient)
+        MockClient.clients = []
+
+        lines = ["# comment", "", "on aa.bb.cc", "off -g 3 aa.bb.cd",
+                 "refresh --force modem"]
+        args = self.make_args(tmpdir, lines)
+        config = {"mqtt" : {"broker" : "host", "port" : 1883}}
+
+        r = IM.cmd_line.batch.batch(args, config)
+        assert r == 0
+        assert IM.cmd_line.util.CLIENT is None
+
+        # One connection for all the commands.
+        assert len(MockClient.clients) == 1
+        client = MockClient.clients[0]
+        assert client.connected is False
+        assert client.thread is None
+        assert [i[0] for i in client.pub] == [
+            "insteon/command/aa.bb.cc", "insteon/command/aa.bb.cd",
+            "insteon/command/modem"]
+        assert [i[1]["cmd"] for i in client.pub] == ["on", "off", "refresh"]
+        assert client.pub[1][1]["group"] == 3
+        assert len(client.unsub) == 3
+
+        # Two commands are sent before the first reply.
+        assert client.max_active == 2
+
+        out, _err = capsys.readouterr()
+        assert "[1] msg on\n" in out
+        assert "[1] on aa.bb.cc done in" in out
+        assert "[2] msg off\n" in out
+        assert "[3] msg refresh\n" in out
+        assert "[3] refresh --force modem done in" in out
+        assert "3 commands, 0 errors" in out
+
+    #-----------------------------------------------------------------------
+    def test_errors(self, mocker, tmpdir, capsys):
+        mocker.patch('insteon_mqtt.cmd_line.util.mqtt.Client', MockClient)
+        MockClient.clients = []
+
+        lines = ["on aa.bb.cc", "bad-command", "start", "error aa.bb.cc"]
+        args = self.make_args(tmpdir, lines, jobs=1)
+        config = {"mqtt" : {"broker" : "host", "port" : 1883}}
+
+        r = IM.cmd_line.batch.batch(args, config)
+        assert r == -1
+
+        client = MockClient.clients[0]
+        assert len(client.pub) == 1
+        assert client.max_active == 1
+
+        out, _err = capsys.readouterr()
+        assert "Invalid command: bad-command" in out
+        assert "Invalid command: error aa.bb.cc" in out
+        assert "Command can't be run in batch mode: start" in out
+        assert "1 commands, 3 errors" in out
+
+
+#===========================================================================
+class MockClient:
+    """Mock paho client that replies to the commands from it's thread.
+
+    The replies for the oldest command are sent when jobs commands are
+    running or when no command has been sent for a short time.
+    """
+    clients = []
+    jobs = 1
+
+    def __init__(self):
+        self.clients.append(self)
+        self.on_message = None
+        self.connected = False
+        self.pub = []
+        self.unsub = []
+        self.active = set()
+        self.max_active = 0
+        self.replies = []
+        self.pub_time = 0
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def connect(self, host, port):
+        self.connected = True
+
+    def disconnect(self):
+        self.connected = False
+
+    def loop_start(self):
+        self.thread = threading.Thread(target=self.run)
+        self.thread.start()
+
+    def loop_stop(self):
+        self.thread.join()
+        self.thread = None
+
+    def subscribe(self, topic):
+        with self.lock:
+            self.active.add(topic)
+            self.max_active = max(self.max_active, len(self.active))
+
+    def unsubscribe(self, topic):
+        with self.lock:
+            self.active.discard(topic)
+            self.unsub.append(topic)
+
+    def publish(self, topic, payload, qos=0):
+        data = json.loads(payload)
+        reply_topic = "%s/session/%s" % (topic, data["session"])
+        msg = IM.mqtt.Reply(IM.mqtt.Reply.Type.MESSAGE,
+                            "msg %s" % data["cmd"])
+        end = IM.mqtt.Reply(IM.mqtt.Reply.Type.END)
+
+        with self.lock:
+            self.pub.append((topic, data))
+            self.replies.append([MockMessage(reply_topic, msg.to_json()),
+                                 MockMessage(reply_topic, end.to_json())])
+            self.pub_time = time.time()
+
+    def run(self):
+        while self.connected:
+            with self.lock:
+                ready = self.replies and (
+                    len(self.active) >= self.jobs or
+                    time.time() - self.pub_time > 0.05)
+                msgs = self.replies.pop(0) if ready else []
+
+            for msg in msgs:
+                self.on_message(self, None, msg)
+
+            time.sleep(0.005)
+
+
+class MockMessage:
+    def __init__(self, topic, msg):
+        self.topic = topic
+        self.payload = msg.encode("utf-8")
@@ -131,6 +131,49 @@ class Test_Device:
         assert obj2.get_meta('test') == 2
 
 
+    #-----------------------------------------------------------------------
+    def test_find_index(self):
+        db = IM.db.Device(IM.Address(0x01, 0x02, 0x03))
+        addr1 = IM.Address(0x50, 0x51, 0x52)
+        addr2 = IM.Address(0x60, 0x61, 0x62)
+        ctrl = Msg.DbFlags(in_use=True, is_controller=True, is_last_rec=False)
+        resp = Msg.DbFlags(in_use=True, is_controller=False,
+                           is_last_rec=False)
+        e1 = IM.db.DeviceEntry(addr1, 0x01, 0x0fff, ctrl, bytes([1, 2, 3]))
+        e2 = IM.db.DeviceEntry(addr1, 0x01, 0x0ff7, resp, bytes([1, 2, 3]))
+        e3 = IM.db.DeviceEntry(addr1, 0x01, 0x0fef, resp, bytes([1, 2, 4]))
+        e4 = IM.db.DeviceEntry(addr2, 0x02, 0x0fe7, resp, bytes([1, 2, 3]))
+        for e in (e1, e2, e3, e4):
+            db.add_entry(e, save=False)
+
+        assert db.find(addr1, 0x01, True) is e1
+        assert db.find(str(addr1), "1", False) is e2
+        assert db.find(addr1, 0x01, False, local_group=4) is e3
+        assert db.find(addr1, 0x01, False, local_group=5) is None
+        assert db.find(addr2, 0x01, False) is None
+        assert db.find_all(addr1) == [e1, e2, e3]
+        assert db.find_all(addr1, 0x01, False) == [e2, e3]
+        assert db.find_all(group=0x02) == [e4]
+        assert db.find_all(is_controller=True) == [e1]
+
+        # Overwriting a memory location w/ a different entry.
+        e5 = IM.db.DeviceEntry(addr2, 0x03, 0x0fff, resp, bytes([1, 2, 3]))
+        db.add_entry(e5, save=False)
+        assert db.find(addr1, 0x01, True) is None
+        assert db.find(addr2, 0x03, False) is e5
+        assert db.find_all(addr2) == [e4, e5]
+
+        # Marking entries unused removes them.
+        unused = e2.copy()
+        unused.db_flags.in_use = False
+        db.add_entry(unused, save=False)
+        assert db.find(addr1, 0x01, False) is e3
+        assert db.find_all(addr1) == [e3]
+
+        db.clear()
+        assert db.find(addr2, 0x02, False) is None
+        assert db.find_all(addr2) == []
+
     #-----------------------------------------------------------------------
     def test_add_multi_group(self):
         device = MockDevice()
@@ -105,6 +105,7 @@ class MockProto:
 class MockModem():
     def __init__(self):
         self.save_path = ''
+        self.saver = IM.db.Saver()
         self.linked_device = None
 
     def set_linked_device(self, device):
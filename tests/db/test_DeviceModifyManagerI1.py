@@ -196,3 +196,4 @@ class MockProto:
 class MockModem():
     def __init__(self):
         self.save_path = ''
+        self.saver = IM.db.Saver()
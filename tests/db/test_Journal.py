@@ -0,0 +1,152 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/db/Journal.py
+#
+#===========================================================================
+import json
+import insteon_mqtt as IM
+import insteon_mqtt.message as Msg
+
+
+class Test_Journal:
+    #-----------------------------------------------------------------------
+    def test_append(self, tmpdir):
+        path = str(tmpdir.join("aa.bb.cc.json"))
+        journal = IM.db.Journal(path)
+        assert journal.path == str(tmpdir.join("aa.bb.cc.journal"))
+        assert len(journal) == 0
+        assert journal.read() == []
+
+        journal.compact_size = 2
+        assert journal.append(["add", {"a": 1}]) is False
+        assert journal.append(["clear"]) is False
+        assert journal.append(["info", {}]) is True
+        assert len(journal) == 3
+
+        # A new object reads the existing file.
+        journal = IM.db.Journal(path)
+        assert len(journal) == 3
+        assert journal.read() == [["add", {"a": 1}], ["clear"], ["info", {}]]
+
+        journal.clear()
+        assert len(journal) == 0
+        assert not tmpdir.join("aa.bb.cc.journal").exists()
+        journal.clear()
+
+    #-----------------------------------------------------------------------
+    def test_partial(self, tmpdir):
+        path = str(tmpdir.join("aa.bb.cc.json"))
+        tmpdir.join("aa.bb.cc.journal").write('["clear"]\n["add", {"a"')
+
+        journal = IM.db.Journal(path)
+        assert journal.read() == [["clear"]]
+
+    #-----------------------------------------------------------------------
+    def test_append_after_partial(self, tmpdir):
+        path = str(tmpdir.join("aa.bb.cc.json"))
+        journal_path = tmpdir.join("aa.bb.cc.journal")
+        journal_path.write('["a", 1]\n["b", 2')
+
+        # Changes made after a crash aren't lost.
+        journal = IM.db.Journal(path)
+        journal.append(["c", 3])
+        journal.append(["d", 4])
+        assert IM.db.Journal(path).read() == [["a", 1], ["c", 3], ["d", 4]]
+
+        # A valid last line w/o a newline.
+        journal_path.write('["a", 1]\n["b", 2]')
+        journal = IM.db.Journal(path)
+        journal.append(["c", 3])
+        assert IM.db.Journal(path).read() == [["a", 1], ["b", 2], ["c", 3]]
+
+        # Invalid lines in the middle are skipped.
+        journal_path.write('["a", 1]\n["b", 2["c", 3]\n["d", 4]\n')
+        assert IM.db.Journal(path).read() == [["a", 1], ["d", 4]]
+        assert journal_path.read() == '["a", 1]\n["d", 4]\n'
+
+    #-----------------------------------------------------------------------
+    def test_load(self, tmpdir):
+        path = tmpdir.join("aa.bb.cc.json")
+        path.write(json.dumps({"entries": []}))
+
+        data, changes = IM.db.Journal.load(str(path))
+        assert data == {"entries": []}
+        assert changes == []
+
+    #-----------------------------------------------------------------------
+    def test_device(self, tmpdir):
+        saver = IM.db.Saver()
+        saver.journal = True
+        path = str(tmpdir.join("aa.bb.cc.json"))
+        journal_path = tmpdir.join("aa.bb.cc.journal")
+
+        addr = IM.Address("aa.bb.cc")
+        db = IM.db.Device(addr, path, None, saver)
+        db.delta = 5
+
+        # The first change writes the snapshot, later ones the journal.
+        ctrl = Msg.DbFlags(in_use=True, is_controller=True, is_last_rec=False)
+        e1 = IM.db.DeviceEntry(IM.Address("01.02.03"), 0x01, 0x0fff, ctrl,
+                               bytes([1, 2, 3]))
+        e2 = IM.db.DeviceEntry(IM.Address("01.02.04"), 0x02, 0x0ff7, ctrl,
+                               bytes([1, 2, 3]))
+        db.add_entry(e1)
+        assert not journal_path.exists()
+
+        db.add_entry(e2)
+        db.set_meta("key", 10)
+        assert len(journal_path.readlines()) == 2
+
+        data, changes = IM.db.Journal.load(path)
+        assert len(data['used']) == 1
+        obj = IM.db.Device.from_json(data, path, None)
+        obj.replay(changes)
+        assert obj.to_json() == db.to_json()
+
+        # Explicit saves write the snapshot and remove the journal.
+        db.save()
+        assert not journal_path.exists()
+        db.clear()
+        data, changes = IM.db.Journal.load(path)
+        assert changes == [["clear"]]
+        obj = IM.db.Device.from_json(data, path, None)
+        obj.replay(changes)
+        assert len(obj) == 0
+        assert obj.delta is None
+
+    #-----------------------------------------------------------------------
+    def test_modem(self, tmpdir, monkeypatch):
+        saver = IM.db.Saver()
+        saver.journal = True
+        monkeypatch.setattr(IM.db.Journal, "compact_size", 5)
+        path = str(tmpdir.join("modem.json"))
+        journal_path = tmpdir.join("modem.journal")
+
+        db = IM.db.Modem(path, None, saver)
+        db.save()
+
+        entries = []
+        for i in range(3):
+            entry = IM.db.ModemEntry(IM.Address(1, 2, i), 0x01, True,
+                                     bytes([1, 2, 3]))
+            entries.append(entry)
+            db.add_entry(entry)
+        db.delete_entry(entries[1])
+        db.set_info(0x03, 0x15, 0x9b)
+
+        data, changes = IM.db.Journal.load(path)
+        assert [i[0] for i in changes] == ["add", "add", "add", "del",
+                                            "info"]
+        obj = IM.db.Modem.from_json(data, path)
+        obj.replay(changes)
+        assert obj.to_json() == db.to_json()
+        assert len(obj) == 2
+
+        # One more change triggers a compaction.
+        db.set_meta("key", 1)
+        assert not journal_path.exists()
+        data, changes = IM.db.Journal.load(path)
+        assert changes == []
+        assert data == db.to_json()
+
+    #-----------------------------------------------------------------------
@@ -108,6 +108,40 @@ class Test_Modem:
         assert len(obj._meta) == 1
         assert obj.get_meta('test') == 2
 
+    #-----------------------------------------------------------------------
+    def test_find_index(self, test_entry_dev1_ctrl, test_entry_dev1_resp):
+        obj = IM.db.Modem()
+        addr2 = IM.Address('56.78.cd')
+        e3 = IM.db.ModemEntry(addr2, 0x01, True, bytes(3))
+        for e in (test_entry_dev1_ctrl, test_entry_dev1_resp, e3):
+            obj.add_entry(e, save=False)
+
+        assert obj.find(test_entry_dev1_ctrl.addr, 0x01, True) is \
+            test_entry_dev1_ctrl
+        assert obj.find(addr2, 0x01, False) is None
+        assert obj.find_all(test_entry_dev1_ctrl.addr) == \
+            [test_entry_dev1_ctrl, test_entry_dev1_resp]
+        assert obj.find_all(group=0x01, is_controller=True) == \
+            [test_entry_dev1_ctrl, e3]
+
+        # Replacing an entry keeps the order.
+        e4 = IM.db.ModemEntry(test_entry_dev1_ctrl.addr, 0x01, True,
+                              bytes([1, 2, 3]))
+        obj.add_entry(e4, save=False)
+        assert obj.entries == [e4, test_entry_dev1_resp, e3]
+        assert obj.entries[0] is e4
+        assert obj.find(e4.addr, 0x01, True) is e4
+        assert obj.find_all(e4.addr)[0] is e4
+
+        obj.delete_entry(e4)
+        assert obj.find(e4.addr, 0x01, True) is None
+        assert obj.find_all(e4.addr) == [test_entry_dev1_resp]
+        obj.delete_entry(test_entry_dev1_resp)
+        assert obj.find_all(e4.addr) == []
+
+        obj.clear()
+        assert obj.find(addr2, 0x01, True) is None
+
     #-----------------------------------------------------------------------
     def test_add_on_device_empty_ctrl(self, test_device, test_entry_dev1_ctrl):
         # add_on_device(self, entry, on_done=None)
@@ -0,0 +1,105 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/db/Saver.py
+#
+#===========================================================================
+import json
+import time
+import insteon_mqtt as IM
+import insteon_mqtt.message as Msg
+
+
+class Test_Saver:
+    #-----------------------------------------------------------------------
+    def test_inactive(self, tmpdir):
+        saver = IM.db.Saver()
+        db = MockDb(tmpdir.join("db.json"))
+
+        # Not in the event loop - write right away.
+        saver.save(db)
+        assert db.read() == {"count": 1}
+        assert not saver.is_dirty(db)
+        assert saver.next_poll_time() is None
+
+    #-----------------------------------------------------------------------
+    def test_write_behind(self, tmpdir):
+        saver = IM.db.Saver(delay=5)
+        saver.signal_connected.emit(saver, True)
+        db1 = MockDb(tmpdir.join("db1.json"))
+        db2 = MockDb(tmpdir.join("db2.json"))
+
+        # Multiple saves are coalesced into one write.
+        t0 = time.time()
+        for i in range(10):
+            saver.save(db1)
+        assert saver.is_dirty(db1)
+        assert not db1.path.exists()
+        assert t0 + 5 <= saver.next_poll_time() <= time.time() + 5
+
+        saver.poll(t0)
+        assert not db1.path.exists()
+        saver.poll(t0 + 10)
+        assert db1.read() == {"count": 1}
+        assert saver.next_poll_time() is None
+
+        # Flush writes now.
+        saver.save(db1)
+        saver.save(db2, flush=True)
+        assert db2.read() == {"count": 1}
+        assert saver.is_dirty(db1)
+        saver.flush()
+        assert db1.read() == {"count": 2}
+
+        # Closing the link writes everything.
+        closed = []
+
+        def closing(link):
+            closed.append(link)
+        saver.signal_closing.connect(closing)
+
+        saver.save(db2)
+        saver.close()
+        assert db2.read() == {"count": 2}
+        assert closed == [saver]
+
+    #-----------------------------------------------------------------------
+    def test_device_db(self, tmpdir):
+        # The database is saved w/ the saver it's given.
+        saver = IM.db.Saver()
+        path = tmpdir.join("dev.json")
+        db = IM.db.Device(IM.Address(0x01, 0x02, 0x03), str(path), None,
+                          saver)
+        flags = Msg.DbFlags(in_use=True, is_controller=True,
+                            is_last_rec=False)
+
+        saver.signal_connected.emit(saver, True)
+        try:
+            for i in range(5):
+                entry = IM.db.DeviceEntry(IM.Address(0x50, 0x51, i), 0x01,
+                                          0x0fff - i * 8, flags, bytes(3))
+                db.add_entry(entry)
+            assert not path.exists()
+            assert saver.is_dirty(db)
+
+            db.save(flush=True)
+            assert len(json.loads(path.read())['used']) == 5
+            assert not saver.is_dirty(db)
+        finally:
+            saver.signal_connected.emit(saver, False)
+
+        assert saver.active is False
+
+
+#===========================================================================
+class MockDb:
+    def __init__(self, path):
+        self.save_path = str(path)
+        self.path = path
+        self.count = 0
+
+    def to_json(self):
+        self.count += 1
+        return {"count": self.count}
+
+    def read(self):
+        return json.loads(self.path.read())
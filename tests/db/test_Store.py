@@ -0,0 +1,126 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/db/Store.py
+#
+#===========================================================================
+import json
+import os
+import insteon_mqtt as IM
+import insteon_mqtt.message as Msg
+
+
+def make_device(path=None, saver=None):
+    db = IM.db.Device(IM.Address("aa.bb.cc"), path, None, saver)
+    db.delta = 3
+    db.set_meta("key", [1, 2])
+    ctrl = Msg.DbFlags(in_use=True, is_controller=True, is_last_rec=False)
+    resp = Msg.DbFlags(in_use=False, is_controller=False, is_last_rec=False)
+    db.add_entry(IM.db.DeviceEntry(IM.Address("01.02.03"), 0x01, 0x0fff,
+                                   ctrl, bytes([1, 2, 3])))
+    db.add_entry(IM.db.DeviceEntry(IM.Address("01.02.04"), 0x02, 0x0ff7,
+                                   resp, bytes([1, 2, 3])))
+    return db
+
+
+def make_modem(path=None, saver=None):
+    db = IM.db.Modem(path, None, saver)
+    db.set_info(0x03, 0x15, 0x9b)
+    for i in range(3):
+        db.add_entry(IM.db.ModemEntry(IM.Address(1, 2, i), 0x01, i == 1,
+                                      bytes([1, 2, 3])))
+    return db
+
+
+class Test_Store:
+    #-----------------------------------------------------------------------
+    def test_write_load(self, tmpdir):
+        store = IM.db.Store(str(tmpdir.join("db.sqlite")))
+        assert len(store) == 0
+
+        device = make_device()
+        modem = make_modem()
+        store.write([("data/aabbcc.json", device.to_json()),
+                     ("data/445511.json", modem.to_json())])
+        assert len(store) == 2
+
+        # Data is read back in the same format.
+        assert store.load("aabbcc.json") == device.to_json()
+        assert store.load("445511.json") == modem.to_json()
+        assert store.load("112233.json") is None
+
+        # Entries can be queried across databases.
+        sql = "SELECT COUNT(*) FROM entries WHERE addr = ? AND grp = ?"
+        assert store._conn.execute(sql, ("01.02.03", 1)).fetchone()[0] == 1
+
+        # Writes replace the old data.
+        device.clear()
+        store.write([("data/aabbcc.json", device.to_json())])
+        store.close()
+
+        store = IM.db.Store(str(tmpdir.join("db.sqlite")))
+        assert store.load("aabbcc.json") == device.to_json()
+        assert len(store.load_all()) == 2
+
+    #-----------------------------------------------------------------------
+    def test_import_export(self, tmpdir):
+        saver = IM.db.Saver()
+        saver.journal = True
+        device = make_device(str(tmpdir.join("aabbcc.json")), saver)
+        modem = make_modem(str(tmpdir.join("445511.json")), saver)
+        tmpdir.join("other.json").write(json.dumps([1, 2]))
+
+        # Changes in the journal are included.
+        assert tmpdir.join("aabbcc.journal").exists()
+
+        store = IM.db.Store(str(tmpdir.join("db.sqlite")))
+        assert store.import_json(str(tmpdir)) == 2
+        assert store.load("aabbcc") == device.to_json()
+        assert store.load("445511") == modem.to_json()
+
+        out = tmpdir.mkdir("out")
+        assert store.export_json(str(out)) == 2
+        data = json.loads(out.join("aabbcc.json").read())
+        assert data == device.to_json()
+
+    #-----------------------------------------------------------------------
+    def test_import_newer(self, tmpdir):
+        store = IM.db.Store(str(tmpdir.join("db.sqlite")))
+        assert store.write_time() is None
+
+        device = make_device()
+        store.write([("aabbcc.json", device.to_json())])
+        write_time = store.write_time()
+        assert write_time is not None
+
+        # The JSON storage was used for a while after the store was written.
+        device.set_meta("key", 5)
+        path = str(tmpdir.join("aabbcc.json"))
+        IM.util.save_json(path, device.to_json())
+        os.utime(path, (write_time + 10, write_time + 10))
+        assert store.import_json(str(tmpdir), write_time) == 1
+        assert store.load("aabbcc")['meta']['key'] == 5
+
+        # Files older than the store aren't imported.
+        os.utime(path, (write_time - 10, write_time - 10))
+        assert store.import_json(str(tmpdir), store.write_time()) == 0
+
+    #-----------------------------------------------------------------------
+    def test_saver(self, tmpdir):
+        saver = IM.db.Saver(delay=5)
+        saver.store = IM.db.Store(str(tmpdir.join("db.sqlite")))
+        saver.signal_connected.emit(saver, True)
+
+        device = make_device()
+        device.set_path(str(tmpdir.join("aabbcc.json")))
+        modem = make_modem()
+        modem.set_path(str(tmpdir.join("445511.json")))
+        saver.save(device)
+        saver.save(modem)
+        assert saver.load(device.save_path) is None
+
+        saver.flush()
+        assert saver.load(device.save_path) == (device.to_json(), [])
+        assert saver.load(modem.save_path) == (modem.to_json(), [])
+        assert not tmpdir.join("aabbcc.json").exists()
+
+    #-----------------------------------------------------------------------
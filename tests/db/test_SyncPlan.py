@@ -0,0 +1,156 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/db/SyncPlan.py
+#
+#===========================================================================
+import insteon_mqtt as IM
+import insteon_mqtt.message as Msg
+import helpers as H
+
+
+def make_entry(db, addr, group, mem_loc, is_controller, data):
+    flags = Msg.DbFlags(in_use=True, is_controller=is_controller,
+                        is_last_rec=False)
+    entry = IM.db.DeviceEntry(IM.Address(addr), group, mem_loc, flags,
+                              bytes(data), db=db)
+    db.add_entry(entry, save=False)
+    return entry
+
+
+def make_dbs():
+    device = MockDevice()
+    addr = IM.Address("01.02.03")
+    config = IM.db.Device(addr, device=device)
+    make_entry(config, "aa.bb.cc", 1, 0x0fff, True, [3, 0, 1])
+    make_entry(config, "aa.bb.cd", 2, 0x0ff7, False, [0xff, 0x1f, 1])
+    make_entry(config, "aa.bb.ce", 3, 0x0fef, False, [0xff, 0x1f, 1])
+
+    db = IM.db.Device(addr, device=device)
+    make_entry(db, "aa.bb.cc", 1, 0x0fff, True, [3, 0, 1])
+    make_entry(db, "aa.bb.cd", 2, 0x0ff7, False, [0x80, 0x1f, 1])
+    make_entry(db, "aa.bb.d0", 5, 0x0fef, False, [0xff, 0x1f, 1])
+    make_entry(db, "aa.bb.d1", 6, 0x0fe7, True, [3, 0, 1])
+
+    # Links from join and pair are ignored.
+    make_entry(db, device.modem.addr, 1, 0x0fdf, False, [0, 0, 1])
+    return device, config, db
+
+
+class Test_SyncPlan:
+    #-----------------------------------------------------------------------
+    def test_plan(self):
+        device, config, db = make_dbs()
+
+        plan = IM.db.SyncPlan(config, db)
+        assert plan.cost() == (3, 3 * plan.device_msg_time)
+        assert not plan.is_empty()
+        assert not plan.pending
+
+        ops = list(plan)
+        assert [i.kind for i in ops] == ["replace", "replace", "del"]
+        assert ops[0].entry.addr == IM.Address("aa.bb.cd")
+        assert ops[0].target.mem_loc == 0x0ff7
+        assert ops[1].entry.addr == IM.Address("aa.bb.ce")
+        assert ops[1].target.mem_loc == 0x0fef
+        assert ops[2].target.mem_loc == 0x0fe7
+        assert len(plan.pending) == 3
+
+        # Same results as the full diff.
+        diff = config.diff(db)
+        assert diff.add_entries == [ops[0].entry, ops[1].entry]
+        assert diff.del_entries == [ops[0].target, ops[1].target,
+                                    ops[2].target]
+
+        # Pending operations are skipped by other plans.
+        assert list(IM.db.SyncPlan(config, db, plan.pending)) == []
+        plan.done(ops[0])
+        assert len(list(IM.db.SyncPlan(config, db, plan.pending))) == 1
+
+    #-----------------------------------------------------------------------
+    def test_run(self):
+        device, config, db = make_dbs()
+
+        ops = []
+        plan = IM.db.SyncPlan(config, db)
+        for op in plan:
+            ops.append(op)
+            if op.kind == "del":
+                db.delete_on_device(op.target)
+            else:
+                db.replace_on_device(op.target, op.entry.addr, op.entry.group,
+                                     op.entry.is_controller, op.entry.data)
+            plan.done(op)
+
+        # One write per operation and no new memory is used.
+        assert len(device.sent) == 3
+        assert len(db.unused) == 1
+        assert len(config.diff(db)) == 0
+        assert not plan.pending
+        assert IM.db.SyncPlan(config, db).is_empty()
+
+    #-----------------------------------------------------------------------
+    def test_stale(self):
+        device, config, db = make_dbs()
+
+        # Ops that were done after the plan was created are skipped.
+        plan = IM.db.SyncPlan(config, db)
+        ops = iter(plan)
+        first = next(ops)
+        db.delete_on_device(db.find_mem_loc(0x0fef))
+        db.delete_on_device(db.find_mem_loc(0x0fe7))
+
+        assert first.kind == "replace"
+        assert [i.kind for i in ops] == ["add"]
+
+    #-----------------------------------------------------------------------
+    def test_cost_new(self):
+        device = MockDevice()
+        addr = IM.Address("01.02.03")
+        config = IM.db.Device(addr, device=device)
+        make_entry(config, "aa.bb.cc", 1, 0x0fff, True, [3, 0, 1])
+        make_entry(config, "aa.bb.cd", 1, 0x0ff7, True, [3, 0, 1])
+        db = IM.db.Device(addr, device=device)
+
+        # Each new entry also writes the new last entry.
+        plan = IM.db.SyncPlan(config, db)
+        assert plan.cost()[0] == 4
+
+        db.set_engine(0)
+        assert plan.cost()[0] == 4 * plan.i1_write_msgs
+
+    #-----------------------------------------------------------------------
+    def test_modem(self):
+        device = MockDevice()
+        config = IM.db.Modem(None, device)
+        db = IM.db.Modem(None, device)
+        for i in range(3):
+            config.add_entry(IM.db.ModemEntry(IM.Address(1, 2, i), 0x05,
+                                              True, bytes(3)), save=False)
+        db.add_entry(IM.db.ModemEntry(IM.Address(1, 2, 0), 0x05, True,
+                                      bytes(3)), save=False)
+        db.add_entry(IM.db.ModemEntry(IM.Address(1, 2, 9), 0x05, True,
+                                      bytes(3)), save=False)
+
+        plan = IM.db.SyncPlan(config, db)
+        assert plan.cost()[0] == 4
+        assert [i.kind for i in plan] == ["del", "add", "add"]
+
+
+#===========================================================================
+class MockDevice:
+    """Mock insteon_mqtt/Device class
+    """
+    def __init__(self):
+        self.sent = []
+        self.modem = H.main.MockModem("")
+
+    def find(self, addr):
+        return None
+
+    def send(self, msg, handler, priority=None, after=None):
+        self.sent.append(H.Data(msg=msg, handler=handler))
+
+        # Short circuit the db modify ACK.
+        if isinstance(handler, IM.handler.DeviceDbModify):
+            handler.db.add_entry(handler.entry)
+            handler.on_done(True, "update", handler.entry)
@@ -71,3 +71,47 @@ class Test_Base_Config():
         msg = Msg.InpStandard(addr, group, flags, 0x11, 0x00)
         test_device.handle_broadcast(msg)
         assert "has no handler for broadcast" in caplog.text
+
+
+class Test_Base_Sync():
+    def add_config(self, device, num):
+        device.clear_db_config()
+        flags = Msg.DbFlags(in_use=True, is_controller=True,
+                            is_last_rec=False)
+        for i in range(num):
+            entry = IM.db.DeviceEntry(IM.Address(0xaa, 0xbb, i), 0x01,
+                                      0x0fff - i * 8, flags, bytes([3, 0, 1]),
+                                      db=device.db_config)
+            device.db_config.add_entry(entry, save=False)
+
+    def test_sync_error(self, test_device):
+        self.add_config(test_device, 3)
+
+        # The second operation fails.
+        ran = []
+
+        def sync_op(op, dry_run, on_done):
+            ran.append(op)
+            on_done(len(ran) != 2, "op %d" % len(ran), None)
+
+        done = []
+
+        def on_done(success, msg, data):
+            done.append(success)
+
+        with mock.patch.object(test_device, '_sync_op', sync_op):
+            test_device.sync(dry_run=False, refresh=False, on_done=on_done)
+
+        # The sync stops and reports the failure.
+        assert len(ran) == 2
+        assert done == [False]
+        assert not test_device._sync_pending
+
+    def test_sync_not_run(self, test_device):
+        self.add_config(test_device, 3)
+
+        # Nothing is pending until the sequence runs the sync.
+        seq = IM.CommandSeq(test_device, "Done")
+        test_device.sync(dry_run=False, refresh=False, sequence=seq)
+        assert len(seq.calls) == 1
+        assert not test_device._sync_pending
@@ -390,9 +390,13 @@ class Test_IOLinc_Link_Data:
 class MockModem:
     def __init__(self, path):
         self.save_path = str(path)
+        self.saver = IM.db.Saver()
         self.addr = IM.Address(0x0A, 0x0B, 0x0C)
         self.timed_call = MockTimedCall()
 
+    def find_group_devices(self, controller, group):
+        return []
+
 
 class MockTimedCall:
     def add(self, *args, **kwargs):
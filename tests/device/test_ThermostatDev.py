@@ -341,8 +341,12 @@ class Test_Thermostat:
 class MockModem:
     def __init__(self, path):
         self.save_path = str(path)
+        self.saver = IM.db.Saver()
         self.addr = IM.Address(0x0A, 0x0B, 0x0C)
 
+    def find_group_devices(self, controller, group):
+        return []
+
 
 class MockProto:
     def __init__(self):
@@ -83,6 +83,7 @@ class Test_DeviceDbGet:
         assert r == Msg.FINISHED
         assert len(calls) == 1
         assert calls[0] == "Database received"
+        assert handler.db.saved is True
 
         # no match
         msg.cmd1 = 0x00
@@ -125,3 +126,7 @@ class Test_DeviceDbGet:
 class Mockdb:
     def __init__(self, addr):
         self.addr = addr
+        self.saved = False
+
+    def save(self, flush=False):
+        self.saved = flush
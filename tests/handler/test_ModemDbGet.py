@@ -131,7 +131,7 @@ class MockProtocol:
 
 
 class Mockdb:
-    def save(self):
+    def save(self, flush=False):
         pass
 
     def add_entry(self, entry):
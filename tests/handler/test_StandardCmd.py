@@ -219,3 +219,4 @@ class MockProto:
 class MockModem:
     def __init__(self, path):
         self.save_path = str(path)
+        self.saver = IM.db.Saver()
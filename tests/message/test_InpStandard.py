@@ -52,7 +52,10 @@ class Test_InpStandard:
         assert obj.cmd2 == 0x01
         assert obj.group == 0x65
 
-        str(obj)
+        # The string is built once and cached.
+        s = str(obj)
+        assert s == "Std: 3e.e2.c4 %s grp: 65 cmd: 11 01" % obj.flags
+        assert str(obj) is s
 
     #-----------------------------------------------------------------------
     def test_cleanup(self):
@@ -76,4 +76,30 @@ class Test_OutStandard:
         b = bytes([])
         assert Msg.OutStandard.msg_size(b) == Msg.OutStandard.fixed_msg_size
 
+    #-----------------------------------------------------------------------
+    def test_frame_cache(self):
+        addr = IM.Address(0x48, 0x3d, 0x46)
+        obj = Msg.OutStandard.direct(addr, 0x19, 0x00)
+        assert obj.to_bytes() == bytes([0x02, 0x62, 0x48, 0x3d, 0x46, 0x0f,
+                                        0x19, 0x00])
+
+        # Identical messages share the frame.
+        obj2 = Msg.OutStandard.direct(addr, 0x19, 0x00)
+        obj2.to_bytes()
+        assert obj2._frame is obj._frame
+
+        # Hop changes on resends are picked up.
+        obj.flags.set_hops(1)
+        assert obj.to_bytes()[5] == 0x05
+
+        # Field changes re-encode the frame.
+        obj.cmd1 = 0x11
+        assert obj.to_bytes()[6] == 0x11
+        assert obj2.to_bytes()[6] == 0x19
+
+        ext = Msg.OutExtended.direct(addr, 0x2f, 0x00, bytes(14))
+        assert ext.to_bytes()[-1] == 0xd1
+        ext.data = bytes([1] + [0] * 13)
+        assert ext.to_bytes()[-1] == 0xd0
+
 #===========================================================================
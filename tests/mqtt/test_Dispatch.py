@@ -0,0 +1,100 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/mqtt/Dispatch.py
+#
+# pylint: disable=redefined-outer-name
+#===========================================================================
+import pytest
+import insteon_mqtt as IM
+import helpers as H
+
+
+@pytest.fixture
+def setup(mock_paho_mqtt, tmpdir):
+    proto = H.main.MockProtocol()
+    modem = H.main.MockModem(tmpdir)
+    addr = IM.Address(1, 2, 3)
+    dev = IM.device.Switch(proto, modem, addr, "device name")
+
+    link = IM.network.Mqtt()
+    mqtt = IM.mqtt.Mqtt(link, H.mqtt.MockModem())
+    mdev = IM.mqtt.Switch(mqtt, dev)
+    dispatch = IM.mqtt.Dispatch(link, ["insteon/+/set"])
+
+    return H.Data(addr=addr, dev=dev, mdev=mdev, link=link,
+                  dispatch=dispatch)
+
+
+#===========================================================================
+class Test_Dispatch:
+    #-----------------------------------------------------------------------
+    def test_pubsub(self, setup):
+        mdev, addr, link, dispatch = setup.getAll(['mdev', 'addr', 'link',
+                                                   'dispatch'])
+
+        # Only the scene topic is subscribed to.
+        mdev.subscribe(dispatch, 2)
+        assert len(dispatch) == 1
+        assert link.client.sub == [
+            dict(topic='insteon/%s/scene' % addr.hex, qos=2)]
+
+        dispatch.subscribe_topics(1)
+        assert link.client.sub[1] == dict(topic='insteon/+/set', qos=1)
+
+        mdev.unsubscribe(dispatch)
+        assert len(dispatch) == 0
+        assert link.client.unsub == [
+            dict(topic='insteon/%s/scene' % addr.hex)]
+
+        dispatch.unsubscribe_topics()
+        assert link.client.unsub[1] == dict(topic='insteon/+/set')
+
+    #-----------------------------------------------------------------------
+    def test_message(self, setup):
+        mdev, addr, link, dispatch = setup.getAll(['mdev', 'addr', 'link',
+                                                   'dispatch'])
+        proto = setup.dev.protocol
+
+        mdev.subscribe(dispatch, 2)
+        dispatch.subscribe_topics(2)
+
+        # Messages on the wildcard topic are passed to the device.
+        msg = H.Data(topic='insteon/%s/set' % addr.hex, payload=b'ON')
+        link.client.cb['insteon/+/set'](link.client, None, msg)
+        assert len(proto.sent) == 1
+        assert proto.sent[0].msg.cmd1 == 0x11
+
+        # Unknown topics are ignored.
+        msg = H.Data(topic='insteon/aa.bb.cc/set', payload=b'ON')
+        dispatch.handle_message(link.client, None, msg)
+        assert len(proto.sent) == 1
+
+    #-----------------------------------------------------------------------
+    def test_wildcard(self, setup):
+        link, dispatch = setup.getAll(['link', 'dispatch'])
+
+        # Topics w/ wildcards are passed to the link.
+        dispatch.subscribe('insteon/aa.bb.cc/set/+', 1, lambda *x: None)
+        dispatch.subscribe('insteon/+/set', 1, lambda *x: None)
+        assert len(dispatch) == 0
+        assert len(link.client.sub) == 2
+
+    #-----------------------------------------------------------------------
+    def test_config(self, setup):
+        link, mdev = setup.getAll(['link', 'mdev'])
+        mqtt = mdev.mqtt
+
+        config = {'broker' : 'host', 'port' : 1883,
+                  'cmd_topic' : 'insteon/command',
+                  'dispatch_topics' : ['insteon/+/set']}
+        mqtt.load_config(config)
+        mqtt.devices[setup.addr.id] = mdev
+
+        link.connected = True
+        mqtt._subscribe()
+        topics = [i.topic for i in link.client.sub]
+        assert topics == ['insteon/command/+',
+                          'insteon/%s/scene' % setup.addr.hex,
+                          'insteon/+/set']
+
+#===========================================================================
@@ -3,9 +3,12 @@
 # Tests for: insteont_mqtt/mqtt/MsgTemplate.py
 #
 #===========================================================================
+import jinja2
+import pytest
 import helpers as H
 import insteon_mqtt as IM
 from insteon_mqtt.mqtt import MsgTemplate
+from insteon_mqtt.mqtt.MsgTemplate import SimpleTemplate, compile_template
 
 
 class Test_MsgTemplate:
@@ -93,6 +96,48 @@ class Test_MsgTemplate:
         assert call.qos == qos
         assert call.retain is True
 
+    #-----------------------------------------------------------------------
+    def test_compile(self):
+        simple = ['insteon/{{address}}/state', '{{ on_str.upper() }}\n',
+                  '{ "cmd" : "{{value.lower()}}" }', '{{missing}}', 'ON']
+        complex = ['{{json.state}}', '{{value|lower}}', '{{none}}',
+                   '{% if on %}ON{% endif %}']
+        data = {"address" : "aa.bb.cc", "on_str" : "on", "value" : "On",
+                "json" : {"state" : "ON"}, "on" : 1}
+
+        # Simple templates match the jinja output.
+        for templ in simple + complex:
+            t = compile_template(templ)
+            assert t is compile_template(templ)
+            assert isinstance(t, SimpleTemplate) == \
+                (templ in simple)
+            assert t.render(data) == jinja2.Template(templ).render(data)
+
+        # Methods on non-strings use jinja.
+        data["value"] = 1
+        t = compile_template('{{value.lower()}}')
+        with pytest.raises(jinja2.exceptions.UndefinedError):
+            t.render(data)
+
+    #-----------------------------------------------------------------------
+    def test_topic_cache(self):
+        msg = MsgTemplate('insteon/{{address}}/{{button}}', None)
+
+        data = {"address" : "aa.bb.cc", "button" : 1, "on" : 1}
+        assert msg.render_topic(data) == 'insteon/aa.bb.cc/1'
+        data["on"] = 0
+        assert msg.render_topic(data) == 'insteon/aa.bb.cc/1'
+        assert len(msg._topics) == 1
+
+        data["button"] = 2
+        assert msg.render_topic(data) == 'insteon/aa.bb.cc/2'
+        assert len(msg._topics) == 2
+
+        # New templates clear the cache.
+        msg.load_config({'topic' : 'foo/{{address}}'}, 'topic', 'payload')
+        assert len(msg._topics) == 0
+        assert msg.render_topic(data) == 'foo/aa.bb.cc'
+
     #-----------------------------------------------------------------------
     def test_to_json(self):
         topic_templ = '{ "foo" : {{foo}}, "bar" : {{bar}} }'
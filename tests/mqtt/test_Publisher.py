@@ -0,0 +1,116 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/mqtt/Publisher.py
+#
+#===========================================================================
+import time
+import insteon_mqtt as IM
+import helpers as H
+
+
+class Test_Publisher:
+    #-----------------------------------------------------------------------
+    def test_default(self):
+        link = H.network.MockMqtt()
+        pub = IM.mqtt.Publisher(link)
+        pub.load_config({})
+
+        # Nothing is filtered by default.
+        for i in range(3):
+            pub.publish("insteon/aa.bb.cc/state", "ON", 1, True)
+        assert len(link.pub) == 3
+        assert pub.num_published == 3
+        assert pub.num_suppressed == 0
+
+    #-----------------------------------------------------------------------
+    def test_dedupe(self):
+        link = H.network.MockMqtt()
+        pub = IM.mqtt.Publisher(link)
+        pub.load_config({'publish_dedupe' : True})
+
+        topic = "insteon/aa.bb.cc/state"
+        pub.publish(topic, "ON", 1, True)
+        pub.publish(topic, "ON", 1, True)
+        assert len(link.pub) == 1
+        assert pub.num_suppressed == 1
+
+        pub.publish(topic, "OFF", 1, True)
+        pub.publish(topic, "ON", 1, True)
+        assert len(link.pub) == 3
+
+        # Non-retained messages are always sent and the next retained
+        # message is sent as well.
+        pub.publish(topic, "ON", 1, False)
+        pub.publish(topic, "ON", 1, True)
+        assert len(link.pub) == 5
+
+        # After a reconnect, everything is sent again.
+        pub.clear()
+        pub.publish(topic, "ON", 1, True)
+        assert len(link.pub) == 6
+        assert pub.num_suppressed == 1
+
+    #-----------------------------------------------------------------------
+    def test_window(self):
+        link = H.network.MockMqtt()
+        timed = IM.network.TimedCall()
+        pub = IM.mqtt.Publisher(link, timed)
+        pub.load_config({'publish_window' : 0.5})
+
+        topic1 = "insteon/aa.bb.cc/level"
+        topic2 = "insteon/aa.bb.cd/level"
+        for level in range(5):
+            pub.publish(topic1, str(level), 1, True)
+        pub.publish(topic2, "ON", 0, False)
+        assert len(link.pub) == 0
+        assert pub.num_coalesced == 4
+
+        # Last value wins.
+        timed.poll(time.time() + 1)
+        assert len(link.pub) == 2
+        assert link.pub[0] == dict(topic=topic1, payload="4", qos=1,
+                                   retain=True)
+        assert link.pub[1] == dict(topic=topic2, payload="ON", qos=0,
+                                   retain=False)
+
+        pub.publish(topic1, "5", 1, True)
+        pub.flush()
+        assert len(link.pub) == 3
+
+    #-----------------------------------------------------------------------
+    def test_overrides(self):
+        link = H.network.MockMqtt()
+        timed = IM.network.TimedCall()
+        pub = IM.mqtt.Publisher(link, timed)
+        pub.load_config({'publish_dedupe' : True,
+                         'publish_window' : 0.5,
+                         'publish_overrides' : {
+                             'insteon/aa.bb.cc/#' : {'window' : 0},
+                             'insteon/+/dedupe' : {'dedupe' : False,
+                                                   'window' : 0},
+                             }})
+
+        pub.publish("insteon/aa.bb.cc/state", "ON", 1, True)
+        pub.publish("insteon/aa.bb.cc/state", "ON", 1, True)
+        assert len(link.pub) == 1
+
+        pub.publish("insteon/aa.bb.cd/dedupe", "ON", 1, True)
+        pub.publish("insteon/aa.bb.cd/dedupe", "ON", 1, True)
+        assert len(link.pub) == 3
+
+        pub.publish("insteon/aa.bb.cd/state", "ON", 1, True)
+        assert len(link.pub) == 3
+        pub.flush()
+        assert len(link.pub) == 4
+
+    #-----------------------------------------------------------------------
+    def test_mqtt(self):
+        link = H.network.MockMqtt()
+        mqtt = IM.mqtt.Mqtt(link, H.mqtt.MockModem())
+        mqtt.publisher.load_config({'publish_dedupe' : True})
+
+        mqtt.publish("insteon/aa.bb.cc/state", "ON")
+        mqtt.publish("insteon/aa.bb.cc/state", "ON")
+        assert len(link.pub) == 1
+
+#===========================================================================
@@ -3,8 +3,10 @@
 # Tests for: insteont_mqtt/network/Hub.py
 #
 #===========================================================================
+import sys
 import time
 import threading
+import http.server
 import requests
 import pytest
 from pprint import pprint
@@ -50,6 +52,9 @@ class Test_Hub:
         assert test_hub._password == 'password'
         assert test_hub._ip == '192.168.1.1'
 
+        test_hub.load_config({"hub_poll_time": 2})
+        assert test_hub._poll_time == 2
+
     #-----------------------------------------------------------------------
     def test_write(self, test_hub):
         data = bytes([0x01])
@@ -74,8 +79,8 @@ class Test_Hub:
     ])
     def test_read(self, test_hub, read, expected, calls):
         # necessary to stop client from running
-        threading.Thread = mock.Mock()
-        with patch.object(test_hub.signal_read, 'emit'):
+        with patch.object(threading, 'Thread'), \
+             patch.object(test_hub.signal_read, 'emit'):
             test_hub.poll(time.time())
             if read is not None:
                 test_hub.client._read_queue.put(read)
@@ -93,8 +98,8 @@ class Test_Hub:
     ])
     def test_write(self, test_hub, write, t, expected, buffer, calls):
         # necessary to stop client from running
-        threading.Thread = mock.Mock()
-        with mock.patch.object(test_hub.signal_wrote, 'emit'):
+        with patch.object(threading, 'Thread'), \
+             mock.patch.object(test_hub.signal_wrote, 'emit'):
             test_hub.poll(time.time())
             mock.patch.object(test_hub.client, 'write')
             if write is not None:
@@ -108,11 +113,28 @@ class Test_Hub:
             if expected is not None:
                 assert args_list[0][0][1] == expected
 
+    #-----------------------------------------------------------------------
+    def test_next_poll_time(self, test_hub):
+        # Poll right away to start the client.
+        assert test_hub.next_poll_time() == 0
+
+        with patch.object(threading, 'Thread'):
+            test_hub.poll(100)
+        assert test_hub.next_poll_time() == 100 + test_hub.client.read_dt
+
+        # Pending write is due before the next read.
+        test_hub.write(bytes([0x00]), lambda: 100.1)
+        assert test_hub.next_poll_time() == 100.1
+
+        # Data is waiting to be read.
+        test_hub.client._read_queue.put(bytes([0x01]))
+        assert test_hub.next_poll_time() == 0
+
     #-----------------------------------------------------------------------
     def test_close(self, test_hub):
         # necessary to stop client from running
-        threading.Thread = mock.Mock()
-        with mock.patch.object(test_hub.signal_closing, 'emit'):
+        with patch.object(threading, 'Thread'), \
+             mock.patch.object(test_hub.signal_closing, 'emit'):
             # Starts the HubClient
             test_hub.poll(time.time())
             self._write_buf = [bytes([0x00])]
@@ -121,6 +143,27 @@ class Test_Hub:
             assert test_hub.client._close == True
             assert test_hub.signal_closing.emit.call_count == 1
 
+    #-----------------------------------------------------------------------
+    def test_stats_log(self, test_hub):
+        test_hub.load_config({"hub_metrics_interval": 10})
+        assert test_hub.metrics_interval == 10
+
+        hub_log = sys.modules[HubClient.__module__].LOG
+        t = time.time()
+        with patch.object(threading, 'Thread'), \
+             patch.object(hub_log, 'info') as info:
+            # Stats are logged once per interval.
+            test_hub.poll(t + 5)
+            assert info.call_count == 0
+            test_hub.poll(t + 11)
+            test_hub.poll(t + 12)
+            assert info.call_count == 1
+            assert info.call_args[0][2] == test_hub.stats()
+
+            # And when the link is closed.
+            test_hub.close()
+            assert info.call_args[0][2] == test_hub.stats()
+
     #-----------------------------------------------------------------------
     def test_str(self, test_hub):
         assert "%s" % test_hub == "Hub 192.168.1.1"
@@ -132,7 +175,7 @@ class Test_HubClient:
         test_response = Response()
         test_response.status_code = 200
         test_response._content = BUFFSTATUS
-        with patch.object(requests, 'get', return_value=test_response):
+        with patch.object(test_hubclient.session, 'get', return_value=test_response):
             response = test_hubclient._get_hub_buffer()
             assert response
 
@@ -140,7 +183,7 @@ class Test_HubClient:
         test_response = Response()
         test_response.status_code = 200
         test_response._content = BUFFSTATUS
-        with patch.object(requests, 'get', side_effect=requests.exceptions.Timeout):
+        with patch.object(test_hubclient.session, 'get', side_effect=requests.exceptions.Timeout):
             response = test_hubclient._get_hub_buffer()
             assert test_hubclient.read_timeout_count == 1
             assert not response
@@ -150,7 +193,7 @@ class Test_HubClient:
         test_response.status_code = 200
         test_response._content = BUFFSTATUS
         test_hubclient.read_timeout_count = 6
-        with patch.object(requests, 'get', side_effect=requests.exceptions.Timeout):
+        with patch.object(test_hubclient.session, 'get', side_effect=requests.exceptions.Timeout):
             response = test_hubclient._get_hub_buffer()
             assert test_hubclient.read_timeout_count == 0
 
@@ -174,15 +217,212 @@ class Test_HubClient:
         assert ret == expected
 
     def test_perform_write(self, test_hubclient):
-        with patch.object(requests, 'get'):
+        with patch.object(test_hubclient.session, 'get'):
             test_hubclient.write(bytes([0x02,0x06]))
             test_hubclient._perform_write()
-            args = requests.get.call_args
+            args = test_hubclient.session.get.call_args
             assert args[0][0] == 'http://192.168.1.1:25105/3?0206=I=3'
 
     def test_perform_write_timeout(self, test_hubclient):
-        with patch.object(requests, 'get', side_effect=requests.exceptions.Timeout):
+        with patch.object(test_hubclient.session, 'get', side_effect=requests.exceptions.Timeout):
             test_hubclient.write(bytes([0x02,0x06]))
             test_hubclient._perform_write()
-            args = requests.get.call_args
+            args = test_hubclient.session.get.call_args
             assert args[0][0] == 'http://192.168.1.1:25105/3?0206=I=3'
+
+    def test_session(self, test_hubclient):
+        # user:password
+        auth = test_hubclient.session.headers["Authorization"]
+        assert auth == "Basic dXNlcjpwYXNzd29yZA=="
+
+    def test_parse_buffer_bad(self, test_hubclient):
+        test_response = Response()
+        test_response.status_code = 200
+        test_response._content = b"<response></response>"
+        assert test_hubclient._parse_buffer(test_response) == (None, None)
+
+    def test_get_buffer_error(self, test_hubclient):
+        with patch.object(test_hubclient.session, 'get',
+                          side_effect=requests.exceptions.ConnectionError):
+            assert not test_hubclient._get_hub_buffer()
+        assert test_hubclient.read_error_count == 1
+        assert test_hubclient._error_wait() == HubClient.error_dt
+
+        # Repeated errors only log every so often and back off.
+        with patch.object(test_hubclient.session, 'get',
+                          side_effect=requests.exceptions.ConnectionError), \
+             patch.object(sys.modules[HubClient.__module__], 'LOG') as log:
+            for i in range(39):
+                test_hubclient._get_hub_buffer()
+        assert test_hubclient.read_error_count == 40
+        assert log.warning.call_count == 0
+        assert log.error.call_count == 2
+        assert test_hubclient._error_wait() == HubClient.max_error_dt
+
+        # A good read resets the count.
+        test_response = Response()
+        test_response.status_code = 200
+        test_response._content = BUFFSTATUS
+        with patch.object(test_hubclient.session, 'get',
+                          return_value=test_response):
+            test_hubclient._read_buffer()
+        assert test_hubclient.read_error_count == 0
+
+    def test_wait_for_write(self, test_hubclient):
+        # The first read has new bytes, after that the buffer is empty.
+        buffers = [BUFFSTATUS]
+        urls = []
+
+        def get(url, timeout):
+            urls.append(url)
+            response = Response()
+            response.status_code = 200
+            if url.endswith('/buffstatus.xml'):
+                response._content = buffers.pop(0) if buffers else \
+                    b"<response><BS>%s00</BS></response>" % (b"0" * 200)
+            return response
+
+        test_hubclient._prev_bytestring = '7F0006027F'
+        test_hubclient._prev_byte_end = 156
+        with patch.object(test_hubclient.session, 'get', side_effect=get):
+            # Nothing to write - waits until the end time.
+            t0 = time.time()
+            test_hubclient._wait_for_write(t0 + 0.05)
+            assert time.time() - t0 >= 0.05
+            assert urls == []
+
+            # Queued messages are written while waiting.  The buffer is
+            # read before each write so the bytes that arrived since the
+            # last read aren't lost when the write clears the buffer.
+            test_hubclient.write(bytes([0x02, 0x06]))
+            test_hubclient.write(bytes([0x02, 0x07]))
+            test_hubclient._wait_for_write(time.time() + 0.05)
+            assert urls == [
+                'http://192.168.1.1:25105/buffstatus.xml',
+                'http://192.168.1.1:25105/3?0206=I=3',
+                'http://192.168.1.1:25105/buffstatus.xml',
+                'http://192.168.1.1:25105/3?0207=I=3']
+            assert test_hubclient.read() == bytes.fromhex('0206027F0006')
+            assert test_hubclient.overflow_count == 0
+
+    def test_read_dt(self, test_hubclient):
+        assert test_hubclient.read_dt == HubClient.idle_dt
+
+        # New data switches to the burst rate, then backs off to idle.
+        test_hubclient._update_read_dt(True)
+        assert test_hubclient.read_dt == HubClient.burst_dt
+        for i in range(10):
+            test_hubclient._update_read_dt(False)
+        assert test_hubclient.read_dt == HubClient.idle_dt
+
+        # Writing switches to the burst rate.
+        with patch.object(test_hubclient.session, 'get'):
+            test_hubclient._write_command(bytes([0x02, 0x06]))
+        assert test_hubclient.read_dt == HubClient.burst_dt
+
+        with patch.object(threading, 'Thread'):
+            client = HubClient("192.168.1.1", 25105, "user", "password", 2)
+        assert client.read_dt == 2
+
+    def test_stats(self, test_hubclient):
+        with patch.object(test_hubclient.session, 'get'):
+            test_hubclient._write_command(bytes([0x02, 0x06]))
+
+        # The previous bytes are in the buffer so this isn't an overflow.
+        test_hubclient._prev_bytestring = '7F0006027F'
+        test_hubclient._prev_byte_end = 156
+        assert test_hubclient._parse_bytes(ORDEREDSTRING, 168) is not None
+        assert test_hubclient.overflow_count == 0
+
+        # The previous bytes were overwritten.
+        test_hubclient._prev_bytestring = '1111111111'
+        test_hubclient._prev_byte_end = 156
+        assert test_hubclient._parse_bytes(ORDEREDSTRING, 168) is None
+
+        stats = test_hubclient.stats()
+        assert stats['reads'] == 0
+        assert stats['writes'] == 1
+        assert stats['overflows'] == 1
+        assert stats['latency_max'] >= stats['latency_avg']
+        assert stats['read_dt'] == HubClient.burst_dt
+
+    def test_fake_hub(self):
+        hub = FakeHub()
+        client = HubClient("127.0.0.1", hub.port, "user", "password", 1.0)
+        client.burst_dt = .02
+        try:
+            # Idle - first read then wait for the idle time.
+            time.sleep(.2)
+            idle_reads = hub.reads
+            assert idle_reads <= 2
+
+            # The reply is read right after the write and the read rate
+            # speeds up.
+            client.write(bytes([0x02, 0x62]))
+            data = b''
+            t0 = time.time()
+            while time.time() - t0 < 2 and len(data) < 3:
+                data += client.read()
+                time.sleep(.01)
+            assert data == bytes([0x02, 0x62, 0x06])
+            assert time.time() - t0 < .5
+            assert hub.writes == ['/3?0262=I=3']
+
+            time.sleep(.2)
+            assert hub.reads - idle_reads >= 3
+            assert client.stats()['writes'] == 1
+            assert client.stats()['overflows'] == 0
+        finally:
+            client.close()
+            hub.close()
+
+
+#===========================================================================
+class FakeHub:
+    """Local HTTP server that acts like the Hub buffer and command API.
+    """
+    def __init__(self):
+        self.buf = '0' * 200
+        self.end = 0
+        self.reads = 0
+        self.writes = []
+
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if self.path == '/buffstatus.xml':
+                    fake.reads += 1
+                    body = '<response><BS>%s%02X</BS></response>' % \
+                           (fake.buf, fake.end)
+                else:
+                    # Writing clears the buffer and the modem echos the
+                    # command w/ an ACK.
+                    fake.writes.append(self.path)
+                    data = self.path[3:-4] + '06'
+                    fake.buf = data + '0' * (200 - len(data))
+                    fake.end = len(data)
+                    body = ''
+
+                body = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                                      Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,109 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/network/Mqtt.py
+#
+#===========================================================================
+import insteon_mqtt as IM
+
+
+class Test_Mqtt:
+    #-----------------------------------------------------------------------
+    def test_batch(self, mock_paho_mqtt):
+        link = IM.network.Mqtt()
+        client = MockClient(link.client)
+
+        writes = []
+
+        def needs_write(link, needs_write):
+            writes.append(needs_write)
+
+        link.signal_needs_write.connect(needs_write)
+
+        # The manager is only told once that we need to write.
+        for i in range(30):
+            link.publish("insteon/aa.bb.cc/state", "ON", 1, True)
+            client.queued += 1
+        assert writes == [True]
+        assert len(link.client.pub) == 30
+
+        # All the messages are written in one write cycle.
+        link.write_to_link(0)
+        assert client.written == 30
+        assert writes == [True, False]
+
+        link.publish("insteon/aa.bb.cc/state", "OFF", 1, True)
+        client.queued += 1
+        link.write_to_link(0)
+        assert writes == [True, False, True, False]
+
+        metrics = link.metrics()
+        assert metrics["published"] == 31
+        assert metrics["flushes"] == 2
+        assert metrics["flush_size"] == 15.5
+        assert metrics["max_flush_size"] == 30
+        assert metrics["publish_rate"] > 0
+
+        # Rates are since the last call.
+        metrics = link.metrics()
+        assert metrics["flush_size"] == 0
+
+    #-----------------------------------------------------------------------
+    def test_register_write(self, mock_paho_mqtt):
+        link = IM.network.Mqtt()
+        client = MockClient(link.client)
+
+        writes = []
+
+        def needs_write(link, needs_write):
+            writes.append(needs_write)
+
+        link.signal_needs_write.connect(needs_write)
+
+        # Packets queued by the client (acks, pings) are written as well.
+        assert link.client.on_socket_register_write is not None
+        client.queued = 1
+        link.client.on_socket_register_write(link.client, None, None)
+        assert writes == [True]
+
+        link.write_to_link(0)
+        assert client.written == 1
+        assert writes == [True, False]
+
+    #-----------------------------------------------------------------------
+    def test_close(self, mock_paho_mqtt):
+        link = IM.network.Mqtt()
+        client = MockClient(link.client)
+
+        # Queued messages and the disconnect are written right away since
+        # the event loop may not run again.
+        link.publish("insteon/aa.bb.cc/state", "ON", 1, True)
+        client.queued += 1
+        link.connected = True
+        link.close()
+        assert client.written == 2
+        assert client.disconnected
+
+
+#===========================================================================
+class MockClient:
+    """Adds the paho client write methods to the mock client."""
+    def __init__(self, client):
+        self.queued = 0
+        self.written = 0
+        self.disconnected = False
+        client.loop_write = self.loop_write
+        client.want_write = self.want_write
+        client.disconnect = self.disconnect
+
+    def loop_write(self):
+        self.written += self.queued
+        self.queued = 0
+        return 0
+
+    def want_write(self):
+        return self.queued > 0
+
+    def disconnect(self):
+        self.disconnected = True
+        self.queued += 1
+        return 0
@@ -50,9 +50,21 @@ class Test_Serial():
         def call_time():
             return time.time() + 5
         test_device._write_buf.append((bytes(8), call_time))
+        assert test_device.next_poll_time() is None
         with patch.object(test_device.signal_needs_write, 'emit') as mock_emit:
+            # Writing is paused until the write time.
             test_device.write_to_link(t)
+            mock_emit.assert_called_once_with(test_device, False)
+            assert test_device.client.written == []
+            assert test_device.next_poll_time() > t + 4
+
+            # And resumed by poll once the time is reached.
+            mock_emit.reset_mock()
+            test_device.poll(t)
             mock_emit.assert_not_called()
+            test_device.poll(t + 6)
+            mock_emit.assert_called_once_with(test_device, True)
+            assert test_device.next_poll_time() is None
 
     def test_write_to_link_partial(self, test_device):
         test_device.client.write_max = 4
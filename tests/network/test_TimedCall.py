@@ -0,0 +1,59 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/network/TimedCall.py
+#
+#===========================================================================
+import insteon_mqtt as IM
+
+
+class Test_TimedCall:
+    #-----------------------------------------------------------------------
+    def test_poll(self):
+        calls = []
+        timed = IM.network.TimedCall()
+        assert timed.next_poll_time() is None
+
+        timed.add(20, calls.append, "b")
+        timed.add(10, calls.append, "a")
+        timed.add(30, calls.append, "c")
+        assert timed.next_poll_time() == 10
+
+        # Every call that is due runs in the same poll.
+        timed.poll(5)
+        assert calls == []
+        timed.poll(25)
+        assert calls == ["a", "b"]
+        assert timed.next_poll_time() == 30
+
+    #-----------------------------------------------------------------------
+    def test_remove(self):
+        calls = []
+        timed = IM.network.TimedCall()
+        call1 = timed.add(10, calls.append, "a")
+        call2 = timed.add(20, calls.append, "b")
+
+        assert timed.remove(call1) is True
+        assert timed.remove(call1) is False
+        assert timed.next_poll_time() == 20
+
+        timed.poll(25)
+        assert calls == ["b"]
+        assert timed.remove(call2) is False
+
+    #-----------------------------------------------------------------------
+    def test_error(self, caplog):
+        def bad():
+            raise ValueError("bad")
+
+        calls = []
+        timed = IM.network.TimedCall()
+        timed.add(10, bad)
+        timed.add(20, calls.append, "a")
+        timed.poll(25)
+        assert calls == ["a"]
+        assert "Error in executing TimedCall" in caplog.text
+
+    #-----------------------------------------------------------------------
+
+
+#===========================================================================
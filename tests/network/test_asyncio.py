@@ -0,0 +1,163 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/network/asyncio.py
+#
+#===========================================================================
+import asyncio
+import socket
+import time
+import pytest
+import insteon_mqtt as IM
+
+
+class Test_AsyncManager:
+    #-----------------------------------------------------------------------
+    def test_read_write(self):
+        mgr = IM.network.AsyncManager()
+        link = SocketLink()
+        mgr.add(link)
+        assert link.connected is True
+        assert mgr.active()
+
+        # Writing is only done after the link asks for it.
+        link.write(b"abc")
+        mgr.select(time_out=1)
+        assert link.written == [b"abc"]
+
+        # The other side of the socket pair reads it back and the link is
+        # polled because it had activity.
+        link.peer.sendall(b"xyz")
+        link.polls = []
+        mgr.select(time_out=1)
+        assert link.read == [b"xyz"]
+        assert len(link.polls) == 1
+
+        link.close()
+        assert link.connected is False
+        assert not mgr.active()
+
+    #-----------------------------------------------------------------------
+    def test_read_error(self):
+        mgr = IM.network.AsyncManager()
+        link = SocketLink()
+        mgr.add(link)
+
+        # Link errors stop select() like the other managers.
+        def read_from_link():
+            raise ValueError("read error")
+
+        link.read_from_link = read_from_link
+        link.peer.sendall(b"xyz")
+        with pytest.raises(ValueError):
+            mgr.select(time_out=1)
+
+        link.close()
+
+    #-----------------------------------------------------------------------
+    def test_poll_time(self):
+        mgr = IM.network.AsyncManager()
+        link = SocketLink()
+        timed = IM.network.TimedCall()
+        mgr.add(link)
+        mgr.add_poll(timed)
+        mgr.select(time_out=0)
+
+        # Idle links aren't polled on every call.
+        link.polls = []
+        mgr.select(time_out=0)
+        assert link.polls == []
+
+        # The select waits for the next call and only runs that.
+        calls = []
+        timed.add(time.time() + 0.05, calls.append, 1)
+        t0 = time.time()
+        mgr.select(time_out=2)
+        assert calls == [1]
+        assert time.time() - t0 < 1
+        assert link.polls == []
+
+        link.close()
+
+    #-----------------------------------------------------------------------
+    def test_async_link(self):
+        mgr = IM.network.AsyncManager()
+        link = CoroLink(mgr)
+        mgr.add_async(link)
+        assert link.connected is True
+        assert mgr.active()
+
+        # The coroutine wakes up the manager when it has data.
+        t0 = time.time()
+        mgr.select(time_out=2)
+        assert link.data == ["start"]
+        assert time.time() - t0 < 1
+
+        # Finished coroutines are removed from the manager.
+        mgr.select(time_out=0.5)
+        assert link.data == ["start", "done"]
+        assert link.connected is False
+        assert not mgr.active()
+
+    #-----------------------------------------------------------------------
+
+
+#===========================================================================
+class SocketLink(IM.network.Link):
+    def __init__(self):
+        super().__init__()
+        self.sock, self.peer = socket.socketpair()
+        self.sock.setblocking(False)
+        self.connected = None
+        self.read = []
+        self.written = []
+        self.polls = []
+        self.out = []
+        self.signal_connected.connect(self.on_connected)
+
+    def on_connected(self, link, connected):
+        self.connected = connected
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def poll(self, t):
+        self.polls.append(t)
+
+    def read_from_link(self):
+        self.read.append(self.sock.recv(100))
+
+    def write(self, data):
+        self.out.append(data)
+        self.signal_needs_write.emit(self, True)
+
+    def write_to_link(self, t):
+        data = self.out.pop(0)
+        self.sock.sendall(data)
+        self.written.append(data)
+        if not self.out:
+            self.signal_needs_write.emit(self, False)
+
+    def close(self):
+        self.signal_closing.emit(self)
+        self.sock.close()
+        self.peer.close()
+
+
+#===========================================================================
+class CoroLink(IM.network.Link):
+    def __init__(self, mgr):
+        super().__init__()
+        self.mgr = mgr
+        self.data = []
+        self.connected = None
+        self.signal_connected.connect(self.on_connected)
+
+    def on_connected(self, link, connected):
+        self.connected = connected
+
+    async def run(self):
+        await asyncio.sleep(0.05)
+        self.data.append("start")
+        self.mgr.wake()
+        await asyncio.sleep(0.05)
+        self.data.append("done")
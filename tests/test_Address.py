@@ -3,6 +3,9 @@
 # Tests for: insteont_mqtt/Address.py
 #
 #===========================================================================
+import copy
+import time
+from unittest import mock
 import pytest
 import insteon_mqtt as IM
 
@@ -38,6 +41,86 @@ class Test_Address:
         b = IM.Address(a)
         self.check(b, a.id)
 
+    #-----------------------------------------------------------------------
+    def test_slots(self):
+        a = IM.Address("01.02.03")
+        assert not hasattr(a, "__dict__")
+        with pytest.raises(AttributeError):
+            a.foo = 1
+
+        # ids is computed and can't change the address.
+        a.ids[0] = 5
+        assert a.ids == [1, 2, 3]
+
+    #-----------------------------------------------------------------------
+    def test_intern(self, monkeypatch):
+        a = IM.Address("01.02.03")
+        assert IM.Address(0x010203) is a
+        assert IM.Address(1, 2, 3) is a
+        assert IM.Address(a) is a
+        assert IM.Address.from_bytes(bytes([0, 1, 2, 3]), 1) is a
+        assert IM.Address.from_bytes(bytearray([1, 2, 3])) is a
+        assert IM.Address.from_bytes([1, 2, 3]) is a
+        assert copy.copy(a) is a
+        assert copy.deepcopy({a: 1}) == {a: 1}
+
+        # Views of the protocol read buffer skip the input checks.
+        raw = memoryview(bytearray([0, 1, 2, 3]))
+        with mock.patch.object(IM.Address, "_addr3_to_ids") as ids:
+            assert IM.Address.from_bytes(raw, 1) is a
+            assert IM.Address.from_bytes(raw[1:]) is a
+            assert ids.call_count == 0
+
+        # Past the table size, new objects are created but still work.
+        monkeypatch.setattr(IM.Address, "_interned", {})
+        monkeypatch.setattr(IM.Address, "max_interned", 1)
+        b = IM.Address.from_bytes(bytes([1, 2, 3]))
+        c = IM.Address.from_bytes(bytes([1, 2, 4]))
+        d = IM.Address.from_bytes(bytes([1, 2, 4]))
+        assert IM.Address(b) is b
+        assert IM.Address(1, 2, 3) is b
+        assert c is not d
+        assert c == d and hash(c) == hash(d)
+        assert c != b
+        assert c.hex == "01.02.04"
+
+    #-----------------------------------------------------------------------
+    def test_benchmark(self, capsys):
+        # Micro-benchmark of the common address operations.  Run pytest w/
+        # -s to see the results.  The time isn't checked since it depends
+        # on the machine.
+        num = 20000
+        raw = bytes([0x02, 0x50, 0x44, 0x85, 0x11, 0x1a, 0x2b, 0x3c])
+        text = ["%02x.%02x.%02x" % (0x44, 0x85, i % 256) for i in range(num)]
+
+        def timeit(func):
+            t0 = time.perf_counter()
+            func()
+            return num / (time.perf_counter() - t0)
+
+        def parse_bytes():
+            for i in range(num):
+                IM.Address.from_bytes(raw, 2)
+
+        def parse_str():
+            for s in text:
+                IM.Address(s)
+
+        addrs = [IM.Address(s) for s in text]
+        lookup = {a: i for i, a in enumerate(addrs[:256])}
+
+        def hash_eq():
+            for a in addrs:
+                assert lookup[a] == a.id & 0xff
+
+        results = [(name, timeit(func)) for name, func in
+                   (("from_bytes", parse_bytes), ("from_str", parse_str),
+                    ("hash+eq", hash_eq))]
+        with capsys.disabled():
+            print()
+            for name, rate in results:
+                print("Address %-10s: %10.0f ops/sec" % (name, rate))
+
     #-----------------------------------------------------------------------
     def test_str1(self):
         a = IM.Address('01e240')
@@ -129,7 +129,7 @@ class Patch_Stack():
 
     def _signal_written(self):
         # All messages sent get marked as written to the PLM
-        out = self.modem_obj.protocol._write_queue[0]
+        out = self.modem_obj.protocol._write_current
         out.handler.sending_message(None)
 
     def write_to_modem(self, data):
@@ -87,3 +87,78 @@ class Test_Base_Config():
         for record in caplog.records:
             assert record.levelname != "ERROR"
         assert test_device.addr == IM.Address('44.85.12')
+
+    def test_lazy_db_load(self, tmpdir):
+        protocol = mock.MagicMock()
+        stack = IM.network.Stack()
+        modem = IM.Modem(protocol, stack, H.main.MockTimedCall())
+
+        # Saved database for the first device.
+        addr = IM.Address('aa.bb.cc')
+        db = IM.db.Device(addr, str(tmpdir.join(addr.hex + ".json")))
+        db.set_meta('key', 5)
+
+        cfg = {'storage' : str(tmpdir), 'lazy_db_load' : True,
+               'devices' : {'switch' : ['aa.bb.cc', 'aa.bb.dd']}}
+        msg = Msg.OutModemInfo(addr=IM.Address('44.85.12'), dev_cat=None,
+                               sub_cat=None, firmware=None, is_ack=True)
+        modem.load_config_step2(True, 'message', msg, cfg)
+        dev1 = modem.find(addr)
+        dev2 = modem.find(IM.Address('aa.bb.dd'))
+        assert not dev1.is_db_loaded()
+        assert not dev2.is_db_loaded()
+
+        # Databases are loaded on first use or by the stack.
+        assert dev2.db.get_meta('key') is None
+        assert dev2.is_db_loaded()
+        while stack.next_poll_time() is not None:
+            stack.poll(0)
+        assert dev1.is_db_loaded()
+        assert dev1.db.get_meta('key') == 5
+        assert dev1.db.save_path == db.save_path
+
+        # The databases are written w/ the modem saver.
+        assert dev1.db.saver is modem.saver
+        assert modem.db.saver is modem.saver
+
+
+class Test_Group_Devices():
+    def test_find_group_devices(self, test_device, tmpdir):
+        test_device.addr = IM.Address('44.85.11')
+        test_device.save_path = str(tmpdir)
+        ctrl = IM.device.Base(test_device.protocol, test_device,
+                              IM.Address('11.22.33'), "ctrl")
+        resp = IM.device.Base(test_device.protocol, test_device,
+                              IM.Address('11.22.44'), "resp")
+        test_device.add(ctrl)
+
+        # Controller entries in the device db for group 1.
+        flags = Msg.DbFlags(in_use=True, is_controller=True,
+                            is_last_rec=False)
+        for i, addr in enumerate([resp.addr, IM.Address('11.22.55')]):
+            entry = IM.db.DeviceEntry(addr, 0x01, 0x0fff - i * 8, flags,
+                                      bytes(3))
+            ctrl.db.add_entry(entry, save=False)
+
+        devices = test_device.find_group_devices(ctrl, 0x01)
+        assert devices == [(resp.addr, None),
+                           (IM.Address('11.22.55'), None)]
+        assert test_device.find_group_devices(ctrl, 0x01) is devices
+        assert test_device.find_group_devices(ctrl, 0x02) == []
+
+        # Adding a device invalidates the cache.
+        test_device.add(resp)
+        devices = test_device.find_group_devices(ctrl, 0x01)
+        assert devices[0] == (resp.addr, resp)
+
+        # So does changing the db.
+        ctrl.db.clear()
+        assert test_device.find_group_devices(ctrl, 0x01) == []
+
+        # The modem db is used for modem scenes.
+        entry = IM.db.ModemEntry(resp.addr, 0x20, True, bytes(3))
+        test_device.db.add_entry(entry, save=False)
+        devices = test_device.find_group_devices(test_device, 0x20)
+        assert devices == [(resp.addr, resp)]
+        test_device.db.delete_entry(entry)
+        assert test_device.find_group_devices(test_device, 0x20) == []
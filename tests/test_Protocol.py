@@ -4,6 +4,7 @@
 #
 # pylint: disable=protected-access
 #===========================================================================
+import logging
 import time
 import pytest
 import insteon_mqtt as IM
@@ -23,7 +24,96 @@ class Test_Protocol:
         link.signal_read.emit(link, bytes([0x02, 0x03, 0x04]))
 
     #-----------------------------------------------------------------------
+    def test_read_burst(self, test_proto):
+        msgs = []
 
+        def received(msg):
+            msgs.append(msg)
+        test_proto.signal_received.connect(received)
+
+        # Modem db record followed by a get next reply, repeated and split
+        # across reads at odd offsets.
+        rec = bytes([0x02, 0x57, 0xe2, 0x01, 0x3a, 0x29, 0x84, 0x01, 0x0e,
+                     0x43])
+        ack = bytes([0x02, 0x6a, 0x06])
+        data = b''.join(rec[:3] + bytes([i]) + rec[4:] + ack
+                        for i in range(20))
+        for i in range(0, len(data), 7):
+            test_proto._data_read(test_proto.link, data[i:i + 7])
+
+        assert len(msgs) == 40
+        assert isinstance(msgs[0], Msg.InpAllLinkRec)
+        assert isinstance(msgs[1], Msg.OutAllLinkGetNext)
+        assert msgs[38].group == 19
+        assert msgs[38].data == bytes([0x01, 0x0e, 0x43])
+        assert test_proto._buf_pos == 0
+        assert len(test_proto._buf) == 0
+
+    #-----------------------------------------------------------------------
+    def test_read_partial(self, test_proto):
+        msgs = []
+
+        def received(msg):
+            msgs.append(msg)
+        test_proto.signal_received.connect(received)
+
+        # Busy byte, garbage, a message w/ an unknown type code, then a
+        # partial message.
+        test_proto._data_read(test_proto.link,
+                              bytes([0x15, 0x01, 0x02, 0x02, 0x6a]))
+        assert test_proto._next_write_time > 0
+        assert len(msgs) == 0
+        assert test_proto._buf[test_proto._buf_pos:] == bytes([0x02, 0x6a])
+
+        test_proto._data_read(test_proto.link, bytes([0x15]))
+        assert len(msgs) == 1
+        assert isinstance(msgs[0], Msg.OutAllLinkGetNext)
+        assert len(test_proto._buf) == 0
+
+    #-----------------------------------------------------------------------
+    def test_read_compact(self, test_proto):
+        msgs = []
+
+        def received(msg):
+            msgs.append(msg)
+        test_proto.signal_received.connect(received)
+        test_proto.read_compact_size = 5
+
+        # Consumed bytes stay in the buffer until the compact size is hit.
+        test_proto._data_read(test_proto.link, bytes([0x02, 0x6a, 0x06,
+                                                      0x02]))
+        assert test_proto._buf_pos == 3
+        assert len(test_proto._buf) == 4
+
+        test_proto._data_read(test_proto.link, bytes([0x6a, 0x06, 0x02]))
+        assert test_proto._buf_pos == 0
+        assert test_proto._buf == bytes([0x02])
+        assert len(msgs) == 2
+
+    #-----------------------------------------------------------------------
+    def test_read_raise(self, test_proto):
+        msgs = []
+
+        def received(msg):
+            msgs.append(msg)
+            if len(msgs) == 2:
+                raise Exception("handler error")
+        test_proto.signal_received.connect(received)
+
+        # The second message handler raises.  The third message is left in
+        # the buffer.
+        ack = bytes([0x02, 0x6a, 0x06])
+        with pytest.raises(Exception):
+            test_proto._data_read(test_proto.link, ack * 3)
+        assert len(msgs) == 2
+        assert test_proto._buf_pos == 6
+
+        # The messages that were already processed aren't processed again.
+        test_proto._data_read(test_proto.link, bytes())
+        assert len(msgs) == 3
+        assert len(test_proto._buf) == 0
+
+    #-----------------------------------------------------------------------
     def test_duplicate(self):
         link = MockSerial()
         proto = IM.Protocol(link)
@@ -53,12 +143,115 @@ class Test_Protocol:
         flags = Msg.Flags(Msg.Flags.Type.DIRECT_ACK, False)
         addr = IM.Address('0a.12.44')
         msg = Msg.InpStandard(addr, addr, flags, 0x11, 0x01)
-        proto._read_history.append(msg)
         msg.expire_time = 1
-        assert len(proto._read_history) == 2
-        proto._remove_expired_read(time.time())
+        proto._read_history.clear()
+        proto._read_expire.clear()
+        assert proto._is_duplicate(msg) is False
+        assert len(proto._read_history) == 1
+        assert proto._is_duplicate(msg_keep) is False
         assert len(proto._read_history) == 1
-        assert proto._read_history[0] == msg_keep
+        assert msg_keep.dedupe_key() in proto._read_history
+        assert len(proto._read_expire) == 1
+
+        # An expired message that is still in the history (held up by an
+        # earlier message with a later expire time) isn't a duplicate.
+        proto._read_history[msg.dedupe_key()] = 1
+        assert proto._is_duplicate(msg) is False
+
+    #-----------------------------------------------------------------------
+    def test_write_priority(self, test_proto):
+        addr1 = IM.Address('0a.12.33')
+        addr2 = IM.Address('0a.12.44')
+        msg_first = Msg.OutStandard.direct(addr1, 0x19, 0x00)
+        msg_db = Msg.OutStandard.direct(addr1, 0x2f, 0x00)
+        msg_cmd = Msg.OutStandard.direct(addr2, 0x11, 0xff)
+        msg_high = Msg.OutStandard.direct(addr2, 0x13, 0x00)
+        cmd = IM.handler.StandardCmd(msg_cmd, None)
+        db_get = IM.handler.DeviceDbGet(None, None)
+
+        # First message is written immediately.
+        test_proto.send(msg_first, cmd)
+        test_proto.send(msg_db, db_get)
+        test_proto.send(msg_cmd, cmd)
+        test_proto.send(msg_high, cmd, high_priority=True)
+        assert test_proto._write_current.msg is msg_first
+        assert test_proto.write_queue_stats() == {
+            'high' : 1, 'command' : 1, 'refresh' : 0, 'db' : 1}
+        assert test_proto.is_addr_in_write_queue(addr1)
+        assert test_proto.is_addr_in_write_queue(addr2)
+
+        # Remaining messages are written in priority order.
+        written = []
+        for i in range(3):
+            test_proto._write_finished()
+            written.append(test_proto._write_current.msg)
+        assert written == [msg_high, msg_cmd, msg_db]
+        assert not test_proto.is_addr_in_write_queue(addr2)
+        assert test_proto.is_addr_in_write_queue(addr1)
+
+        test_proto._write_finished()
+        assert test_proto._write_current is None
+        assert not test_proto.is_addr_in_write_queue(addr1)
+        assert len(test_proto.link.written) == 4
+
+    #-----------------------------------------------------------------------
+    def test_timed_send(self, test_proto):
+        addr = IM.Address('0a.12.33')
+        msg1 = Msg.OutStandard.direct(addr, 0x11, 0xff)
+        msg2 = Msg.OutStandard.direct(addr, 0x13, 0x00)
+        test_proto.send(msg2, None, after=20)
+        test_proto.send(msg1, None, after=10)
+        assert test_proto.link.next_poll_time() == 10
+
+        test_proto._poll(5)
+        assert test_proto._write_current is None
+
+        # Both due messages are moved to the write queue at once.
+        test_proto._poll(25)
+        assert test_proto._write_current.msg is msg1
+        assert test_proto.write_queue_stats()['command'] == 1
+        assert test_proto.link.next_poll_time() is None
+
+    #-----------------------------------------------------------------------
+    def test_queue_log(self, test_proto, caplog):
+        addr = IM.Address('0a.12.33')
+        msg = Msg.OutStandard.direct(addr, 0x11, 0xff)
+        handler = IM.handler.StandardCmd(msg, None)
+        test_proto.queue_log_size = 3
+        caplog.set_level(logging.INFO)
+
+        # The first message is written right away.
+        for i in range(7):
+            test_proto.send(msg, handler)
+
+        logs = [r.getMessage() for r in caplog.records
+                if r.getMessage().startswith("Write queue has")]
+        assert len(logs) == 2
+        assert logs[-1] == ("Write queue has 6 messages: {'high': 0, "
+                            "'command': 6, 'refresh': 0, 'db': 0}")
+
+    #-----------------------------------------------------------------------
+    def test_next_poll_time(self, test_proto):
+        addr = IM.Address('0a.12.33')
+        msg = Msg.OutStandard.direct(addr, 0x11, 0xff)
+        handler = IM.handler.StandardCmd(msg, None)
+        assert test_proto.link.next_poll_time() is None
+
+        # Timed message.
+        test_proto.send(msg, handler, after=time.time() + 100)
+        assert test_proto.link.next_poll_time() > time.time() + 90
+
+        # Handler time out once the message has been written.
+        test_proto.send(msg, handler)
+        assert test_proto.link.next_poll_time() > time.time() + 90
+        test_proto._msg_written(test_proto.link, None)
+        assert (test_proto.link.next_poll_time() ==
+                handler.next_expire_time())
+        assert handler.next_expire_time() < time.time() + 10
+
+        # Link poll time is used if it's earlier.
+        test_proto._linkNextPollTime = lambda: 5
+        assert test_proto.link.next_poll_time() == 5
 
     #-----------------------------------------------------------------------
     def test_set_wait_time(self, test_proto):
@@ -78,9 +271,13 @@ class MockSerial:
         self.signal_read = IM.Signal()
         self.signal_wrote = IM.Signal()
         self.config = None
+        self.written = []
 
-    def poll(self):
+    def poll(self, t):
         pass
 
     def load_config(self, config):
         self.config = config
+
+    def write(self, data, next_write_time):
+        self.written.append(data)
@@ -132,6 +132,44 @@ class Test_Scenes:
         scenes.compress_responders()
         assert len(scenes.entries) == 1
 
+    def test_compress(self):
+        modem = MockModem()
+        scenes = Scenes.SceneManager(modem, None)
+
+        # The controllers have to be merged before the responders can be.
+        scenes.data = [{'controllers': ['aa.bb.01'],
+                        'responders': ['aa.bb.10']},
+                       {'controllers': ['aa.bb.01', 'aa.bb.02'],
+                        'responders': ['aa.bb.11'],
+                        'name': 'test'},
+                       {'controllers': ['aa.bb.02'],
+                        'responders': ['aa.bb.10']},
+                       {'controllers': ['aa.bb.03'],
+                        'responders': ['aa.bb.12']}]
+        scenes._init_scene_entries()
+        assert scenes.compress() == 2
+        assert len(scenes.entries) == 2
+        assert len(scenes.data) == 2
+
+        scene = scenes.entries[0]
+        assert scene.name == 'test'
+        assert scene.data is scenes.data[0]
+        assert sorted(str(i.addr) for i in scene.controllers) == [
+            'aa.bb.01', 'aa.bb.02']
+        assert sorted(str(i.addr) for i in scene.responders) == [
+            'aa.bb.10', 'aa.bb.11']
+
+        # N-way scenes.
+        scenes.data = [{'controllers': ['aa.bb.01'],
+                        'responders': ['aa.bb.02', 'aa.bb.03']},
+                       {'controllers': ['aa.bb.02'],
+                        'responders': ['aa.bb.01', 'aa.bb.03']},
+                       {'controllers': ['aa.bb.03'],
+                        'responders': ['aa.bb.04']}]
+        scenes._init_scene_entries()
+        assert scenes.compress_n_way() == 1
+        assert len(scenes.entries[0].controllers) == 2
+
     def test_populate_scenes(self):
         modem = MockModem()
         device = modem.find(Address("aa.bb.cc"))
@@ -699,6 +737,7 @@ class Test_Scenes:
 class MockModem():
     def __init__(self):
         self.save_path = ''
+        self.saver = IM.db.Saver()
         self.devices = {}
         self.protocol = MockProto()
         self.devices['ff.ff.ff'] = self
@@ -0,0 +1,62 @@
+#===========================================================================
+#
+# Tests for: insteont_mqtt/Scheduler.py
+#
+#===========================================================================
+import insteon_mqtt as IM
+
+
+class Test_Scheduler:
+    #-----------------------------------------------------------------------
+    def test_order(self):
+        sched = IM.Scheduler()
+        assert len(sched) == 0
+        assert sched.next_time() is None
+
+        sched.add(5, "c")
+        sched.add(1, "a")
+        sched.add(3, "b1")
+        sched.add(3, "b2")
+        assert len(sched) == 4
+        assert sched.next_time() == 1
+        assert sched.items() == ["a", "b1", "b2", "c"]
+
+        # All the due items are returned at once.
+        assert sched.pop_due(0.5) == []
+        assert sched.pop_due(3) == ["a", "b1", "b2"]
+        assert len(sched) == 1
+        assert sched.next_time() == 5
+        assert sched.pop_due(10) == ["c"]
+        assert len(sched) == 0
+
+    #-----------------------------------------------------------------------
+    def test_remove(self):
+        sched = IM.Scheduler()
+        a = sched.add(1, "a")
+        b = sched.add(2, "b")
+        sched.add(3, "c")
+
+        assert sched.remove(a) is True
+        assert sched.remove(a) is False
+        assert len(sched) == 2
+        assert sched.next_time() == 2
+
+        assert sched.pop_due(2) == ["b"]
+        assert sched.remove(b) is False
+        assert sched.items() == ["c"]
+
+    #-----------------------------------------------------------------------
+    def test_remove_compact(self):
+        sched = IM.Scheduler()
+        entries = [sched.add(i, i) for i in range(100)]
+        for entry in entries[:90]:
+            sched.remove(entry)
+
+        assert len(sched) == 10
+        assert len(sched._heap) < 50
+        assert sched.pop_due(1000) == list(range(90, 100))
+
+    #-----------------------------------------------------------------------
+
+
+#===========================================================================
@@ -4,6 +4,7 @@
 #
 # pylint: disable=blacklisted-name, attribute-defined-outside-init
 #===========================================================================
+import json
 import pytest
 import insteon_mqtt as IM
 
@@ -208,5 +209,13 @@ class Test_util:
         v = IM.util.input_byte(inputs, 'key7')
         assert 'Valid inputs are 0-255' in caplog.text
 
+    #-----------------------------------------------------------------------
+    def test_save_json(self, tmpdir):
+        path = tmpdir.join("test.json")
+        path.write("old")
+        IM.util.save_json(path, {"a": [1, 2]})
+        assert json.loads(path.read()) == {"a": [1, 2]}
+        assert tmpdir.listdir() == [path]
+
 
 #===========================================================================
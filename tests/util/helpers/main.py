@@ -15,6 +15,7 @@ class MockModem:
         self.name = "modem"
         self.addr = IM.Address(0x20, 0x30, 0x40)
         self.save_path = str(save_path)
+        self.saver = IM.db.Saver()
         self.scenes = []
         self.devices = {}
         self.device_names = {}
@@ -28,6 +29,10 @@ class MockModem:
         device = self.devices.get(addr.id, None)
         return device
 
+    def find_group_devices(self, controller, group):
+        return [(i.addr, self.find(i.addr))
+                for i in controller.db.find_group(group)]
+
     def remove(self, device):
         self.devices.pop(device.addr.id, None)
         if device.name: